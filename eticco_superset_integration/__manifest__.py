@@ -40,12 +40,16 @@
     'depends': [
         'base',
         'web',
+        'bus',
     ],
     
     'data': [
         'data/superset_data.xml',
+        'data/superset_cron.xml',
         'security/superset_security.xml',
         'security/ir.model.access.csv',
+        'views/superset_monitoring_views.xml',
+        'views/superset_connection_views.xml',
         'views/superset_config_views.xml',
         'views/superset_analytics_hub_views.xml',
     ],
@@ -55,6 +59,7 @@
             # Estilos específicos para componentes Superset
             'eticco_superset_integration/static/src/scss/superset_dashboard.scss',
             # Componente integrado con UX mejorada
+            'eticco_superset_integration/static/src/fields/superset_tab_cache.js',
             'eticco_superset_integration/static/src/fields/superset_dashboard_integrated.js',
             'eticco_superset_integration/static/src/fields/superset_dashboard_integrated.xml',
         ],
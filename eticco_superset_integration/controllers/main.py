@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+from odoo import http
+from odoo.http import request
+
+from ..models.superset_metrics import METRICS
+
+
+class SupersetController(http.Controller):
+    """Endpoints HTTP auxiliares de la integración Superset"""
+
+    @http.route('/superset/thumbnail/<string:dashboard_uuid>', type='http', auth='user', methods=['GET'])
+    def dashboard_thumbnail(self, dashboard_uuid, **kwargs):
+        """Servir miniatura cacheada de un dashboard"""
+        if not request.env.user.has_group('eticco_superset_integration.group_superset_user'):
+            return request.not_found()
+
+        utils = request.env['superset.utils']
+        attachment = utils._get_thumbnail_attachments([dashboard_uuid]).get(dashboard_uuid)
+        if not attachment:
+            return request.not_found()
+
+        stream = request.env['ir.binary']._get_stream_from(attachment)
+        # La URL incluye el checksum, así que se puede cachear en el navegador
+        return stream.get_response(max_age=86400 if kwargs.get('unique') else 0)
+
+    @http.route('/superset/metrics', type='http', auth='user', methods=['GET'])
+    def metrics(self, **kwargs):
+        """Métricas de llamadas a Superset en formato Prometheus (solo administradores)"""
+        if not request.env.user.has_group('base.group_system'):
+            return request.not_found()
+
+        return request.make_response(METRICS.render_prometheus(), headers=[
+            ('Content-Type', 'text/plain; version=0.0.4; charset=utf-8'),
+            ('Cache-Control', 'no-store'),
+        ])
@@ -0,0 +1,360 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Pruebas de carga con usuarios concurrentes contra Odoo + Superset falso
+
+Amplía los scripts JSON-RPC ``test_paola_env.py`` y
+``test_production_error_scenarios.py``: en lugar de comprobar flujos uno a uno,
+simula N usuarios en paralelo que inician sesión, abren el hub, cambian de
+dashboard y refrescan el guest token por la misma ruta que el widget OWL
+(``/web/dataset/call_kw`` con sesión web propia por usuario).
+
+Informe por escenario: throughput, latencias p50/p95/p99 y tasa de errores,
+en consola y opcionalmente en JSON (``--report``).
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, defaultdict
+
+import requests
+
+from test_paola_env import PaolaEnvironmentTester
+from test_production_error_scenarios import ProductionErrorTester
+
+ODOO_BASE_URL = "http://localhost:8069"
+DB_NAME = "test_db"
+
+SCENARIOS = ('login', 'open_hub', 'switch_dashboard', 'refresh_guest_token')
+INVALID_OPTIONS = ('no_config', 'no_dashboards', 'error')
+
+
+class RpcError(Exception):
+    """Error devuelto por Odoo en la respuesta JSON-RPC"""
+
+    def __init__(self, error):
+        data = error.get('data', {}) if isinstance(error, dict) else {}
+        self.error_type = data.get('name', 'rpc_error').split('.')[-1]
+        super().__init__(data.get('message') or str(error))
+
+
+class OdooWebClient:
+    """Sesión web de un usuario virtual (cookies propias, como un navegador)"""
+
+    def __init__(self, odoo_url, db_name, timeout=60):
+        self.odoo_url = odoo_url
+        self.db_name = db_name
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.request_id = 0
+
+    def _post(self, path, params):
+        self.request_id += 1
+        response = self.session.post(f"{self.odoo_url}{path}", json={
+            'jsonrpc': '2.0',
+            'method': 'call',
+            'params': params,
+            'id': self.request_id,
+        }, timeout=self.timeout)
+        response.raise_for_status()
+        result = response.json()
+        if 'error' in result:
+            raise RpcError(result['error'])
+        return result.get('result')
+
+    def authenticate(self, login, password):
+        result = self._post('/web/session/authenticate', {
+            'db': self.db_name, 'login': login, 'password': password,
+        })
+        if not result or not result.get('uid'):
+            raise RpcError({'data': {'name': 'access_denied', 'message': 'Credenciales rechazadas'}})
+        return result['uid']
+
+    def call_kw(self, model, method, args=None, kwargs=None, trace_id=None):
+        kwargs = dict(kwargs or {})
+        if trace_id:
+            kwargs['context'] = dict(kwargs.get('context', {}), superset_trace_id=trace_id)
+        return self._post('/web/dataset/call_kw', {
+            'model': model, 'method': method, 'args': args or [], 'kwargs': kwargs,
+        })
+
+
+class ScenarioStats:
+    """Latencias y errores por escenario (compartido entre hilos)"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(Counter)
+
+    def record(self, scenario, duration, error_type=None):
+        with self.lock:
+            self.latencies[scenario].append(duration)
+            if error_type:
+                self.errors[scenario][error_type] += 1
+
+    def report(self, wall_time):
+        report = {}
+        for scenario in SCENARIOS:
+            samples = sorted(self.latencies.get(scenario, []))
+            if not samples:
+                continue
+            errors = self.errors.get(scenario, Counter())
+            error_count = sum(errors.values())
+            report[scenario] = {
+                'requests': len(samples),
+                'throughput_rps': round(len(samples) / wall_time, 2) if wall_time else 0.0,
+                'p50_ms': round(percentile(samples, 50) * 1000, 1),
+                'p95_ms': round(percentile(samples, 95) * 1000, 1),
+                'p99_ms': round(percentile(samples, 99) * 1000, 1),
+                'max_ms': round(samples[-1] * 1000, 1),
+                'error_rate': round(error_count / len(samples), 4),
+                'errors': dict(errors.most_common()),
+            }
+        return report
+
+
+def percentile(sorted_samples, pct):
+    """Percentil por rango más cercano sobre una lista ya ordenada"""
+    if not sorted_samples:
+        return 0.0
+    rank = max(1, int(round(pct / 100.0 * len(sorted_samples) + 0.5)))
+    return sorted_samples[min(rank, len(sorted_samples)) - 1]
+
+
+class VirtualUser(threading.Thread):
+    """Usuario simulado: login → abrir hub → (cambiar dashboard → refrescar guest token)*"""
+
+    def __init__(self, index, runner, login, password):
+        super().__init__(name=f'vuser-{index}', daemon=True)
+        self.index = index
+        self.runner = runner
+        self.login = login
+        self.password = password
+        self.random = random.Random(runner.args.seed + index)
+        self.client = OdooWebClient(runner.args.odoo_url, runner.args.db, timeout=runner.args.timeout)
+        self.hub_id = None
+        self.options = []
+
+    def timed(self, scenario, func):
+        """Ejecutar un paso midiendo su latencia; los fallos se clasifican por tipo"""
+        started = time.perf_counter()
+        error_type = None
+        result = None
+        try:
+            result = func()
+            if isinstance(result, dict) and result.get('error'):
+                error_type = result.get('error_type') or 'payload_error'
+        except RpcError as e:
+            error_type = e.error_type
+        except requests.exceptions.Timeout:
+            error_type = 'client_timeout'
+        except requests.exceptions.RequestException:
+            error_type = 'client_connection_error'
+        self.runner.stats.record(scenario, time.perf_counter() - started, error_type)
+        return result, error_type
+
+    def think(self):
+        if self.runner.args.think_time:
+            time.sleep(self.random.uniform(0, 2 * self.runner.args.think_time))
+
+    def open_hub(self):
+        Hub = 'superset.analytics.hub'
+        hub_ids = self.client.call_kw(Hub, 'search', [[]], {'limit': 1})
+        if not hub_ids:
+            hub_ids = [self.client.call_kw(Hub, 'create', [{}])]
+        self.hub_id = hub_ids[0]
+        fields = self.client.call_kw(Hub, 'fields_get', [['selected_dashboard']], {'attributes': ['selection']})
+        self.client.call_kw(Hub, 'read', [[self.hub_id], ['selected_dashboard', 'has_configuration',
+                                                          'available_dashboards_count']])
+        self.client.call_kw(Hub, 'refresh_dashboard_options', [[self.hub_id]], trace_id=uuid.uuid4().hex)
+        self.client.call_kw(Hub, 'get_dashboard_thumbnails', [[self.hub_id]])
+        self.options = [key for key, _label in fields['selected_dashboard'].get('selection', [])
+                        if key not in INVALID_OPTIONS]
+        return {}
+
+    def switch_dashboard(self):
+        if not self.options:
+            return {'error': 'Sin dashboards', 'error_type': 'no_dashboards'}
+        dashboard = self.random.choice(self.options)
+        Hub = 'superset.analytics.hub'
+        self.client.call_kw(Hub, 'write', [[self.hub_id], {'selected_dashboard': dashboard}])
+        return self.client.call_kw(Hub, 'get_dashboard_data_for_js', [[self.hub_id]], trace_id=uuid.uuid4().hex)
+
+    def refresh_guest_token(self):
+        # El SDK vuelve a pedir los datos de embedding cuando caduca el guest token
+        return self.client.call_kw('superset.analytics.hub', 'get_dashboard_data_for_js', [[self.hub_id]],
+                                   trace_id=uuid.uuid4().hex)
+
+    def run(self):
+        args = self.runner.args
+        time.sleep(args.ramp_up * self.index / max(1, args.users))
+
+        _uid, error = self.timed('login', lambda: self.client.authenticate(self.login, self.password))
+        if error:
+            return
+        _result, error = self.timed('open_hub', self.open_hub)
+        if error:
+            return
+
+        iteration = 0
+        while not self.runner.stop_event.is_set():
+            if args.iterations and iteration >= args.iterations:
+                break
+            self.think()
+            self.timed('switch_dashboard', self.switch_dashboard)
+            for _refresh in range(args.refreshes):
+                self.think()
+                self.timed('refresh_guest_token', self.refresh_guest_token)
+            iteration += 1
+
+
+class LoadRunner:
+    """Orquestar Superset falso, configuración de Odoo y usuarios virtuales"""
+
+    def __init__(self, args):
+        self.args = args
+        self.stats = ScenarioStats()
+        self.stop_event = threading.Event()
+        self.fake = None
+
+    def start_fake_superset(self):
+        """Levantar el Superset falso de tests/ y apuntar Odoo a él"""
+        sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tests'))
+        from fake_superset import FakeSuperset
+
+        self.fake = FakeSuperset(dashboards=self.args.dashboards, latency=self.args.fake_latency,
+                                 error_rate=self.args.fake_error_rate, seed=self.args.seed)
+        self.fake.start(self.args.fake_host, self.args.fake_port)
+        public_url = self.args.fake_public_url or self.fake.url
+        print(f"🧪 Superset falso en {self.fake.url} (Odoo lo ve como {public_url}), "
+              f"{self.args.dashboards} dashboards")
+
+        ProductionErrorTester(self.args.odoo_url, self.args.db)._update_config_parameters({
+            'superset.url': public_url,
+            'superset.username': self.fake.username,
+            'superset.password': self.fake.password,
+            'superset.timeout': str(self.args.superset_timeout),
+        })
+
+    def credentials(self):
+        users = self.args.user or ['admin:admin']
+        return [tuple(users[i % len(users)].split(':', 1)) for i in range(self.args.users)]
+
+    def run(self):
+        preflight = PaolaEnvironmentTester()
+        preflight.odoo_url = self.args.odoo_url
+        preflight.db_name = self.args.db
+        if not preflight.check_odoo_accessibility():
+            return None
+
+        if self.args.start_fake:
+            self.start_fake_superset()
+
+        print(f"🚀 {self.args.users} usuarios, ramp-up {self.args.ramp_up}s, "
+              f"{'duración ' + str(self.args.duration) + 's' if not self.args.iterations else str(self.args.iterations) + ' iteraciones'}")
+        users = [VirtualUser(i, self, login, password) for i, (login, password) in enumerate(self.credentials())]
+        started = time.perf_counter()
+        for user in users:
+            user.start()
+
+        deadline = started + self.args.duration if not self.args.iterations else None
+        try:
+            while any(user.is_alive() for user in users):
+                if deadline and time.perf_counter() >= deadline:
+                    self.stop_event.set()
+                time.sleep(0.2)
+        except KeyboardInterrupt:
+            print("\n⏹️ Interrumpido: esperando a que terminen las peticiones en curso...")
+            self.stop_event.set()
+            for user in users:
+                user.join(self.args.timeout)
+        wall_time = time.perf_counter() - started
+
+        report = {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'odoo_url': self.args.odoo_url,
+            'users': self.args.users,
+            'wall_time_s': round(wall_time, 2),
+            'scenarios': self.stats.report(wall_time),
+        }
+        if self.fake:
+            report['superset'] = {
+                'calls': dict(self.fake.calls),
+                'max_concurrency': self.fake.max_concurrency,
+            }
+            self.fake.stop()
+        return report
+
+
+def print_report(report):
+    print("\n" + "=" * 100)
+    print(f"📋 RESULTADOS ({report['users']} usuarios, {report['wall_time_s']}s)")
+    print("=" * 100)
+    print(f"{'Escenario':<22}{'Peticiones':>11}{'req/s':>9}{'p50 ms':>10}{'p95 ms':>10}"
+          f"{'p99 ms':>10}{'máx ms':>10}{'errores':>10}")
+    for scenario, stats in report['scenarios'].items():
+        print(f"{scenario:<22}{stats['requests']:>11}{stats['throughput_rps']:>9}{stats['p50_ms']:>10}"
+              f"{stats['p95_ms']:>10}{stats['p99_ms']:>10}{stats['max_ms']:>10}{stats['error_rate']:>10.1%}")
+    for scenario, stats in report['scenarios'].items():
+        if stats['errors']:
+            print(f"   ❌ {scenario}: {stats['errors']}")
+    if 'superset' in report:
+        print(f"\n🧪 Superset: {report['superset']['calls']} | "
+              f"concurrencia máxima {report['superset']['max_concurrency']}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Pruebas de carga del hub de Superset con usuarios concurrentes')
+    parser.add_argument('odoo_url', nargs='?', default=ODOO_BASE_URL)
+    parser.add_argument('db', nargs='?', default=DB_NAME)
+    parser.add_argument('--users', type=int, default=10, help='Usuarios virtuales concurrentes')
+    parser.add_argument('--user', action='append', metavar='LOGIN:PASSWORD',
+                        help='Credenciales (repetible, se reparten entre usuarios; default admin:admin)')
+    parser.add_argument('--duration', type=float, default=60, help='Duración de la prueba en segundos')
+    parser.add_argument('--iterations', type=int, default=0,
+                        help='Cambios de dashboard por usuario (sustituye a --duration)')
+    parser.add_argument('--refreshes', type=int, default=1, help='Refrescos de guest token por cambio')
+    parser.add_argument('--ramp-up', type=float, default=5, help='Segundos para arrancar todos los usuarios')
+    parser.add_argument('--think-time', type=float, default=0.5, help='Pausa media entre acciones (s)')
+    parser.add_argument('--timeout', type=float, default=60, help='Timeout HTTP del cliente (s)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--report', help='Guardar el informe en JSON')
+
+    fake = parser.add_argument_group('Superset falso')
+    fake.add_argument('--start-fake', action='store_true',
+                      help='Levantar tests/fake_superset.py y configurar Odoo para usarlo')
+    fake.add_argument('--fake-host', default='127.0.0.1')
+    fake.add_argument('--fake-port', type=int, default=8088)
+    fake.add_argument('--fake-public-url', help='URL del Superset falso vista desde Odoo (p. ej. en Docker)')
+    fake.add_argument('--dashboards', type=int, default=50)
+    fake.add_argument('--fake-latency', type=float, default=0.05, help='Latencia por petición (s)')
+    fake.add_argument('--fake-error-rate', type=float, default=0.0, help='Probabilidad de HTTP 500 (0-1)')
+    fake.add_argument('--superset-timeout', type=int, default=30)
+    return parser.parse_args(argv)
+
+
+def main():
+    args = parse_args()
+    report = LoadRunner(args).run()
+    if report is None:
+        sys.exit(1)
+
+    print_report(report)
+    if args.report:
+        with open(args.report, 'w') as report_file:
+            json.dump(report, report_file, indent=2)
+        print(f"\n📄 Informe guardado en {os.path.abspath(args.report)}")
+
+    error_rates = [stats['error_rate'] for stats in report['scenarios'].values()]
+    sys.exit(1 if not error_rates or max(error_rates) > 0.05 else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,11 @@
 # -*- coding: utf-8 -*-
+from . import superset_connection
 from . import superset_utils
+from . import superset_chart_warmup
+from . import superset_call_log
+from . import superset_health_status
 from . import res_config_settings
-from . import superset_analytics_hub
\ No newline at end of file
+from . import superset_hub_user_state
+from . import superset_dashboard_usage
+from . import superset_analytics_hub
+from . import ir_websocket
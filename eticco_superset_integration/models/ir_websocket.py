@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+import re
+
+from odoo import models
+from odoo.http import request
+from odoo.addons.bus.websocket import wsrequest
+
+from .superset_bus import bus_channel
+
+
+class IrWebsocket(models.AbstractModel):
+    """Suscribir a los usuarios de Superset al canal de avisos de su conexión"""
+    _inherit = 'ir.websocket'
+
+    def _superset_active_company(self):
+        """Empresa activa del cliente web: la primera de ``allowed_company_ids``
+
+        El websocket no recibe el contexto de la pestaña, así que se lee de la
+        cookie ``cids`` que mantiene el selector de empresas. Solo se aceptan
+        empresas permitidas al usuario; si no hay ninguna, su empresa por defecto.
+        """
+        company_ids = self.env.context.get('allowed_company_ids')
+        req = request or wsrequest
+        if not company_ids and req and getattr(req, 'httprequest', None):
+            cids = req.httprequest.cookies.get('cids') or ''
+            company_ids = [int(cid) for cid in re.split(r'[,-]', cids) if cid.isdigit()]
+        for company_id in company_ids or []:
+            if company_id in self.env.user.company_ids.ids:
+                return self.env['res.company'].browse(company_id)
+        return self.env.user.company_id
+
+    def _build_bus_channel_list(self, channels):
+        channels = super()._build_bus_channel_list(channels)
+        if self.env.uid and self.env.user.has_group('eticco_superset_integration.group_superset_user'):
+            utils = self.env['superset.utils'].with_company(self._superset_active_company())
+            channels = list(channels) + [bus_channel(utils._connection_key())]
+        return channels
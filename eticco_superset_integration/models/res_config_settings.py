@@ -4,6 +4,12 @@ from odoo.exceptions import ValidationError, UserError
 import requests
 import logging
 import re
+import time
+
+from .superset_utils import SupersetAPIError
+from .superset_metrics import METRICS
+from .superset_adaptive_timeout import ADAPTIVE_TIMEOUTS
+from .superset_profiling import PROFILE_PREFIX, PROFILE_RES_MODEL
 
 _logger = logging.getLogger(__name__)
 
@@ -18,6 +24,14 @@ class ResConfigSettings(models.TransientModel):
         default='http://localhost:8088',
         help='URL base del servidor Superset (ej: http://localhost:8088)'
     )
+
+    superset_node_urls = fields.Char(
+        string='Nodos Adicionales',
+        config_parameter='superset.node_urls',
+        help='Otros nodos web de Superset, separados por comas: URL de la API y opcionalmente el '
+             'dominio público para el navegador (ej: http://10.0.0.12:8088 https://bi2.example.com). '
+             'Las llamadas se reparten por latencia y pasan a otro nodo si uno no responde'
+    )
    
     superset_username = fields.Char(
         string='Usuario',
@@ -37,7 +51,37 @@ class ResConfigSettings(models.TransientModel):
         string='Timeout (segundos)',
         config_parameter='superset.timeout',
         default=30,
-        help='Timeout para conexiones con Superset'
+        help='Timeout de lectura de cada llamada a Superset'
+    )
+
+    superset_connect_timeout = fields.Integer(
+        string='Timeout de Conexión (segundos)',
+        config_parameter='superset.connect_timeout',
+        default=5,
+        help='Tiempo máximo para establecer la conexión TCP/TLS con Superset'
+    )
+
+    superset_adaptive_timeouts = fields.Boolean(
+        string='Timeouts Adaptativos',
+        config_parameter='superset.adaptive_timeouts',
+        default=True,
+        help='Ajustar el timeout de cada endpoint a su latencia observada (media + 4 desviaciones), '
+             'con el timeout configurado como máximo'
+    )
+
+    superset_budget_interactive = fields.Integer(
+        string='Presupuesto Hub (segundos)',
+        config_parameter='superset.budget_interactive',
+        default=20,
+        help='Tiempo total máximo de una acción del hub (login, listado, embedding y guest token). '
+             'Cada paso recibe lo que queda: es el tope de espera del usuario antes de ver un error'
+    )
+
+    superset_budget_cron = fields.Integer(
+        string='Presupuesto Crons (segundos)',
+        config_parameter='superset.budget_cron',
+        default=600,
+        help='Tiempo total máximo de las sincronizaciones programadas y refrescos en segundo plano'
     )
    
     # Configuración del menú
@@ -63,19 +107,134 @@ class ResConfigSettings(models.TransientModel):
         help='Activar logging detallado para debugging'
     )
    
+    superset_profile_sample_rate = fields.Float(
+        string='Muestreo de Perfilado',
+        config_parameter='superset.profile_sample_rate',
+        default=0.0,
+        help='Fracción (0-1) de llamadas a los puntos de entrada del hub que se perfilan con cProfile '
+             'mientras el modo debug está activo. 0 desactiva el perfilado'
+    )
+
     superset_cache_tokens = fields.Boolean(
         string='Cache de Tokens',
         config_parameter='superset.cache_tokens',
         default=True,
         help='Cachear access tokens para mejorar performance'
     )
+
+    superset_thumbnails = fields.Boolean(
+        string='Miniaturas de Dashboards',
+        config_parameter='superset.thumbnails',
+        default=True,
+        help='Cachear miniaturas de Superset para mostrarlas mientras carga el dashboard'
+    )
+
+    superset_warmup_concurrency = fields.Integer(
+        string='Concurrencia de Warm-up',
+        config_parameter='superset.warmup_concurrency',
+        default=4,
+        help='Peticiones simultáneas máximas al calentar la cache de charts de Superset'
+    )
    
+    superset_slow_call_threshold_ms = fields.Integer(
+        string='Umbral Llamada Lenta (ms)',
+        config_parameter='superset.slow_call_threshold_ms',
+        default=1000,
+        help='Las llamadas a Superset más lentas que este umbral, y todos los fallos, se guardan en el diario'
+    )
+
+    superset_call_log_retention_days = fields.Integer(
+        string='Retención Diario (días)',
+        config_parameter='superset.call_log_retention_days',
+        default=7,
+        help='Pasado este plazo las llamadas se agregan en percentiles horarios y se eliminan'
+    )
+
+    superset_circuit_failure_threshold = fields.Integer(
+        string='Fallos para Abrir Circuito',
+        config_parameter='superset.circuit_failure_threshold',
+        default=5,
+        help='Fallos de conexión, timeouts o HTTP 502/503/504 consecutivos tras los que se deja de '
+             'llamar a Superset. 0 desactiva el circuit breaker'
+    )
+
+    superset_circuit_reset_timeout = fields.Integer(
+        string='Reintento del Circuito (s)',
+        config_parameter='superset.circuit_reset_timeout',
+        default=30,
+        help='Segundos con el circuito abierto antes de probar /health de nuevo'
+    )
+
+    superset_retry_attempts = fields.Integer(
+        string='Intentos por Llamada',
+        config_parameter='superset.retry_attempts',
+        default=3,
+        help='Intentos de los GET y de la emisión de tokens ante errores de conexión o HTTP 502/503/504, '
+             'con espera exponencial aleatoria. 1 desactiva los reintentos'
+    )
+
+    superset_hedge_requests = fields.Boolean(
+        string='Peticiones de Cobertura',
+        config_parameter='superset.hedge_requests',
+        default=False,
+        help='Si un GET tarda más que el p95 observado del endpoint, lanzar un duplicado y usar '
+             'la primera respuesta. Consume el mismo presupuesto que los reintentos'
+    )
+
+    superset_rate_limit = fields.Float(
+        string='Llamadas por Segundo',
+        config_parameter='superset.rate_limit',
+        default=50,
+        help='Tasa máxima de llamadas a Superset (token bucket con ráfagas de 2 segundos). '
+             'Las acciones del hub tienen prioridad sobre crons y refrescos. 0 desactiva el límite'
+    )
+
+    superset_max_concurrency = fields.Integer(
+        string='Llamadas Simultáneas',
+        config_parameter='superset.max_concurrency',
+        default=8,
+        help='Llamadas a Superset en vuelo a la vez por proceso worker. 0 desactiva el límite'
+    )
+
+    superset_rate_limit_shared = fields.Boolean(
+        string='Límite Compartido entre Workers',
+        config_parameter='superset.rate_limit_shared',
+        default=False,
+        help='Compartir el token bucket entre todos los workers de la instancia (fichero en data_dir)'
+    )
+
+    superset_coalesce_requests = fields.Boolean(
+        string='Agrupar Peticiones Idénticas',
+        config_parameter='superset.coalesce_requests',
+        default=True,
+        help='Si un GET idéntico (URL, parámetros y token) ya está en curso en este worker, '
+             'esperar su respuesta en lugar de repetirlo'
+    )
+
+    superset_trace_exporter = fields.Selection([
+        ('log', 'Log estructurado (JSON)'),
+        ('otel', 'OpenTelemetry'),
+        ('none', 'Desactivado'),
+    ], string='Exportador de Trazas',
+        config_parameter='superset.trace_exporter',
+        default='log',
+        help='Destino de los spans de cada acción del hub. El ID de traza se envía siempre '
+             'a Superset en X-Request-ID/traceparent. OpenTelemetry requiere opentelemetry-api'
+    )
+
     # Campos informativos (solo lectura)
     superset_connection_status = fields.Char(
         string='Estado de Conexión',
         readonly=True,
         compute='_compute_connection_status'
     )
+
+    superset_health_summary = fields.Char(
+        string='Monitor de Salud',
+        readonly=True,
+        compute='_compute_connection_status',
+        help='Último resultado del monitor de salud (cron cada minuto)'
+    )
    
     superset_dashboards_count = fields.Integer(
         string='Dashboards Disponibles',
@@ -89,14 +248,36 @@ class ResConfigSettings(models.TransientModel):
         compute='_compute_dashboards_info'
     )
 
+    superset_metrics_summary = fields.Text(
+        string='Métricas de Llamadas',
+        readonly=True,
+        compute='_compute_metrics_summary',
+        help='Resumen de llamadas a Superset de este proceso. Detalle en /superset/metrics'
+    )
+
+    superset_adaptive_timeouts_summary = fields.Text(
+        string='Timeouts Aprendidos',
+        readonly=True,
+        compute='_compute_adaptive_timeouts_summary',
+        help='Timeout aplicado a cada endpoint según la latencia observada en este proceso'
+    )
+
     @api.depends('superset_url', 'superset_username', 'superset_password')
     def _compute_connection_status(self):
         """Calcular estado de conexión usando lógica centralizada"""
         for record in self:
             # Usar lógica unificada de superset_utils
             utils = self.env['superset.utils']
-            status = utils.get_system_status(force_refresh=False)
+            status = utils.get_monitored_status()
             record.superset_connection_status = status['connection_status']
+            if status.get('last_check'):
+                record.superset_health_summary = _('/health %(latency).0f ms · token %(token)s · comprobado hace %(age)s s') % {
+                    'latency': status.get('latency_ms') or 0.0,
+                    'token': _('válido') if status.get('token_valid') else _('no válido'),
+                    'age': int(time.time() - status['last_check']),
+                }
+            else:
+                record.superset_health_summary = False
 
     @api.depends('superset_url', 'superset_username', 'superset_password')
     def _compute_dashboards_info(self):
@@ -104,12 +285,59 @@ class ResConfigSettings(models.TransientModel):
         for record in self:
             # Usar lógica unificada de superset_utils
             utils = self.env['superset.utils']
-            status = utils.get_system_status(force_refresh=False)
+            status = utils.get_monitored_status()
             
             record.superset_dashboards_count = status.get('total_dashboards', 0)
             record.superset_embedding_count = status.get('with_embedding', 0)
 
 
+    def _compute_metrics_summary(self):
+        """Resumir métricas en proceso: llamadas por endpoint y aciertos de cache"""
+        summary = METRICS.summary()
+        lines = []
+        for endpoint, stats in sorted(summary['endpoints'].items()):
+            lines.append(_('%(endpoint)s: %(calls)s llamadas, %(errors)s errores, p50 %(p50).0f ms, p95 %(p95).0f ms') % {
+                'endpoint': endpoint,
+                'calls': stats['calls'],
+                'errors': stats['errors'],
+                'p50': stats['p50_ms'],
+                'p95': stats['p95_ms'],
+            })
+        for cache, stats in sorted(summary['caches'].items()):
+            total = stats['hit'] + stats['miss']
+            lines.append(_('Cache %(cache)s: %(ratio).0f%% aciertos (%(hit)s/%(total)s)') % {
+                'cache': cache,
+                'ratio': 100.0 * stats['hit'] / total if total else 0.0,
+                'hit': stats['hit'],
+                'total': total,
+            })
+        text = '\n'.join(lines) or _('Sin llamadas registradas todavía')
+        for record in self:
+            record.superset_metrics_summary = text
+
+    def _compute_adaptive_timeouts_summary(self):
+        """Resumir los timeouts aprendidos por URL de Superset y endpoint"""
+        for record in self:
+            ceiling = record.superset_timeout or 30
+            lines = []
+            for (url, endpoint), stats in sorted(ADAPTIVE_TIMEOUTS.summary(ceiling).items()):
+                if stats['learning']:
+                    lines.append(_('%(url)s %(endpoint)s: aprendiendo (%(samples)s muestras), timeout %(ceiling)s s') % {
+                        'url': url,
+                        'endpoint': endpoint,
+                        'samples': stats['samples'],
+                        'ceiling': ceiling,
+                    })
+                else:
+                    lines.append(_('%(url)s %(endpoint)s: timeout %(timeout).0f ms (media %(mean).0f ms ± %(deviation).0f ms)') % {
+                        'url': url,
+                        'endpoint': endpoint,
+                        'timeout': stats['timeout_ms'],
+                        'mean': stats['mean_ms'],
+                        'deviation': stats['deviation_ms'],
+                    })
+            record.superset_adaptive_timeouts_summary = '\n'.join(lines) or _('Sin llamadas registradas todavía')
+
     def test_superset_connection(self):
         """Probar conexión con Superset usando utilidades centralizadas"""
         self.ensure_one()
@@ -163,23 +391,11 @@ class ResConfigSettings(models.TransientModel):
             # Obtener token de acceso
             access_token = utils.get_access_token(config)
             
-            # Obtener dashboards usando directamente requests
-            import requests
-            dashboards_url = f"{config['url']}/api/v1/dashboard/"
-            params = {'q': '(page:0,page_size:100)'}
-            
-            response = requests.get(
-                dashboards_url,
-                params=params,
-                headers={'Authorization': f'Bearer {access_token}'},
-                timeout=config.get('timeout', 30)
-            )
-            
-            if response.status_code != 200:
-                raise UserError(_('Error obteniendo dashboards: HTTP %s') % response.status_code)
-                
-            data = response.json()
-            dashboards = data.get('result', [])
+            # Dashboards del catálogo cacheado (listado + embedding)
+            try:
+                dashboards = utils.get_dashboard_catalog(config, access_token)
+            except SupersetAPIError as api_error:
+                raise UserError(_('Error obteniendo dashboards: HTTP %s') % api_error.status_code)
             
             # Filtrar solo dashboards publicados
             published_dashboards = [d for d in dashboards if d.get('published')]
@@ -202,26 +418,11 @@ class ResConfigSettings(models.TransientModel):
             message_lines = ['Dashboards encontrados:', '']
             
             for dashboard in published_dashboards[:10]:  # Mostrar solo los primeros 10
-                # Verificar si tiene embedding habilitado
-                try:
-                    embedding_url = f"{config['url']}/api/v1/dashboard/{dashboard.get('id')}/embedded"
-                    embedding_response = requests.get(
-                        embedding_url,
-                        headers={'Authorization': f'Bearer {access_token}'},
-                        timeout=config.get('timeout', 30)
-                    )
-                    
-                    has_embedding = (embedding_response.status_code == 200 and 
-                                embedding_response.json().get('result', {}).get('uuid'))
-                    
-                    if has_embedding:
-                        embedding_count += 1
-                        embedding_status = "✅"
-                    else:
-                        embedding_status = "❌"
-                        
-                except Exception:
-                    embedding_status = "❓"  # Error verificando embedding
+                if dashboard.get('embedded_uuid'):
+                    embedding_count += 1
+                    embedding_status = "✅"
+                else:
+                    embedding_status = "❌"
                 
                 title = dashboard.get('dashboard_title', 'Sin título')
                 message_lines.append(f"{embedding_status} {title}")
@@ -331,6 +532,115 @@ class ResConfigSettings(models.TransientModel):
             }
         }
 
+    def action_view_connections(self):
+        """Abrir las conexiones a Superset asignadas por empresa"""
+        return self.env['ir.actions.act_window']._for_xml_id(
+            'eticco_superset_integration.action_superset_connection')
+
+    def action_view_chart_warmups(self):
+        """Abrir tiempos de warm-up por chart"""
+        return self.env['ir.actions.act_window']._for_xml_id(
+            'eticco_superset_integration.action_superset_chart_warmup')
+
+    def action_view_call_log(self):
+        """Abrir el diario de llamadas lentas o fallidas"""
+        self.env['superset.call.log']._flush_journal()
+        return self.env['ir.actions.act_window']._for_xml_id(
+            'eticco_superset_integration.action_superset_call_log')
+
+    def action_view_call_stats(self):
+        """Abrir los percentiles horarios agregados"""
+        return self.env['ir.actions.act_window']._for_xml_id(
+            'eticco_superset_integration.action_superset_call_stat')
+
+    def action_view_profiles(self):
+        """Abrir los perfiles cProfile guardados como adjuntos"""
+        return {
+            'type': 'ir.actions.act_window',
+            'name': _('Perfiles Superset'),
+            'res_model': 'ir.attachment',
+            'view_mode': 'tree,form',
+            'domain': [('res_model', '=', PROFILE_RES_MODEL), ('name', '=like', f'{PROFILE_PREFIX}%')],
+            'context': {'create': False},
+        }
+
+    def warm_up_superset_cache(self):
+        """Lanzar warm-up de todos los dashboards manualmente
+
+        Adelanta el cron de warm-up (presupuesto ``cron``, fuera de la petición)
+        en lugar de esperar a los charts desde el botón.
+        """
+        self.ensure_one()
+        utils = self.env['superset.utils']
+        cron = self.env.ref('eticco_superset_integration.ir_cron_superset_warm_up_dashboards', raise_if_not_found=False)
+        if not cron:
+            raise UserError(_('No se encuentra el cron de warm-up de Superset'))
+        cron.sudo()._trigger()
+        return utils.create_user_notification(
+            _('Warm-up en marcha'),
+            _('El cron calienta los dashboards en segundo plano; los tiempos aparecen en "Tiempos por Chart".'),
+            'info'
+        )
+
+    @api.constrains('superset_warmup_concurrency')
+    def _check_warmup_concurrency(self):
+        """Validar concurrencia de warm-up"""
+        for record in self:
+            if record.superset_warmup_concurrency and not 1 <= record.superset_warmup_concurrency <= 32:
+                raise ValidationError(_('La concurrencia de warm-up debe estar entre 1 y 32'))
+
+    @api.constrains('superset_profile_sample_rate')
+    def _check_profile_sample_rate(self):
+        """Validar fracción de muestreo del perfilado"""
+        for record in self:
+            if not 0.0 <= record.superset_profile_sample_rate <= 1.0:
+                raise ValidationError(_('El muestreo de perfilado debe estar entre 0 y 1'))
+
+    @api.constrains('superset_slow_call_threshold_ms', 'superset_call_log_retention_days')
+    def _check_call_log_settings(self):
+        """Validar umbral y retención del diario de llamadas"""
+        for record in self:
+            if record.superset_slow_call_threshold_ms < 0:
+                raise ValidationError(_('El umbral de llamada lenta no puede ser negativo'))
+            if record.superset_call_log_retention_days < 1:
+                raise ValidationError(_('La retención del diario debe ser de al menos 1 día'))
+
+    @api.constrains('superset_connect_timeout', 'superset_budget_interactive', 'superset_budget_cron')
+    def _check_deadline_budgets(self):
+        """Validar timeout de conexión y presupuestos por flujo"""
+        for record in self:
+            if record.superset_connect_timeout and not 1 <= record.superset_connect_timeout <= 60:
+                raise ValidationError(_('El timeout de conexión debe estar entre 1 y 60 segundos'))
+            if record.superset_budget_interactive and record.superset_budget_interactive < 1:
+                raise ValidationError(_('El presupuesto del hub debe ser de al menos 1 segundo'))
+            if record.superset_budget_cron and record.superset_budget_cron < record.superset_budget_interactive:
+                raise ValidationError(_('El presupuesto de los crons no puede ser menor que el del hub'))
+
+    @api.constrains('superset_circuit_failure_threshold', 'superset_circuit_reset_timeout')
+    def _check_circuit_breaker(self):
+        """Validar parámetros del circuit breaker"""
+        for record in self:
+            if record.superset_circuit_failure_threshold < 0:
+                raise ValidationError(_('El número de fallos para abrir el circuito no puede ser negativo'))
+            if record.superset_circuit_reset_timeout < 1:
+                raise ValidationError(_('El reintento del circuito debe ser de al menos 1 segundo'))
+
+    @api.constrains('superset_rate_limit', 'superset_max_concurrency')
+    def _check_rate_limit(self):
+        """Validar límites de llamadas salientes"""
+        for record in self:
+            if record.superset_rate_limit < 0:
+                raise ValidationError(_('Las llamadas por segundo no pueden ser negativas'))
+            if record.superset_max_concurrency < 0:
+                raise ValidationError(_('Las llamadas simultáneas no pueden ser negativas'))
+
+    @api.constrains('superset_retry_attempts')
+    def _check_retry_attempts(self):
+        """Validar número de intentos por llamada"""
+        for record in self:
+            if not 1 <= record.superset_retry_attempts <= 5:
+                raise ValidationError(_('Los intentos por llamada deben estar entre 1 y 5'))
+
     @api.constrains('superset_url')
     def _check_superset_url(self):
         """Validar formato de URL"""
@@ -343,6 +653,15 @@ class ResConfigSettings(models.TransientModel):
                 if ' ' in record.superset_url:
                     raise ValidationError(_('La URL no puede contener espacios'))
 
+    @api.constrains('superset_node_urls')
+    def _check_superset_node_urls(self):
+        """Validar formato de los nodos adicionales"""
+        for record in self:
+            for line in (record.superset_node_urls or '').split(','):
+                for url in line.split():
+                    if not url.startswith(('http://', 'https://')):
+                        raise ValidationError(_('Cada nodo debe empezar con http:// o https://: %s') % url)
+
     @api.constrains('superset_timeout')
     def _check_timeout(self):
         """Validar timeout"""
@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+"""
+Timeouts adaptativos por endpoint aprendidos de la latencia observada
+
+Para cada URL de Superset (cada nodo de cada conexión) y endpoint se mantiene una media móvil exponencial (EWMA) de la
+latencia y de su desviación, como el RTO de TCP: ``timeout = media + 4 ·
+desviación``, nunca por debajo de ``ADAPTIVE_TIMEOUT_FLOOR`` ni por encima del
+``superset.timeout`` configurado. Así ``/health`` falla en milisegundos si
+Superset se cuelga mientras el listado de dashboards conserva el margen que
+necesita.
+
+Hasta reunir ``ADAPTIVE_MIN_SAMPLES`` respuestas se usa el timeout
+configurado. Cada timeout agotado duplica el del endpoint (backoff) hasta la
+siguiente respuesta, para no cortar una y otra vez un endpoint que se ha
+vuelto más lento. Las estimaciones son por proceso worker y una conexión lenta
+no alarga ni acorta los timeouts de las demás.
+"""
+import threading
+
+# Pesos de la EWMA (los de TCP: 1/8 para la media y 1/4 para la desviación)
+ADAPTIVE_ALPHA = 0.125
+ADAPTIVE_BETA = 0.25
+ADAPTIVE_DEVIATIONS = 4
+ADAPTIVE_MIN_SAMPLES = 10
+# Ningún timeout aprendido baja de este valor (segundos)
+ADAPTIVE_TIMEOUT_FLOOR = 0.25
+ADAPTIVE_MAX_BACKOFF = 8
+
+
+class LatencyEstimate:
+    """Media y desviación móviles de la latencia de un endpoint"""
+
+    __slots__ = ('mean', 'deviation', 'samples', 'backoff')
+
+    def __init__(self):
+        self.mean = 0.0
+        self.deviation = 0.0
+        self.samples = 0
+        self.backoff = 1
+
+    def observe(self, duration):
+        if not self.samples:
+            self.mean = duration
+            self.deviation = duration / 2
+        else:
+            self.deviation += ADAPTIVE_BETA * (abs(duration - self.mean) - self.deviation)
+            self.mean += ADAPTIVE_ALPHA * (duration - self.mean)
+        self.samples += 1
+        self.backoff = 1
+
+    def timeout(self):
+        """Timeout aprendido en segundos, sin acotar por el configurado"""
+        learned = max(ADAPTIVE_TIMEOUT_FLOOR, self.mean + ADAPTIVE_DEVIATIONS * self.deviation)
+        return learned * self.backoff
+
+
+class AdaptiveTimeouts:
+    """Estimaciones de latencia por (URL, endpoint) compartidas por los hilos del proceso"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.estimates = {}
+
+    def reset(self):
+        with self._lock:
+            self.estimates = {}
+
+    def observe(self, url, endpoint, duration):
+        """Registrar la latencia de una respuesta recibida (cualquier código HTTP)"""
+        with self._lock:
+            estimate = self.estimates.get((url, endpoint))
+            if estimate is None:
+                estimate = self.estimates[(url, endpoint)] = LatencyEstimate()
+            estimate.observe(duration)
+
+    def record_timeout(self, url, endpoint):
+        """Timeout agotado: duplicar el timeout del endpoint hasta la próxima respuesta"""
+        with self._lock:
+            estimate = self.estimates.get((url, endpoint))
+            if estimate is not None:
+                estimate.backoff = min(ADAPTIVE_MAX_BACKOFF, estimate.backoff * 2)
+
+    def timeout_for(self, url, endpoint, ceiling):
+        """Timeout a aplicar: el aprendido acotado por ``ceiling``, o ``ceiling`` sin muestras suficientes"""
+        with self._lock:
+            estimate = self.estimates.get((url, endpoint))
+            if estimate is None or estimate.samples < ADAPTIVE_MIN_SAMPLES:
+                return ceiling
+            return min(ceiling, estimate.timeout())
+
+    def summary(self, ceiling):
+        """Valores aprendidos por (URL, endpoint) para mostrar en Settings"""
+        with self._lock:
+            return {
+                key: {
+                    'samples': estimate.samples,
+                    'mean_ms': estimate.mean * 1000,
+                    'deviation_ms': estimate.deviation * 1000,
+                    'timeout_ms': min(ceiling, estimate.timeout()) * 1000,
+                    'learning': estimate.samples < ADAPTIVE_MIN_SAMPLES,
+                }
+                for key, estimate in self.estimates.items()
+            }
+
+
+ADAPTIVE_TIMEOUTS = AdaptiveTimeouts()
@@ -3,9 +3,240 @@ from odoo import models, fields, api, _
 from odoo.exceptions import ValidationError, UserError
 import requests
 import logging
+import uuid
+
+from .superset_utils import superset_request, SupersetAPIError, EP_GUEST_TOKEN
+from .superset_tracing import traced, trace_span
+from .superset_profiling import profiled
+from .superset_deadline import with_deadline, bind_deadline
+from .superset_hub_user_state import USER_STATE_FIELDS
+from .superset_search import SEARCH_PAGE_SIZE, SEARCH_MAX_PAGE_SIZE
+from .superset_bus import BUS_DASHBOARD_DATA, BUS_STATUS_FIELDS, dashboard_row
 
 _logger = logging.getLogger(__name__)
 
+CONNECTION_ERROR_PAYLOAD = {
+    'error': 'Servidor no disponible',
+    'error_type': 'connection_error',
+    'user_message': 'No se puede conectar al servidor de Superset. Verifica que esté en línea y accesible.',
+    'action_required': 'check_server'
+}
+
+# Opciones del selector que viajan en fields_get (las más usadas); el resto se busca con search_dashboards
+SELECTION_PAYLOAD_LIMIT = 20
+
+# Opción mientras se construye el primer catálogo en segundo plano (aviso ``superset_catalog_ready``)
+CATALOG_LOADING_OPTION = ('no_dashboards', '⏳ Cargando dashboards de Superset...')
+
+
+def fetch_dashboard_payload(utils, config, dashboard_uuid, show_details=False):
+    """E/S del embedding de ``dashboard_uuid``: login, catálogo, embedded y guest token
+
+    Solo HTTP y cache en memoria, sin ORM: se ejecuta fuera de la transacción
+    (``run_detached``). Devuelve el payload del widget, de éxito o de error.
+    """
+    try:
+        # Obtener token con manejo de errores específicos
+        try:
+            with trace_span('superset.login'):
+                access_token = utils.get_access_token(config)
+        except Exception as auth_error:
+            error_msg = str(auth_error)
+            if '401' in error_msg or 'Unauthorized' in error_msg:
+                return {
+                    'error': 'Credenciales incorrectas o expiradas',
+                    'error_type': 'auth_error',
+                    'user_message': 'Las credenciales de Superset han caducado o son incorrectas. Verifica la configuración en Ajustes.',
+                    'action_required': 'check_credentials'
+                }
+            elif '403' in error_msg or 'Forbidden' in error_msg:
+                return {
+                    'error': 'Sin permisos suficientes',
+                    'error_type': 'permission_error',
+                    'user_message': 'El usuario no tiene permisos para acceder a Superset. Contacta al administrador.',
+                    'action_required': 'contact_admin'
+                }
+            else:
+                return {
+                    'error': 'Error de autenticación',
+                    'error_type': 'auth_error', 
+                    'user_message': 'No se pudo autenticar con Superset. Verifica que el servidor esté funcionando.',
+                    'action_required': 'check_connection'
+                }
+            
+        # Buscar el dashboard en el catálogo cacheado con manejo de errores de conectividad
+        list_status = 200
+        try:
+            catalog = utils.get_dashboard_catalog(config, access_token)
+        except SupersetAPIError as api_error:
+            if not api_error.status_code:
+                raise
+            list_status = api_error.status_code
+        except requests.exceptions.ConnectionError:
+            return dict(CONNECTION_ERROR_PAYLOAD)
+        except requests.exceptions.Timeout:
+            return {
+                'error': 'Timeout de conexión',
+                'error_type': 'timeout_error',
+                'user_message': 'El servidor de Superset no responde. El servidor puede estar sobrecargado.',
+                'action_required': 'retry_later'
+            }
+        except requests.exceptions.RequestException as req_error:
+            return {
+                'error': 'Error de red',
+                'error_type': 'network_error',
+                'user_message': f'Error de conectividad: {str(req_error)[:100]}...',
+                'action_required': 'check_network'
+            }
+            
+        if list_status == 401:
+            return {
+                'error': 'Token expirado',
+                'error_type': 'token_expired',
+                'user_message': 'La sesión ha caducado. Intenta recargar la página.',
+                'action_required': 'refresh_page'
+            }
+        elif list_status == 403:
+            return {
+                'error': 'Sin permisos',
+                'error_type': 'permission_denied',
+                'user_message': 'Sin permisos para acceder a los dashboards. Contacta al administrador.',
+                'action_required': 'contact_admin'
+            }
+        elif list_status == 500:
+            return {
+                'error': 'Error del servidor',
+                'error_type': 'server_error',
+                'user_message': 'Error interno del servidor de Superset. Intenta más tarde.',
+                'action_required': 'retry_later'
+            }
+        elif list_status != 200:
+            return {
+                'error': f'Error HTTP {list_status}',
+                'error_type': 'http_error',
+                'user_message': f'El servidor respondió con error {list_status}. Intenta más tarde.',
+                'action_required': 'retry_later'
+            }
+            
+        # Buscar el dashboard por UUID
+        dashboard = next((d for d in catalog if d.get('uuid') == dashboard_uuid), None)
+                    
+        if not dashboard:
+            return {
+                'error': 'Dashboard no encontrado',
+                'error_type': 'dashboard_not_found',
+                'user_message': 'El dashboard seleccionado ya no existe o no es accesible.',
+                'action_required': 'select_different'
+            }
+            
+        # Embedding UUID del catálogo (bajo demanda si el dashboard no está publicado)
+        try:
+            dashboard = utils.get_catalog_dashboard(dashboard_uuid, config, access_token)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as conn_error:
+            return {
+                'error': 'Error verificando embedding',
+                'error_type': 'embedding_check_error',
+                'user_message': 'No se pudo verificar si el dashboard tiene embedding habilitado.',
+                'action_required': 'retry'
+            }
+            
+        embedding_uuid = dashboard.get('embedded_uuid') if dashboard else None
+            
+        if not embedding_uuid:
+            return {
+                'error': 'Dashboard sin embedding',
+                'error_type': 'embedding_disabled',
+                'user_message': 'Este dashboard no tiene embedding habilitado. Contacta al administrador.',
+                'action_required': 'contact_admin'
+            }
+            
+        # Generar guest token con manejo de errores
+        guest_data = {
+            'user': {
+                'username': 'guest_user',
+                'first_name': 'Guest',
+                'last_name': 'User'
+            },
+            'resources': [{
+                'type': 'dashboard',
+                'id': embedding_uuid
+            }],
+            'rls': []
+        }
+            
+        try:
+            token_response = superset_request(
+                'post', config, '/api/v1/security/guest_token/', EP_GUEST_TOKEN,
+                access_token=access_token,
+                json=guest_data,
+                headers={'Content-Type': 'application/json'},
+                retry=True,
+            )
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+            return {
+                'error': 'Error generando token de acceso',
+                'error_type': 'guest_token_error',
+                'user_message': 'No se pudo generar el token de acceso. El servidor puede estar sobrecargado.',
+                'action_required': 'retry_later'
+            }
+            
+        if token_response.status_code != 200:
+            error_detail = ''
+            try:
+                error_data = token_response.json()
+                error_detail = error_data.get('message', '')
+            except:
+                error_detail = f'HTTP {token_response.status_code}'
+                
+            return {
+                'error': 'Error de autorización',
+                'error_type': 'guest_token_failed',
+                'user_message': f'No se pudo autorizar el acceso al dashboard: {error_detail}',
+                'action_required': 'contact_admin'
+            }
+            
+        guest_token = token_response.json().get('token')
+            
+        if not guest_token:
+            return {
+                'error': 'Token de acceso inválido',
+                'error_type': 'invalid_guest_token',
+                'user_message': 'No se pudo obtener un token válido para acceder al dashboard.',
+                'action_required': 'retry'
+            }
+            
+        return {
+            'embedding_uuid': embedding_uuid,
+            'guest_token': guest_token,
+            'superset_domain': utils.get_superset_domain(config),
+            'dashboard_title': dashboard.get('dashboard_title', 'Sin título'),
+            'dashboard_id': dashboard.get('id'),
+            'debug_mode': config.get('debug_mode', False),
+            'success': True
+        }
+            
+    except ValidationError as val_error:
+        return {
+            'error': 'Error de configuración',
+            'error_type': 'config_error',
+            'user_message': f'Configuración inválida: {str(val_error)}',
+            'action_required': 'check_config'
+        }
+    except Exception as e:
+        return unexpected_error_payload(e, show_details)
+
+
+def unexpected_error_payload(error, show_details=False):
+    """Payload de error inesperado (el detalle técnico solo para administradores)"""
+    _logger.error('Error inesperado obteniendo datos para JS: %s', str(error))
+    return {
+        'error': 'Error interno',
+        'error_type': 'unexpected_error',
+        'user_message': 'Ha ocurrido un error inesperado. Intenta recargar la página.',
+        'action_required': 'reload_page',
+        'technical_details': str(error) if show_details else None
+    }
+
 
 class SupersetAnalyticsHub(models.Model):
     """Hub principal de Analytics - Combina selección y visualización"""
@@ -19,25 +250,31 @@ class SupersetAnalyticsHub(models.Model):
         readonly=True
     )
    
+    # Estado por usuario: se guarda en superset.hub.user.state, no en la fila compartida del hub
     selected_dashboard = fields.Selection(
         selection='_get_dashboard_selection',
         string='Dashboard Activo',
+        compute='_compute_user_state',
+        inverse='_inverse_user_state',
         help='Dashboard que se está visualizando actualmente'
     )
    
     dashboard_loaded = fields.Boolean(
         string='Dashboard Cargado',
-        default=False,
+        compute='_compute_user_state',
+        inverse='_inverse_user_state',
         help='Indica si hay un dashboard cargado'
     )
     current_dashboard_id = fields.Integer(
         string='ID Dashboard',
-        readonly=True
+        compute='_compute_user_state',
+        inverse='_inverse_user_state'
     )
     
     current_embedding_uuid = fields.Char(
         string='Embedding UUID',
-        readonly=True  
+        compute='_compute_user_state',
+        inverse='_inverse_user_state'
     )
     
     current_dashboard_title = fields.Char(
@@ -62,71 +299,114 @@ class SupersetAnalyticsHub(models.Model):
         compute='_compute_system_status'
     )
 
+    @api.depends_context('uid')
+    def _compute_user_state(self):
+        """Leer el estado del usuario actual para todos los hubs en una consulta"""
+        states = self.env['superset.hub.user.state']._read_states(
+            [hub_id for hub_id in self.ids if hub_id], self.env.uid
+        )
+        for name in USER_STATE_FIELDS:
+            field = self._fields[name]
+            # Directo a cache, sin validar: una selección guardada puede no estar ya en el catálogo
+            self.env.cache.update(self, field, [
+                field.convert_to_cache(states.get(record.id, {}).get(name) or False, record, validate=False)
+                for record in self
+            ])
+
+    def _inverse_user_state(self):
+        for record in self:
+            record._write_user_state({name: record[name] for name in USER_STATE_FIELDS})
+
+    def write(self, vals):
+        """El estado por usuario se guarda sin tocar la fila del hub (ni write_date)"""
+        state_vals = {name: vals[name] for name in USER_STATE_FIELDS if name in vals}
+        if not state_vals:
+            return super().write(vals)
+
+        self.check_access_rights('write')
+        self.check_access_rule('write')
+        field = self._fields['selected_dashboard']
+        for record in self:
+            if state_vals.get('selected_dashboard'):
+                # Misma validación que un Selection almacenado ("Wrong value for ...")
+                field.convert_to_cache(state_vals['selected_dashboard'], record)
+            record._write_user_state(state_vals)
+
+        other_vals = {name: value for name, value in vals.items() if name not in state_vals}
+        return super().write(other_vals) if other_vals else True
+
+    def _write_user_state(self, vals):
+        """Upsert del estado del usuario actual, omitiendo los valores que no cambian
+
+        En registros nuevos (onchange) solo se actualiza la cache.
+        """
+        self.ensure_one()
+        if self.id:
+            current = self.env['superset.hub.user.state']._read_states([self.id], self.env.uid).get(self.id, {})
+            changed = {
+                name: value for name, value in vals.items()
+                if (value or False) != (current.get(name) or False)
+            }
+            if changed:
+                self.env['superset.hub.user.state']._upsert_state(self.id, self.env.uid, changed)
+                self.modified(list(changed))
+        # Actualizar la cache sin volver a pasar por write()
+        for name, value in vals.items():
+            field = self._fields[name]
+            self.env.cache.set(self, field, field.convert_to_cache(value, self, validate=False))
+
     @api.depends('selected_dashboard')
     def _compute_dashboard_info(self):
-        """Computar información del dashboard seleccionado"""
+        """Computar información del dashboard seleccionado (solo lectura del catálogo cacheado)"""
         for record in self:
-            if record.selected_dashboard and record.selected_dashboard not in ['no_config', 'no_dashboards', 'error']:
-                try:
-                    utils = self.env['superset.utils']
-                    config = utils.get_superset_config()
-                    utils.validate_config(config)
-                    access_token = utils.get_access_token(config)
-                    
-                    dashboards_url = f"{config['url']}/api/v1/dashboard/"
-                    params = {'q': '(page:0,page_size:100)'}
-                    
-                    response = requests.get(
-                        dashboards_url,
-                        params=params,
-                        headers={'Authorization': f'Bearer {access_token}'},
-                        timeout=config.get('timeout', 30)
-                    )
-                    
-                    if response.status_code == 200:
-                        data = response.json()
-                        dashboards = data.get('result', [])
-                        
-                        dashboard = next((d for d in dashboards if d.get('uuid') == record.selected_dashboard), None)
-                        
-                        if dashboard:
-                            record.current_dashboard_title = dashboard.get('dashboard_title', 'Sin título')
-                            record.current_dashboard_id = dashboard.get('id')
-                            
-                            try:
-                                embedding_url = f"{config['url']}/api/v1/dashboard/{dashboard.get('id')}/embedded"
-                                embedding_response = requests.get(
-                                    embedding_url,
-                                    headers={'Authorization': f'Bearer {access_token}'},
-                                    timeout=config.get('timeout', 30)
-                                )
-                                if embedding_response.status_code == 200:
-                                    embedding_data = embedding_response.json()
-                                    record.current_embedding_uuid = embedding_data.get('result', {}).get('uuid')
-                                else:
-                                    record.current_embedding_uuid = False
-                            except:
-                                record.current_embedding_uuid = False
-                                
-                            record.current_dashboard_info = f"""Título: {dashboard.get('dashboard_title', 'N/A')}
+            record.current_dashboard_title = ''
+            record.current_dashboard_info = ''
+            dashboard = record._get_selected_catalog_dashboard()
+            if dashboard:
+                record.current_dashboard_title = dashboard.get('dashboard_title', 'Sin título')
+                record.current_dashboard_info = f"""Título: {dashboard.get('dashboard_title', 'N/A')}
                                                     Descripción: {dashboard.get('description', 'Sin descripción')}
-                                                    Embedding: {'✅ Habilitado' if record.current_embedding_uuid else '❌ Deshabilitado'}
+                                                    Embedding: {'✅ Habilitado' if dashboard.get('embedded_uuid') else '❌ Deshabilitado'}
                                                     Propietarios: {', '.join([owner.get('username', '') for owner in dashboard.get('owners', [])])}"""
-                        else:
-                            record._reset_dashboard_info()
-                    else:
-                        record._reset_dashboard_info()
-                except Exception as e:
-                    _logger.error('Error obteniendo info dashboard: %s', str(e))
-                    record._reset_dashboard_info()
-            else:
-                record._reset_dashboard_info()
+
+    def _get_selected_catalog_dashboard(self):
+        """Dashboard del catálogo para la selección actual (None si no hay o no se encuentra)"""
+        self.ensure_one()
+        if not self.selected_dashboard or self.selected_dashboard in ['no_config', 'no_dashboards', 'error']:
+            return None
+        try:
+            utils = self.env['superset.utils']
+            config = utils.get_superset_config()
+            utils.validate_config(config)
+            # Catálogo cacheado: sin HTTP si está caliente
+            return utils.get_catalog_dashboard(self.selected_dashboard, config)
+        except SupersetAPIError:
+            return None
+        except Exception as e:
+            _logger.error('Error obteniendo info dashboard: %s', str(e))
+            return None
+
+    def _sync_dashboard_state(self):
+        """Corregir el ID y el embedding guardados del usuario según la selección actual
+
+        Lo llaman las acciones y el onchange que cambian o validan la
+        selección; los campos calculados solo leen.
+        """
+        self.ensure_one()
+        dashboard = self._get_selected_catalog_dashboard()
+        if dashboard:
+            self._write_user_state({
+                'current_dashboard_id': dashboard.get('id'),
+                'current_embedding_uuid': dashboard.get('embedded_uuid') or False,
+            })
+        else:
+            self._reset_dashboard_info()
+        return dashboard
 
     def _reset_dashboard_info(self):
         """Reset información del dashboard"""
         self.current_dashboard_title = ''
-        self.current_dashboard_id = False
-        self.current_embedding_uuid = False
+        self._write_user_state({'current_dashboard_id': False, 'current_embedding_uuid': False})
         self.current_dashboard_info = ''
 
     def _compute_system_status(self):
@@ -134,8 +414,8 @@ class SupersetAnalyticsHub(models.Model):
         for record in self:
             try:
                 utils = self.env['superset.utils']
-                # Usar método unificado sin forzar refresh (usa cache)
-                status = utils.get_system_status(force_refresh=False)
+                # Solo lee el estado del monitor de salud: nunca espera a Superset
+                status = utils.get_monitored_status()
                 
                 record.has_configuration = status.get('has_configuration', False)
                 record.available_dashboards_count = status.get('with_embedding', 0)
@@ -145,6 +425,7 @@ class SupersetAnalyticsHub(models.Model):
                 record.has_configuration = False
                 record.available_dashboards_count = 0
 
+    @profiled('hub._get_dashboard_selection')
     def _get_dashboard_selection(self):
         """Obtener opciones de dashboard disponibles"""
         try:
@@ -156,61 +437,41 @@ class SupersetAnalyticsHub(models.Model):
             
             try:
                 utils.validate_config(config)
-                access_token = utils.get_access_token(config)
-                
-                dashboards_url = f"{config['url']}/api/v1/dashboard/"
-                params = {'q': '(page:0,page_size:100)'}
-                
-                response = requests.get(
-                    dashboards_url,
-                    params=params,
-                    headers={'Authorization': f'Bearer {access_token}'},
-                    timeout=config.get('timeout', 30)
-                )
-                
-                if response.status_code != 200:
-                    return [('error', f'❌ Error HTTP: {response.status_code}')]
-                    
-                data = response.json()
-                dashboards = [d for d in data.get('result', []) if d.get('published')]
-                
-                if not dashboards:
-                    return [('no_dashboards', '❌ No hay dashboards publicados')]
                 
-                selection = []
-                
-                for dashboard in dashboards:
-                    try:
-                        embedding_url = f"{config['url']}/api/v1/dashboard/{dashboard.get('id')}/embedded"
-                        embedding_response = requests.get(
-                            embedding_url,
-                            headers={'Authorization': f'Bearer {access_token}'},
-                            timeout=config.get('timeout', 30)
-                        )
-                        
-                        embedding_enabled = False
-                        if embedding_response.status_code == 200:
-                            embedding_data = embedding_response.json()
-                            embedding_uuid = embedding_data.get('result', {}).get('uuid')
-                            embedding_enabled = bool(embedding_uuid)
-                        
-                        dashboard_title = dashboard.get('dashboard_title', 'Sin título')
-                        dashboard_uuid = dashboard.get('uuid')
-                        
-                        # SOLO añadir dashboards que tienen embedding habilitado
-                        if embedding_enabled:
-                            selection.append((dashboard_uuid, f"📊 {dashboard_title}"))
-                            
-                    except Exception as e:
-                        _logger.error('Error verificando embedding para dashboard %s: %s', 
-                                    dashboard.get('id'), str(e))
-                        # No añadir dashboards con errores al selector
+                # Catálogo cacheado: O(1) llamadas HTTP sea cual sea el número de dashboards.
+                # Con la cache vacía no se espera a Superset dentro de la transacción: el
+                # catálogo se construye en segundo plano y mientras tanto se usa el último
+                # que guardó el monitor de salud
+                try:
+                    catalog = utils.get_dashboard_catalog(config, wait=False)
+                except SupersetAPIError as api_error:
+                    if not api_error.status_code:
+                        raise
+                    return [('error', f'❌ Error HTTP: {api_error.status_code}')]
+
+                if catalog is None:
+                    snapshot = self.env['superset.health.status']._read_snapshot(config['url'])
+                    if not snapshot:
+                        return [CATALOG_LOADING_OPTION]
+                    selection = [(uuid, f"📊 {title or 'Sin título'}") for uuid, title in snapshot.items()]
+                else:
+                    dashboards = [d for d in catalog if d.get('published')]
+
+                    if not dashboards:
+                        return [('no_dashboards', '❌ No hay dashboards publicados')]
+
+                    # SOLO añadir dashboards que tienen embedding habilitado
+                    selection = [
+                        (dashboard.get('uuid'), f"📊 {dashboard.get('dashboard_title', 'Sin título')}")
+                        for dashboard in dashboards if dashboard.get('embedded_uuid')
+                    ]
                 
                 if not selection:
                     return [('no_dashboards', '❌ No hay dashboards con embedding disponibles')]
                     
-                # Ordenar por título (todos tienen embedding ya)
-                selection.sort(key=lambda x: x[1])
+                # Primero los más usados por el usuario, después por título
+                scores = self.env['superset.dashboard.usage'].sudo()._usage_scores(self.env.uid)
+                selection.sort(key=lambda x: (-scores.get(x[0], 0.0), x[1]))
                 return selection
                 
             except Exception as e:
@@ -221,6 +482,45 @@ class SupersetAnalyticsHub(models.Model):
             _logger.error('Error en _get_dashboard_selection: %s', str(e))
             return [('error', f'❌ Error: {str(e)[:50]}...')]
 
+    @api.model
+    def fields_get(self, allfields=None, attributes=None):
+        """Enviar al cliente solo las primeras opciones del selector
+
+        La validación de escrituras sigue usando la selección completa; el
+        widget busca el resto con ``search_dashboards``, así la carga de la
+        vista no crece con el catálogo.
+        """
+        res = super().fields_get(allfields, attributes)
+        description = res.get('selected_dashboard') or {}
+        if len(description.get('selection') or []) > SELECTION_PAYLOAD_LIMIT:
+            description['selection'] = description['selection'][:SELECTION_PAYLOAD_LIMIT]
+        return res
+
+    @traced('hub.search_dashboards')
+    @with_deadline('interactive')
+    @profiled('hub.search_dashboards')
+    def search_dashboards(self, query='', offset=0, limit=SEARCH_PAGE_SIZE):
+        """Página de dashboards del selector que coinciden con ``query`` (para JavaScript/OWL)"""
+        self.ensure_one()
+        offset = max(0, int(offset or 0))
+        limit = max(1, min(int(limit or SEARCH_PAGE_SIZE), SEARCH_MAX_PAGE_SIZE))
+        result = {'records': [], 'total': 0, 'offset': offset, 'limit': limit}
+        try:
+            utils = self.env['superset.utils']
+            config = utils.get_superset_config()
+            utils.validate_config(config)
+            usage = self.env['superset.dashboard.usage'].sudo()._usage_scores(self.env.uid)
+            # Solo espera a Superset si el catálogo está frío
+            dashboards, total = utils.search_dashboard_catalog(query, offset, limit, usage, config)
+        except (ValidationError, UserError, requests.exceptions.RequestException) as e:
+            _logger.error('Error buscando dashboards: %s', str(e))
+            result['error'] = str(e)[:200]
+            return result
+
+        result['total'] = total
+        result['records'] = [dashboard_row(dashboard) for dashboard in dashboards]
+        return result
+
     def _get_superset_config(self):
         """Obtener configuración de Superset"""
         return self.env['superset.utils'].get_superset_config()
@@ -230,6 +530,7 @@ class SupersetAnalyticsHub(models.Model):
         """Al cambiar dashboard, actualizar estado"""
         if self.selected_dashboard and self.selected_dashboard not in ['no_config', 'no_dashboards', 'error']:
             self.dashboard_loaded = True
+            self._sync_dashboard_state()
         else:
             self.dashboard_loaded = False
             self._reset_dashboard_info()
@@ -244,8 +545,8 @@ class SupersetAnalyticsHub(models.Model):
         try:
             utils = self.env['superset.utils']
             
-            # Refrescar información
-            self._compute_dashboard_info()
+            # Refrescar información (y el estado guardado si la selección quedó desfasada)
+            self._sync_dashboard_state()
             
             # Validar datos del dashboard
             dashboard_data = {
@@ -275,25 +576,31 @@ class SupersetAnalyticsHub(models.Model):
             _logger.error('Error inesperado cargando dashboard: %s', str(e))
             raise UserError(_(f'Error inesperado: {str(e)}'))
 
+    @traced('hub.action_refresh_dashboards')
+    @with_deadline('interactive')
     def action_refresh_dashboards(self):
-        """Refrescar lista de dashboards"""
+        """Refrescar lista de dashboards
+
+        Reconstruye el catálogo y pasa el monitor de salud, que publica por el
+        bus los cambios a todos los widgets abiertos (también a este): no hace
+        falta recargar la página.
+        """
         self.ensure_one()
         
         try:
-            # Limpiar selección actual
-            self.selected_dashboard = False
-            self.dashboard_loaded = False
-            self._reset_dashboard_info()
-            
-            return {
-                'type': 'ir.actions.client',
-                'tag': 'reload',
-            }
-            
+            utils = self.env['superset.utils']
+            config = utils.get_superset_config()
+            utils.validate_config(config)
+            utils.get_dashboard_catalog(config, force_refresh=True)
+            utils.check_health(config)
         except Exception as e:
             _logger.error('Error refrescando: %s', str(e))
             raise UserError(_(f'Error: {str(e)}'))
 
+        return utils.create_user_notification(
+            _('Dashboards actualizados'), _('La lista de dashboards se ha actualizado'), 'success'
+        )
+
     def action_open_settings(self):
         """Abrir configuración de Superset"""
         return {
@@ -318,241 +625,40 @@ class SupersetAnalyticsHub(models.Model):
             
         return f"/superset/dashboard/{self.current_dashboard_id}"
 
+    @traced('hub.get_dashboard_data_for_js')
+    @with_deadline('interactive')
+    @profiled('hub.get_dashboard_data_for_js')
     def get_dashboard_data_for_js(self):
         """Obtener datos del dashboard para JavaScript/OWL con manejo profesional de errores"""
         self.ensure_one()
-        
-        if not self.selected_dashboard or self.selected_dashboard in ['no_config', 'no_dashboards', 'error']:
+        return self._get_dashboard_data(self.selected_dashboard)
+
+    def _get_dashboard_data(self, dashboard_uuid):
+        """Datos de embedding y guest token de ``dashboard_uuid``
+
+        En la transacción solo se valida la selección, la configuración y el
+        circuito. Login, catálogo, embedded y guest token van fuera de ella
+        (``fetch_dashboard_payload`` en ``run_detached``): la RPC vuelve al
+        momento con ``{'pending': True, 'request_id'}`` y el resultado llega al
+        widget por el bus (``superset_dashboard_data``) tras guardarse el
+        estado del usuario en una transacción corta. En tests se devuelve el
+        payload directamente.
+        """
+        if not dashboard_uuid or dashboard_uuid in ['no_config', 'no_dashboards', 'error']:
             return {
                 'error': 'No hay dashboard seleccionado',
                 'error_type': 'selection_error',
                 'user_message': 'Selecciona un dashboard válido del menú desplegable'
             }
-            
+
         try:
-            # Obtener configuración
             utils = self.env['superset.utils']
             config = utils.get_superset_config()
             utils.validate_config(config)
-            
-            # Obtener token con manejo de errores específicos
-            try:
-                access_token = utils.get_access_token(config)
-            except Exception as auth_error:
-                error_msg = str(auth_error)
-                if '401' in error_msg or 'Unauthorized' in error_msg:
-                    return {
-                        'error': 'Credenciales incorrectas o expiradas',
-                        'error_type': 'auth_error',
-                        'user_message': 'Las credenciales de Superset han caducado o son incorrectas. Verifica la configuración en Ajustes.',
-                        'action_required': 'check_credentials'
-                    }
-                elif '403' in error_msg or 'Forbidden' in error_msg:
-                    return {
-                        'error': 'Sin permisos suficientes',
-                        'error_type': 'permission_error',
-                        'user_message': 'El usuario no tiene permisos para acceder a Superset. Contacta al administrador.',
-                        'action_required': 'contact_admin'
-                    }
-                else:
-                    return {
-                        'error': 'Error de autenticación',
-                        'error_type': 'auth_error', 
-                        'user_message': 'No se pudo autenticar con Superset. Verifica que el servidor esté funcionando.',
-                        'action_required': 'check_connection'
-                    }
-            
-            # Buscar el dashboard con manejo de errores de conectividad
-            dashboards_url = f"{config['url']}/api/v1/dashboard/"
-            params = {'q': '(page:0,page_size:100)'}
-            
-            try:
-                response = requests.get(
-                    dashboards_url,
-                    params=params,
-                    headers={'Authorization': f'Bearer {access_token}'},
-                    timeout=config.get('timeout', 30)
-                )
-            except requests.exceptions.ConnectionError:
-                return {
-                    'error': 'Servidor no disponible',
-                    'error_type': 'connection_error',
-                    'user_message': 'No se puede conectar al servidor de Superset. Verifica que esté en línea y accesible.',
-                    'action_required': 'check_server'
-                }
-            except requests.exceptions.Timeout:
-                return {
-                    'error': 'Timeout de conexión',
-                    'error_type': 'timeout_error',
-                    'user_message': 'El servidor de Superset no responde. El servidor puede estar sobrecargado.',
-                    'action_required': 'retry_later'
-                }
-            except requests.exceptions.RequestException as req_error:
-                return {
-                    'error': 'Error de red',
-                    'error_type': 'network_error',
-                    'user_message': f'Error de conectividad: {str(req_error)[:100]}...',
-                    'action_required': 'check_network'
-                }
-            
-            if response.status_code == 401:
-                return {
-                    'error': 'Token expirado',
-                    'error_type': 'token_expired',
-                    'user_message': 'La sesión ha caducado. Intenta recargar la página.',
-                    'action_required': 'refresh_page'
-                }
-            elif response.status_code == 403:
-                return {
-                    'error': 'Sin permisos',
-                    'error_type': 'permission_denied',
-                    'user_message': 'Sin permisos para acceder a los dashboards. Contacta al administrador.',
-                    'action_required': 'contact_admin'
-                }
-            elif response.status_code == 500:
-                return {
-                    'error': 'Error del servidor',
-                    'error_type': 'server_error',
-                    'user_message': 'Error interno del servidor de Superset. Intenta más tarde.',
-                    'action_required': 'retry_later'
-                }
-            elif response.status_code != 200:
-                return {
-                    'error': f'Error HTTP {response.status_code}',
-                    'error_type': 'http_error',
-                    'user_message': f'El servidor respondió con error {response.status_code}. Intenta más tarde.',
-                    'action_required': 'retry_later'
-                }
-            
-            data = response.json()
-            dashboards = data.get('result', [])
-            
-            # Buscar el dashboard por UUID
-            dashboard = None
-            for d in dashboards:
-                if d.get('uuid') == self.selected_dashboard:
-                    dashboard = d
-                    break
-                    
-            if not dashboard:
-                return {
-                    'error': 'Dashboard no encontrado',
-                    'error_type': 'dashboard_not_found',
-                    'user_message': 'El dashboard seleccionado ya no existe o no es accesible.',
-                    'action_required': 'select_different'
-                }
-            
-            # Obtener embedding UUID con manejo de errores
-            embedding_url = f"{config['url']}/api/v1/dashboard/{dashboard.get('id')}/embedded"
-            
-            try:
-                embedding_response = requests.get(
-                    embedding_url,
-                    headers={'Authorization': f'Bearer {access_token}'},
-                    timeout=config.get('timeout', 30)
-                )
-            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as conn_error:
-                return {
-                    'error': 'Error verificando embedding',
-                    'error_type': 'embedding_check_error',
-                    'user_message': 'No se pudo verificar si el dashboard tiene embedding habilitado.',
-                    'action_required': 'retry'
-                }
-            
-            if embedding_response.status_code != 200:
-                return {
-                    'error': 'Dashboard sin embedding',
-                    'error_type': 'embedding_disabled',
-                    'user_message': 'Este dashboard no tiene embedding habilitado. Contacta al administrador.',
-                    'action_required': 'contact_admin'
-                }
-            
-            embedding_data = embedding_response.json()
-            embedding_uuid = embedding_data.get('result', {}).get('uuid')
-            
-            if not embedding_uuid:
-                return {
-                    'error': 'UUID de embedding no disponible',
-                    'error_type': 'embedding_uuid_missing',
-                    'user_message': 'El dashboard no está correctamente configurado para embedding.',
-                    'action_required': 'contact_admin'
-                }
-            
-            # Actualizar campos del record
-            self.current_dashboard_id = dashboard.get('id')
-            self.current_dashboard_title = dashboard.get('dashboard_title', 'Sin título')
-            self.current_embedding_uuid = embedding_uuid
-            
-            # Generar guest token con manejo de errores
-            guest_token_url = f"{config['url']}/api/v1/security/guest_token/"
-            guest_data = {
-                'user': {
-                    'username': 'guest_user',
-                    'first_name': 'Guest',
-                    'last_name': 'User'
-                },
-                'resources': [{
-                    'type': 'dashboard',
-                    'id': embedding_uuid
-                }],
-                'rls': []
-            }
-            
-            try:
-                token_response = requests.post(
-                    guest_token_url,
-                    json=guest_data,
-                    headers={
-                        'Authorization': f'Bearer {access_token}',
-                        'Content-Type': 'application/json'
-                    },
-                    timeout=config.get('timeout', 30)
-                )
-            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
-                return {
-                    'error': 'Error generando token de acceso',
-                    'error_type': 'guest_token_error',
-                    'user_message': 'No se pudo generar el token de acceso. El servidor puede estar sobrecargado.',
-                    'action_required': 'retry_later'
-                }
-            
-            if token_response.status_code != 200:
-                error_detail = ''
-                try:
-                    error_data = token_response.json()
-                    error_detail = error_data.get('message', '')
-                except:
-                    error_detail = f'HTTP {token_response.status_code}'
-                
-                return {
-                    'error': 'Error de autorización',
-                    'error_type': 'guest_token_failed',
-                    'user_message': f'No se pudo autorizar el acceso al dashboard: {error_detail}',
-                    'action_required': 'contact_admin'
-                }
-            
-            guest_token = token_response.json().get('token')
-            
-            if not guest_token:
-                return {
-                    'error': 'Token de acceso inválido',
-                    'error_type': 'invalid_guest_token',
-                    'user_message': 'No se pudo obtener un token válido para acceder al dashboard.',
-                    'action_required': 'retry'
-                }
-            
-            self.dashboard_loaded = True
-            
-            return {
-                'embedding_uuid': embedding_uuid,
-                'guest_token': guest_token,
-                'superset_domain': config['url'],
-                'dashboard_title': dashboard.get('dashboard_title', 'Sin título'),
-                'dashboard_id': dashboard.get('id'),
-                'debug_mode': config.get('debug_mode', False),
-                'success': True
-            }
-            
+
+            # Backend marcado como caído por el circuit breaker: fallar sin esperar
+            if utils.get_circuit_state(config) == 'open':
+                return dict(CONNECTION_ERROR_PAYLOAD)
         except ValidationError as val_error:
             return {
                 'error': 'Error de configuración',
@@ -561,15 +667,82 @@ class SupersetAnalyticsHub(models.Model):
                 'action_required': 'check_config'
             }
         except Exception as e:
-            _logger.error('Error inesperado obteniendo datos para JS: %s', str(e))
-            return {
-                'error': 'Error interno',
-                'error_type': 'unexpected_error',
-                'user_message': 'Ha ocurrido un error inesperado. Intenta recargar la página.',
-                'action_required': 'reload_page',
-                'technical_details': str(e) if self.env.user.has_group('base.group_system') else None
-            }
+            return unexpected_error_payload(e, self.env.user.has_group('base.group_system'))
+
+        hub_id = self.id
+        request_id = uuid.uuid4().hex
+        show_details = self.env.user.has_group('base.group_system')
+        # El hilo sigue con el presupuesto de la acción interactiva que lo lanza
+        fetch = bind_deadline(
+            lambda utils, config: fetch_dashboard_payload(utils, config, dashboard_uuid, show_details))
+        payload = utils.run_detached(
+            fetch,
+            lambda utils, _config, payload: utils.env['superset.analytics.hub'].browse(hub_id)
+            ._apply_dashboard_payload(dashboard_uuid, payload, request_id),
+            'superset_dashboard_data',
+        )
+        if payload is None:
+            return {'pending': True, 'request_id': request_id, 'dashboard_uuid': dashboard_uuid}
+        return payload
 
+    def _apply_dashboard_payload(self, dashboard_uuid, payload, request_id):
+        """Transacción corta tras la E/S: estado del usuario y aviso al widget que lo pidió"""
+        if payload.get('success'):
+            # Una sola escritura del estado del usuario (ninguna si no ha cambiado)
+            self._write_user_state({
+                'dashboard_loaded': True,
+                'current_dashboard_id': payload.get('dashboard_id'),
+                'current_embedding_uuid': payload.get('embedding_uuid'),
+            })
+        self.env['bus.bus']._sendone(self.env.user.partner_id, BUS_DASHBOARD_DATA, {
+            'request_id': request_id,
+            'dashboard_uuid': dashboard_uuid,
+            'data': payload,
+        })
+        return payload
+
+    @traced('hub.warm_up_dashboard')
+    def warm_up_dashboard(self, dashboard_uuid=None):
+        """Encolar el calentamiento de charts al seleccionar un dashboard (vuelve sin esperar)"""
+        self.ensure_one()
+        dashboard_uuid = dashboard_uuid or self.selected_dashboard
+        if not dashboard_uuid or dashboard_uuid in ['no_config', 'no_dashboards', 'error']:
+            return {'queued': 0}
+
+        try:
+            return self.env['superset.utils'].schedule_dashboard_warmup([dashboard_uuid], trigger='select')
+        except Exception as e:
+            # El warm-up es best effort: nunca debe bloquear la carga del dashboard
+            _logger.debug('Error calentando dashboard %s: %s', dashboard_uuid, str(e))
+            return {'queued': 0}
+
+    def record_dashboard_open(self, dashboard_uuid, load_ms=None):
+        """Anotar que el usuario ha abierto un dashboard y cuánto tardó en cargar (para JavaScript/OWL)"""
+        self.ensure_one()
+        if not dashboard_uuid or dashboard_uuid in ['no_config', 'no_dashboards', 'error']:
+            return False
+        self.env['superset.dashboard.usage'].sudo()._record_open(dashboard_uuid, load_ms)
+        return True
+
+    def _preferred_dashboard(self, options):
+        """Dashboard que se abre al entrar: la selección guardada o el más usado entre ``options``"""
+        valid = [key for key, _label in options if key not in ['no_config', 'no_dashboards', 'error']]
+        if self.selected_dashboard in valid:
+            return self.selected_dashboard
+        if len(valid) == 1:
+            return valid[0]
+        scores = self.env['superset.dashboard.usage'].sudo()._usage_scores(self.env.uid)
+        # Las opciones ya vienen ordenadas por uso: el primero con historial
+        return next((key for key in valid if scores.get(key)), False)
+
+    def get_dashboard_thumbnails(self):
+        """Miniaturas cacheadas de los dashboards del selector (para JavaScript/OWL)"""
+        self.ensure_one()
+        return self.env['superset.utils'].get_thumbnail_urls()
+
+    @traced('hub.refresh_dashboard_options')
+    @with_deadline('interactive')
+    @profiled('hub.refresh_dashboard_options')
     def refresh_dashboard_options(self):
         """Refrescar opciones de dashboard (método público para llamadas desde JS)"""
         self.ensure_one()
@@ -589,38 +762,72 @@ class SupersetAnalyticsHub(models.Model):
             'options_refreshed': True,
             'available_options': valid_count,
             'has_configuration': self.has_configuration,
-            'configuration_status': 'configured' if self.has_configuration else 'missing'
+            'configuration_status': 'configured' if self.has_configuration else 'missing',
+            # Primer catálogo en construcción: el widget vuelve a pedir las opciones con el aviso del bus
+            'catalog_pending': options == [CATALOG_LOADING_OPTION],
         }
+
+        # Dashboard más probable del usuario con su guest token pedido ya:
+        # el widget lo monta sin otra llamada ni paso de selección
+        preferred = self._preferred_dashboard(options)
+        if preferred:
+            if preferred != self.selected_dashboard:
+                self._write_user_state({'selected_dashboard': preferred})
+            dashboard_data = self._get_dashboard_data(preferred)
+            result['preferred_dashboard'] = preferred
+            if dashboard_data.get('success'):
+                result['dashboard_data'] = dashboard_data
+            elif dashboard_data.get('pending'):
+                # Llega por el bus (``superset_dashboard_data``) sin retener la transacción
+                result['dashboard_request'] = dashboard_data
+        elif valid_count and self.selected_dashboard and self.selected_dashboard not in dict(options):
+            # Selección guardada que ya no está en el catálogo: se corrige aquí, no en el compute
+            self._write_user_state({'selected_dashboard': False, 'dashboard_loaded': False})
+            self._reset_dashboard_info()
         
         return result
 
+    @traced('hub.get_hub_status')
+    def get_hub_status(self):
+        """Estado del monitor de salud para el widget al montarse (sin HTTP a Superset)
+
+        Mismas claves que el aviso ``superset_status`` del bus. La comprobación
+        completa contra Superset solo se hace con una acción explícita del
+        usuario (**🔄 Actualizar**) o al guardar la configuración.
+        """
+        self.ensure_one()
+        status = self.env['superset.utils'].get_monitored_status()
+        return {key: status.get(key) for key in BUS_STATUS_FIELDS}
+
+    @traced('hub.force_refresh_configuration')
+    @with_deadline('interactive')
     def force_refresh_configuration(self):
-        """Método público para forzar recálculo completo desde configuración"""
+        """Método público para forzar la comprobación completa de Superset
+
+        La E/S (``/health``, token y catálogo reconstruido) va fuera de la
+        transacción (``run_detached``); el resultado se guarda en el monitor de
+        salud en una transacción corta y llega a los widgets por el bus.
+        """
         self.ensure_one()
-        
+        utils = self.env['superset.utils']
+
         try:
-            # Forzar recálculo completo con HTTP
-            utils = self.env['superset.utils']
-            status = utils.get_system_status(force_refresh=True)
-            
-            # Actualizar campos inmediatamente
-            self.has_configuration = status.get('has_configuration', False)
-            self.available_dashboards_count = status.get('with_embedding', 0)
-            
-            # Limpiar selección si no hay configuración válida
-            if not self.has_configuration:
-                self.selected_dashboard = False
-                self.dashboard_loaded = False
+            # Limpiar selección si no hay configuración válida (sin HTTP)
+            if not utils.is_configured():
+                self._write_user_state({'selected_dashboard': False, 'dashboard_loaded': False})
                 self._reset_dashboard_info()
-            
-            _logger.info(f"Configuración actualizada: has_configuration={self.has_configuration}, "
-                        f"dashboards_count={self.available_dashboards_count}")
-            
+                return {'type': 'ir.actions.client', 'tag': 'reload'}
+
+            utils.run_detached(
+                bind_deadline(lambda utils, config: utils._probe_superset(config, force_catalog=True)),
+                lambda utils, config, probe: utils._store_health(config, *probe),
+                'superset_force_refresh',
+            )
+            _logger.info('🔄 Comprobación completa de Superset lanzada para el hub')
+
         except Exception as e:
-            _logger.error('Error forzando refresh de configuración: %s', str(e))
-            self.has_configuration = False
-            self.available_dashboards_count = 0
-        
+            _logger.error('❌ Error recalculando el estado de Superset en el hub: %s', str(e))
+
         return {
             'type': 'ir.actions.client',
             'tag': 'reload',
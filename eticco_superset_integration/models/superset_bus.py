@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""
+Avisos a los widgets abiertos por el bus de Odoo (``bus.bus``)
+
+El monitor de salud compara en cada pasada el catálogo seleccionable y el
+estado con lo último que publicó y, si algo cambia, envía solo la
+diferencia al canal de la conexión. El widget del hub parchea su lista y su
+estado sin recargar la página ni consultar periódicamente.
+
+- ``superset_catalog_diff``: ``{'added': [fila], 'updated': [fila], 'removed': [uuid]}``
+  con filas como las de ``search_dashboards``.
+- ``superset_status``: estado del monitor (mismas claves que ``get_monitored_status``).
+- ``superset_catalog_ready``: ``{}`` cuando termina una construcción del catálogo
+  que una RPC del hub lanzó sin esperarla (cache vacía).
+- ``superset_dashboard_data``: ``{'request_id', 'dashboard_uuid', 'data'}`` con
+  los datos de embedding pedidos fuera de la transacción; va al partner del
+  usuario que los pidió, no al canal de la conexión.
+
+Cada usuario con acceso a Superset queda suscrito al canal de la conexión de
+su empresa desde ``ir.websocket``; el cliente no elige canales.
+"""
+BUS_CATALOG_DIFF = 'superset_catalog_diff'
+BUS_STATUS = 'superset_status'
+BUS_CATALOG_READY = 'superset_catalog_ready'
+BUS_DASHBOARD_DATA = 'superset_dashboard_data'
+
+# Claves del estado que se publican (las que muestran los widgets)
+BUS_STATUS_FIELDS = ('has_configuration', 'connection_status', 'total_dashboards', 'with_embedding', 'token_valid')
+# Columnas de ``superset.health.status`` cuyo cambio se publica (la latencia y la hora no)
+BUS_WATCHED_FIELDS = ('state', 'token_valid', 'last_error', 'total_dashboards', 'with_embedding')
+
+
+def bus_channel(connection_key):
+    """Canal del bus de los widgets que usan la conexión ``connection_key``"""
+    return f'superset_hub_{connection_key or "default"}'
+
+
+def dashboard_row(dashboard):
+    """Fila del selector para un dashboard del catálogo (misma forma que ``search_dashboards``)"""
+    return {
+        'id': dashboard.get('uuid'),
+        'title': dashboard.get('dashboard_title') or 'Sin título',
+        'tags': [tag.get('name') for tag in dashboard.get('tags') or [] if isinstance(tag, dict) and tag.get('name')],
+        'owners': [owner.get('username') for owner in dashboard.get('owners') or []
+                   if isinstance(owner, dict) and owner.get('username')],
+    }
+
+
+def catalog_snapshot(catalog):
+    """{uuid: título} de los dashboards seleccionables (publicados y con embedding)"""
+    return {
+        dashboard.get('uuid'): dashboard.get('dashboard_title') or ''
+        for dashboard in catalog
+        if dashboard.get('published') and dashboard.get('embedded_uuid') and dashboard.get('uuid')
+    }
+
+
+def catalog_diff(previous, catalog):
+    """Diferencia entre el último snapshot publicado y el catálogo actual (None si no hay cambios)"""
+    current = {
+        dashboard.get('uuid'): dashboard for dashboard in catalog
+        if dashboard.get('published') and dashboard.get('embedded_uuid') and dashboard.get('uuid')
+    }
+    diff = {
+        'added': [dashboard_row(d) for uuid, d in current.items() if uuid not in previous],
+        'updated': [dashboard_row(d) for uuid, d in current.items()
+                    if uuid in previous and previous[uuid] != (d.get('dashboard_title') or '')],
+        'removed': [uuid for uuid in previous if uuid not in current],
+    }
+    return diff if any(diff.values()) else None
@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+from odoo import models, fields, api, SUPERUSER_ID, _
+from datetime import datetime, timedelta
+from collections import deque
+import threading
+import time
+import logging
+
+_logger = logging.getLogger(__name__)
+
+# Volcado del buffer: por tamaño o por antigüedad de la entrada más vieja
+JOURNAL_FLUSH_SIZE = 50
+JOURNAL_FLUSH_AGE = 60
+# Límite de memoria por proceso si nadie vuelca el buffer (se descartan las más antiguas)
+JOURNAL_MAX_SIZE = 5000
+
+
+class CallJournal:
+    """Buffer en proceso de llamadas lentas o fallidas pendientes de guardar
+
+    ``superset_request`` solo añade entradas en memoria; la inserción en base de
+    datos se hace por lotes desde ``superset.call.log._flush_journal``.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = deque(maxlen=JOURNAL_MAX_SIZE)
+        self._oldest = None
+
+    def record(self, endpoint, method, status, duration, threshold_ms, stage=None, uid=None, trace_id=None):
+        """Añadir la llamada si supera el umbral (ms) o ha fallado"""
+        duration_ms = duration * 1000
+        status = str(status)
+        is_error = not status.isdigit() or int(status) >= 400
+        if not is_error and duration_ms < threshold_ms:
+            return False
+        entry = {
+            'called_at': datetime.utcnow().replace(microsecond=0),
+            'endpoint': endpoint,
+            'method': method.upper(),
+            'status': status,
+            'duration_ms': round(duration_ms, 1),
+            'is_error': is_error,
+            'stage': stage or False,
+            'user_id': uid or False,
+            'trace_id': trace_id or False,
+        }
+        with self._lock:
+            if not self._entries:
+                self._oldest = time.monotonic()
+            self._entries.append(entry)
+        return True
+
+    def is_due(self):
+        with self._lock:
+            return bool(self._entries) and (
+                len(self._entries) >= JOURNAL_FLUSH_SIZE
+                or time.monotonic() - self._oldest >= JOURNAL_FLUSH_AGE
+            )
+
+    def drain(self):
+        with self._lock:
+            entries = list(self._entries)
+            self._entries.clear()
+            self._oldest = None
+        return entries
+
+    def __len__(self):
+        return len(self._entries)
+
+
+CALL_JOURNAL = CallJournal()
+
+
+class SupersetCallLog(models.Model):
+    """Diario de llamadas a Superset lentas o fallidas"""
+    _name = 'superset.call.log'
+    _description = 'Llamada Lenta Superset'
+    _order = 'called_at desc, id desc'
+    _rec_name = 'endpoint'
+
+    called_at = fields.Datetime(string='Fecha', required=True, index=True)
+    endpoint = fields.Char(string='Endpoint', required=True, index=True)
+    method = fields.Char(string='Método')
+    status = fields.Char(string='Estado', help='Código HTTP, timeout o connection_error')
+    duration_ms = fields.Float(string='Duración (ms)', digits=(16, 0), group_operator='max')
+    is_error = fields.Boolean(string='Fallo')
+    stage = fields.Char(string='Etapa', help='Acción del hub o etapa en la que se hizo la llamada')
+    user_id = fields.Many2one('res.users', string='Usuario', ondelete='set null')
+    trace_id = fields.Char(string='ID de Traza')
+
+    @api.model
+    def _flush_journal_if_due(self):
+        """Volcar el buffer solo si ha alcanzado tamaño o antigüedad"""
+        if CALL_JOURNAL.is_due():
+            self._flush_journal()
+
+    @api.model
+    def _flush_journal(self):
+        """Insertar por lotes las entradas pendientes en un cursor propio
+
+        Se usa un cursor independiente para no perder el diario si la
+        transacción de la petición hace rollback (precisamente en los fallos).
+        """
+        entries = CALL_JOURNAL.drain()
+        if not entries:
+            return 0
+        try:
+            if getattr(threading.current_thread(), 'testing', False):
+                # En tests un cursor nuevo no vería (ni desharía) la transacción del test
+                self.sudo().create(entries)
+            else:
+                with self.env.registry.cursor() as cr:
+                    env = api.Environment(cr, SUPERUSER_ID, {})
+                    env['superset.call.log'].create(entries)
+        except Exception as e:
+            _logger.warning('⚠️ No se pudo guardar el diario de llamadas Superset (%s entradas): %s',
+                            len(entries), str(e))
+            return 0
+        return len(entries)
+
+    @api.model
+    def _cron_aggregate_call_log(self):
+        """Agregar por hora las llamadas antiguas y eliminarlas"""
+        self._flush_journal()
+        ICPSudo = self.env['ir.config_parameter'].sudo()
+        retention_days = int(ICPSudo.get_param('superset.call_log_retention_days', '7'))
+        stat_retention_days = int(ICPSudo.get_param('superset.call_stat_retention_days', '90'))
+
+        # Corte alineado a la hora para que cada hora se agregue en una sola pasada
+        cutoff = (datetime.utcnow() - timedelta(days=retention_days)).replace(minute=0, second=0, microsecond=0)
+        aggregated = self.env['superset.call.stat']._aggregate_before(cutoff)
+
+        self.env.cr.execute('DELETE FROM superset_call_log WHERE called_at < %s', (cutoff,))
+        pruned = self.env.cr.rowcount
+        self.env.cr.execute(
+            'DELETE FROM superset_call_stat WHERE hour < %s',
+            (datetime.utcnow() - timedelta(days=stat_retention_days),)
+        )
+        self.invalidate_model()
+        _logger.info('🧹 Diario Superset: %s grupos horarios agregados, %s llamadas eliminadas', aggregated, pruned)
+        return {'aggregated': aggregated, 'pruned': pruned}
+
+
+class SupersetCallStat(models.Model):
+    """Percentiles horarios de las llamadas lentas o fallidas ya eliminadas del diario"""
+    _name = 'superset.call.stat'
+    _description = 'Estadística Horaria Superset'
+    _order = 'hour desc, endpoint'
+    _rec_name = 'endpoint'
+
+    hour = fields.Datetime(string='Hora', required=True, index=True)
+    endpoint = fields.Char(string='Endpoint', required=True)
+    stage = fields.Char(string='Etapa', required=True, default='-')
+    call_count = fields.Integer(string='Llamadas')
+    error_count = fields.Integer(string='Fallos')
+    avg_ms = fields.Float(string='Media (ms)', digits=(16, 0), group_operator='avg')
+    p50_ms = fields.Float(string='p50 (ms)', digits=(16, 0), group_operator='max')
+    p95_ms = fields.Float(string='p95 (ms)', digits=(16, 0), group_operator='max')
+    p99_ms = fields.Float(string='p99 (ms)', digits=(16, 0), group_operator='max')
+    max_ms = fields.Float(string='Máximo (ms)', digits=(16, 0), group_operator='max')
+
+    _sql_constraints = [
+        ('hour_endpoint_stage_uniq', 'unique(hour, endpoint, stage)',
+         'Ya existe una estadística para esta hora, endpoint y etapa.'),
+    ]
+
+    @api.model
+    def _aggregate_before(self, cutoff):
+        """Calcular percentiles por hora, endpoint y etapa en PostgreSQL
+
+        Si una hora ya agregada recibe filas tardías se suman los contadores y
+        se conservan los percentiles más altos (aproximación conservadora).
+        """
+        self.env.cr.execute("""
+            INSERT INTO superset_call_stat (
+                hour, endpoint, stage, call_count, error_count,
+                avg_ms, p50_ms, p95_ms, p99_ms, max_ms,
+                create_uid, create_date, write_uid, write_date
+            )
+            SELECT date_trunc('hour', called_at), endpoint, COALESCE(stage, '-'),
+                   count(*), count(*) FILTER (WHERE is_error),
+                   avg(duration_ms),
+                   percentile_cont(0.5) WITHIN GROUP (ORDER BY duration_ms),
+                   percentile_cont(0.95) WITHIN GROUP (ORDER BY duration_ms),
+                   percentile_cont(0.99) WITHIN GROUP (ORDER BY duration_ms),
+                   max(duration_ms),
+                   %(uid)s, now() at time zone 'UTC', %(uid)s, now() at time zone 'UTC'
+              FROM superset_call_log
+             WHERE called_at < %(cutoff)s
+          GROUP BY 1, 2, 3
+            ON CONFLICT (hour, endpoint, stage) DO UPDATE SET
+                avg_ms = (superset_call_stat.avg_ms * superset_call_stat.call_count
+                          + EXCLUDED.avg_ms * EXCLUDED.call_count)
+                         / (superset_call_stat.call_count + EXCLUDED.call_count),
+                call_count = superset_call_stat.call_count + EXCLUDED.call_count,
+                error_count = superset_call_stat.error_count + EXCLUDED.error_count,
+                p50_ms = GREATEST(superset_call_stat.p50_ms, EXCLUDED.p50_ms),
+                p95_ms = GREATEST(superset_call_stat.p95_ms, EXCLUDED.p95_ms),
+                p99_ms = GREATEST(superset_call_stat.p99_ms, EXCLUDED.p99_ms),
+                max_ms = GREATEST(superset_call_stat.max_ms, EXCLUDED.max_ms),
+                write_date = EXCLUDED.write_date
+        """, {'cutoff': cutoff, 'uid': self.env.uid})
+        aggregated = self.env.cr.rowcount
+        self.invalidate_model()
+        return aggregated
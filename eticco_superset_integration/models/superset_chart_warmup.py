@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+from odoo import models, fields, api, _
+import logging
+
+_logger = logging.getLogger(__name__)
+
+
+class SupersetChartWarmup(models.Model):
+    """Tiempos de calentamiento de cache por chart de Superset"""
+    _name = 'superset.chart.warmup'
+    _description = 'Warm-up de Charts Superset'
+    _order = 'last_duration_ms desc'
+    _rec_name = 'chart_name'
+
+    connection_id = fields.Many2one('superset.connection', string='Conexión', ondelete='cascade', index=True,
+                                    help='Conexión de Superset del dashboard (vacío: configuración global)')
+    dashboard_id = fields.Integer(string='ID Dashboard', required=True, index=True)
+    chart_id = fields.Integer(string='ID Chart', required=True)
+    chart_name = fields.Char(string='Chart')
+    last_status = fields.Selection([
+        ('ok', 'Correcto'),
+        ('error', 'Error'),
+        ('timeout', 'Timeout'),
+    ], string='Último Estado')
+    last_error = fields.Char(string='Último Error')
+    last_duration_ms = fields.Float(string='Última Duración (ms)', digits=(16, 0))
+    avg_duration_ms = fields.Float(string='Duración Media (ms)', digits=(16, 0),
+                                   help='Media móvil exponencial de las duraciones de warm-up')
+    max_duration_ms = fields.Float(string='Duración Máxima (ms)', digits=(16, 0))
+    warmup_count = fields.Integer(string='Ejecuciones')
+    last_trigger = fields.Selection([
+        ('cron', 'Programado'),
+        ('select', 'Selección en Hub'),
+    ], string='Origen')
+    last_warmed = fields.Datetime(string='Último Warm-up')
+
+    _sql_constraints = [
+        ('dashboard_chart_uniq', 'unique(connection_id, dashboard_id, chart_id)',
+         'Ya existe un registro de warm-up para este chart y dashboard en esta conexión.'),
+    ]
+
+    def init(self):
+        # En la constraint los NULL son distintos: la configuración global necesita su propio índice
+        self.env.cr.execute("""
+            CREATE UNIQUE INDEX IF NOT EXISTS superset_chart_warmup_global_uniq
+                ON superset_chart_warmup (dashboard_id, chart_id) WHERE connection_id IS NULL
+        """)
+
+    @api.model
+    def _record_results(self, results, trigger, connection_id=False):
+        """Guardar resultados de un lote de warm-up de una conexión (una búsqueda para todo el lote)"""
+        if not results:
+            return
+        existing = {
+            (rec.dashboard_id, rec.chart_id): rec
+            for rec in self.search([
+                ('connection_id', '=', connection_id),
+                ('dashboard_id', 'in', list({r['dashboard_id'] for r in results})),
+            ])
+        }
+        now = fields.Datetime.now()
+        to_create = []
+        for result in results:
+            duration = result['duration_ms']
+            values = {
+                'chart_name': result.get('chart_name'),
+                'last_status': result['status'],
+                'last_error': result.get('error') or False,
+                'last_duration_ms': duration,
+                'last_trigger': trigger,
+                'last_warmed': now,
+            }
+            record = existing.get((result['dashboard_id'], result['chart_id']))
+            if record:
+                values.update({
+                    'avg_duration_ms': 0.7 * record.avg_duration_ms + 0.3 * duration,
+                    'max_duration_ms': max(record.max_duration_ms, duration),
+                    'warmup_count': record.warmup_count + 1,
+                })
+                record.write(values)
+            else:
+                values.update({
+                    'connection_id': connection_id,
+                    'dashboard_id': result['dashboard_id'],
+                    'chart_id': result['chart_id'],
+                    'avg_duration_ms': duration,
+                    'max_duration_ms': duration,
+                    'warmup_count': 1,
+                })
+                to_create.append(values)
+        if to_create:
+            self.create(to_create)
@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+"""
+Circuit breaker del backend de Superset compartido entre workers
+
+Tras ``threshold`` fallos de conectividad consecutivos (conexión, timeout o
+HTTP 502/503/504) el circuito se abre y ``superset_request`` falla al instante
+con ``SupersetCircuitOpenError`` (subclase de ``requests.ConnectionError``, así
+que cada flujo la traduce a su error de conexión habitual). Pasado
+``reset_timeout`` un único proceso hace una sonda a ``/health``: si responde se
+cierra el circuito, si no se vuelve a abrir otro periodo.
+
+El estado vive en un fichero JSON por URL bajo ``data_dir`` protegido con
+``fcntl.flock``, para que todos los workers de la instancia lo compartan. Cada
+proceso guarda una copia y solo relee el fichero si cambia su ``mtime``.
+"""
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+import requests
+
+from odoo.tools import config as odoo_config
+
+_logger = logging.getLogger(__name__)
+
+CIRCUIT_DIR = 'superset_circuit'
+CIRCUIT_FAILURE_STATUSES = (502, 503, 504)
+# Una sonda que no termina en este tiempo se da por perdida y otro proceso puede repetirla
+CIRCUIT_PROBE_TIMEOUT = 5
+
+STATE_CLOSED = 'closed'
+STATE_OPEN = 'open'
+
+
+class SupersetCircuitOpenError(requests.exceptions.ConnectionError):
+    """Superset marcado como no disponible: la petición no se llega a enviar"""
+
+
+class CircuitBreaker:
+    """Estado del circuito de una URL de Superset persistido en disco"""
+
+    def __init__(self, url):
+        self.url = url
+        digest = hashlib.sha1(url.encode()).hexdigest()[:16]
+        self.path = os.path.join(odoo_config['data_dir'], CIRCUIT_DIR, f'{digest}.json')
+        self._lock = threading.Lock()
+        self._state = self._default_state()
+        self._mtime = None
+
+    @staticmethod
+    def _default_state():
+        return {'state': STATE_CLOSED, 'failures': 0, 'opened_at': 0.0, 'probe_started': 0.0}
+
+    # ------------------------------------------------------------------
+    # Fichero compartido
+    # ------------------------------------------------------------------
+
+    def _read_file(self, handle):
+        handle.seek(0)
+        try:
+            return dict(self._default_state(), **json.loads(handle.read() or '{}'))
+        except ValueError:
+            return self._default_state()
+
+    def _update(self, mutate):
+        """Leer, modificar y escribir el estado bajo bloqueo exclusivo entre procesos"""
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with self._lock, open(self.path, 'a+') as handle:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+            try:
+                state = self._read_file(handle)
+                result = mutate(state)
+                handle.seek(0)
+                handle.truncate()
+                handle.write(json.dumps(state))
+                handle.flush()
+                self._state = state
+                self._mtime = os.fstat(handle.fileno()).st_mtime_ns
+                return result
+            finally:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+
+    def snapshot(self):
+        """Estado actual, releyendo el fichero solo si otro proceso lo ha cambiado"""
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            return dict(self._state)
+        if mtime != self._mtime:
+            with self._lock, open(self.path) as handle:
+                fcntl.flock(handle, fcntl.LOCK_SH)
+                try:
+                    self._state = self._read_file(handle)
+                    self._mtime = mtime
+                finally:
+                    fcntl.flock(handle, fcntl.LOCK_UN)
+        return dict(self._state)
+
+    # ------------------------------------------------------------------
+    # Protocolo
+    # ------------------------------------------------------------------
+
+    def before_request(self, reset_timeout, probe):
+        """Dejar pasar la petición o lanzar ``SupersetCircuitOpenError``
+
+        ``probe`` es un callable sin argumentos que devuelve True si Superset
+        responde; solo lo ejecuta el proceso que gana la semiapertura.
+        """
+        state = self.snapshot()
+        if state['state'] == STATE_CLOSED:
+            return
+
+        now = time.time()
+        if now - state['opened_at'] < reset_timeout:
+            raise SupersetCircuitOpenError(f'Circuito abierto para {self.url}')
+
+        def claim_probe(current):
+            if current['state'] == STATE_CLOSED:
+                return 'closed'
+            if now - current['opened_at'] < reset_timeout or now - current['probe_started'] < CIRCUIT_PROBE_TIMEOUT:
+                return 'busy'
+            current['probe_started'] = now
+            return 'probe'
+
+        claim = self._update(claim_probe)
+        if claim == 'closed':
+            return
+        if claim == 'busy':
+            raise SupersetCircuitOpenError(f'Circuito abierto para {self.url} (sonda en curso)')
+
+        healthy = False
+        try:
+            healthy = probe()
+        finally:
+            self._update(lambda current: self._close(current) if healthy else self._open(current, time.time()))
+        if healthy:
+            _logger.info('✅ Superset responde de nuevo (%s): circuito cerrado', self.url)
+            return
+        raise SupersetCircuitOpenError(f'Circuito abierto para {self.url} (sonda fallida)')
+
+    def record_success(self):
+        if self.snapshot()['failures']:
+            self._update(self._close)
+
+    def record_failure(self, threshold):
+        def mutate(current):
+            current['failures'] += 1
+            if current['state'] == STATE_CLOSED and current['failures'] >= threshold:
+                self._open(current, time.time())
+                return True
+            return False
+
+        if self._update(mutate):
+            _logger.warning('🔌 Superset no disponible (%s): circuito abierto tras %s fallos consecutivos',
+                            self.url, threshold)
+
+    def reset(self):
+        if self.snapshot() != self._default_state():
+            self._update(self._close)
+
+    @staticmethod
+    def _open(state, now):
+        state.update(state=STATE_OPEN, opened_at=now, probe_started=0.0)
+
+    @staticmethod
+    def _close(state):
+        state.update(CircuitBreaker._default_state())
+
+
+_BREAKERS = {}
+_BREAKERS_LOCK = threading.Lock()
+
+
+def get_circuit_breaker(url):
+    """Circuit breaker de una URL (uno por proceso, estado compartido en disco)"""
+    with _BREAKERS_LOCK:
+        breaker = _BREAKERS.get(url)
+        if breaker is None:
+            breaker = _BREAKERS[url] = CircuitBreaker(url)
+        return breaker
+
+
+def is_circuit_failure(status):
+    """Fallos que indican backend caído (no errores de aplicación como 4xx o 500)"""
+    return status in ('timeout', 'connection_error') or status in CIRCUIT_FAILURE_STATUSES
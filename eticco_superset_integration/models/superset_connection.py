@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+from odoo import models, fields, api, tools, _
+from odoo.exceptions import ValidationError
+import logging
+
+from .superset_node_pool import parse_nodes
+
+_logger = logging.getLogger(__name__)
+
+
+class SupersetConnection(models.Model):
+    """Conexión a un Superset asignada a una o varias empresas
+
+    Las empresas sin conexión propia usan la configuración global de Ajustes
+    (parámetros ``superset.*``). ``get_superset_config`` elige la conexión de
+    la empresa activa del usuario, y las caches en memoria (tokens, catálogo,
+    estado) se separan por ``connection_key``.
+    """
+    _name = 'superset.connection'
+    _description = 'Conexión a Superset'
+    _order = 'sequence, id'
+
+    name = fields.Char(string='Nombre', required=True)
+    sequence = fields.Integer(default=10)
+    active = fields.Boolean(default=True)
+    company_ids = fields.Many2many('res.company', string='Empresas',
+                                   help='Empresas que usan esta conexión en lugar de la configuración global')
+    url = fields.Char(string='URL de Superset', required=True)
+    node_urls = fields.Char(string='Nodos Adicionales',
+                            help='Otros nodos web, separados por comas: URL de la API y opcionalmente el dominio público')
+    username = fields.Char(string='Usuario', required=True)
+    password = fields.Char(string='Contraseña', required=True)
+    timeout = fields.Integer(string='Timeout (segundos)', default=30)
+    connect_timeout = fields.Integer(string='Timeout de Conexión (segundos)', default=5)
+    cache_tokens = fields.Boolean(string='Cache de Tokens', default=True)
+    catalog_ttl = fields.Integer(string='Vigencia del Catálogo (segundos)', default=300,
+                                 help='Tiempo que se reutiliza el listado de dashboards antes de refrescarlo')
+
+    @api.constrains('url', 'timeout', 'connect_timeout', 'catalog_ttl')
+    def _check_connection(self):
+        """Validar URL, timeouts y vigencia del catálogo"""
+        for record in self:
+            if not record.url.startswith(('http://', 'https://')) or ' ' in record.url:
+                raise ValidationError(_('La URL debe empezar con http:// o https:// y no contener espacios'))
+            if not 5 <= record.timeout <= 300:
+                raise ValidationError(_('El timeout debe estar entre 5 y 300 segundos'))
+            if not 1 <= record.connect_timeout <= 60:
+                raise ValidationError(_('El timeout de conexión debe estar entre 1 y 60 segundos'))
+            if record.catalog_ttl < 0:
+                raise ValidationError(_('La vigencia del catálogo no puede ser negativa'))
+
+    @api.constrains('company_ids', 'active')
+    def _check_single_connection_per_company(self):
+        """Cada empresa puede tener como mucho una conexión activa"""
+        for record in self.filtered('active'):
+            for company in record.company_ids:
+                others = self.search_count([('id', '!=', record.id), ('company_ids', 'in', company.id)])
+                if others:
+                    raise ValidationError(_('La empresa %s ya tiene otra conexión a Superset') % company.name)
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super().create(vals_list)
+        self.env.registry.clear_cache()
+        return records
+
+    def write(self, vals):
+        result = super().write(vals)
+        self.env.registry.clear_cache()
+        return result
+
+    def unlink(self):
+        result = super().unlink()
+        self.env.registry.clear_cache()
+        return result
+
+    @api.model
+    @tools.ormcache('company_id')
+    def _connection_id_for_company(self, company_id):
+        """ID de la conexión activa de una empresa (o False si usa la configuración global)"""
+        return self.sudo().search([('company_ids', 'in', company_id)], limit=1).id
+
+    @api.model
+    def _for_company(self, company):
+        connection_id = self._connection_id_for_company(company.id)
+        return self.sudo().browse(connection_id) if connection_id else self.browse()
+
+    def _config_values(self):
+        """Claves de ``get_superset_config`` que define la conexión"""
+        self.ensure_one()
+        url = self.url.rstrip('/')
+        return {
+            'url': url,
+            'nodes': parse_nodes(url, self.node_urls),
+            'username': self.username,
+            'password': self.password,
+            'timeout': self.timeout,
+            'connect_timeout': self.connect_timeout,
+            'cache_tokens': self.cache_tokens,
+            'catalog_ttl': self.catalog_ttl,
+            'connection_id': self.id,
+            'connection_key': f'connection_{self.id}',
+        }
@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+from odoo import models, fields, api, SUPERUSER_ID
+from datetime import datetime
+import threading
+import time
+import logging
+
+_logger = logging.getLogger(__name__)
+
+# Volcado del buffer: por número de usuarios/dashboards pendientes o por antigüedad
+USAGE_FLUSH_SIZE = 20
+USAGE_FLUSH_AGE = 60
+# Semivida (días) del peso de una apertura en la ordenación por uso
+USAGE_HALF_LIFE_DAYS = 14
+
+
+class UsageJournal:
+    """Aperturas de dashboards pendientes de guardar, agregadas por usuario y dashboard
+
+    El widget avisa de cada apertura con su tiempo de carga; aquí solo se
+    suman en memoria y ``superset.dashboard.usage._flush_usage`` las vuelca
+    con un único upsert por lote.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._oldest = None
+
+    def record(self, uid, dashboard_uuid, load_ms=None):
+        with self._lock:
+            if not self._pending:
+                self._oldest = time.monotonic()
+            entry = self._pending.setdefault((uid, dashboard_uuid), {
+                'open_count': 0, 'load_count': 0, 'load_total_ms': 0.0, 'last_load_ms': None,
+            })
+            entry['open_count'] += 1
+            entry['last_opened'] = datetime.utcnow().replace(microsecond=0)
+            if load_ms:
+                entry['load_count'] += 1
+                entry['load_total_ms'] += load_ms
+                entry['last_load_ms'] = load_ms
+
+    def pending_for(self, uid):
+        """Aperturas aún no volcadas de ``uid``: {dashboard_uuid: open_count}"""
+        with self._lock:
+            return {uuid: entry['open_count'] for (user, uuid), entry in self._pending.items() if user == uid}
+
+    def is_due(self):
+        with self._lock:
+            return bool(self._pending) and (
+                len(self._pending) >= USAGE_FLUSH_SIZE
+                or time.monotonic() - self._oldest >= USAGE_FLUSH_AGE
+            )
+
+    def drain(self):
+        with self._lock:
+            pending = self._pending
+            self._pending = {}
+            self._oldest = None
+        return pending
+
+    def __len__(self):
+        return len(self._pending)
+
+
+USAGE_JOURNAL = UsageJournal()
+
+
+class SupersetDashboardUsage(models.Model):
+    """Uso de cada dashboard por usuario: aperturas, última apertura y tiempo de carga
+
+    Ordena el selector del hub y elige el dashboard que se abre (y cuyo guest
+    token se prepara) cuando el usuario entra sin selección. Vive en el
+    servidor, así que sigue al usuario entre navegadores y dispositivos.
+    """
+    _name = 'superset.dashboard.usage'
+    _description = 'Uso de Dashboards Superset'
+    _order = 'last_opened desc, id desc'
+    _rec_name = 'dashboard_uuid'
+
+    user_id = fields.Many2one('res.users', string='Usuario', required=True, ondelete='cascade', index=True)
+    dashboard_uuid = fields.Char(string='Dashboard (UUID)', required=True)
+    open_count = fields.Integer(string='Aperturas')
+    last_opened = fields.Datetime(string='Última Apertura')
+    load_count = fields.Integer(string='Cargas Medidas')
+    avg_load_ms = fields.Float(string='Carga Media (ms)', digits=(16, 0), group_operator='avg')
+    last_load_ms = fields.Float(string='Última Carga (ms)', digits=(16, 0))
+
+    _sql_constraints = [
+        ('user_dashboard_uniq', 'unique(user_id, dashboard_uuid)', 'Ya existe un registro de uso para este usuario y dashboard.'),
+    ]
+
+    @api.model
+    def _record_open(self, dashboard_uuid, load_ms=None):
+        """Anotar una apertura del usuario actual (se guarda en el próximo volcado)"""
+        USAGE_JOURNAL.record(self.env.uid, dashboard_uuid, load_ms)
+        self._flush_usage_if_due()
+
+    @api.model
+    def _flush_usage_if_due(self):
+        if USAGE_JOURNAL.is_due():
+            self._flush_usage()
+
+    @api.model
+    def _flush_usage(self):
+        """Upsert por lotes de las aperturas pendientes en un cursor propio"""
+        pending = USAGE_JOURNAL.drain()
+        if not pending:
+            return 0
+        try:
+            if getattr(threading.current_thread(), 'testing', False):
+                # En tests un cursor nuevo no vería (ni desharía) la transacción del test
+                self._upsert_usage(self.env.cr, pending)
+                self.invalidate_model()
+            else:
+                with self.env.registry.cursor() as cr:
+                    self._upsert_usage(cr, pending)
+        except Exception as e:
+            _logger.warning('⚠️ No se pudo guardar el uso de dashboards Superset (%s entradas): %s',
+                            len(pending), str(e))
+            return 0
+        return len(pending)
+
+    @api.model
+    def _upsert_usage(self, cr, pending):
+        rows = [
+            (uid, uuid, entry['open_count'], entry['last_opened'], entry['load_count'],
+             entry['load_total_ms'] / entry['load_count'] if entry['load_count'] else 0.0,
+             entry['last_load_ms'], SUPERUSER_ID, SUPERUSER_ID)
+            for (uid, uuid), entry in pending.items()
+        ]
+        values = ', '.join(["(%s, %s, %s, %s, %s, %s, %s, %s, now() at time zone 'UTC', %s, now() at time zone 'UTC')"] * len(rows))
+        cr.execute(f"""
+            INSERT INTO superset_dashboard_usage (
+                user_id, dashboard_uuid, open_count, last_opened, load_count, avg_load_ms, last_load_ms,
+                create_uid, create_date, write_uid, write_date
+            )
+            VALUES {values}
+            ON CONFLICT (user_id, dashboard_uuid) DO UPDATE SET
+                open_count = superset_dashboard_usage.open_count + EXCLUDED.open_count,
+                last_opened = GREATEST(superset_dashboard_usage.last_opened, EXCLUDED.last_opened),
+                avg_load_ms = CASE
+                    WHEN superset_dashboard_usage.load_count + EXCLUDED.load_count = 0 THEN 0
+                    ELSE (superset_dashboard_usage.avg_load_ms * superset_dashboard_usage.load_count
+                          + EXCLUDED.avg_load_ms * EXCLUDED.load_count)
+                         / (superset_dashboard_usage.load_count + EXCLUDED.load_count)
+                END,
+                load_count = superset_dashboard_usage.load_count + EXCLUDED.load_count,
+                last_load_ms = COALESCE(EXCLUDED.last_load_ms, superset_dashboard_usage.last_load_ms),
+                write_date = EXCLUDED.write_date
+        """, [value for row in rows for value in row])
+
+    @api.model
+    def _usage_scores(self, uid=None):
+        """Puntuación de uso de cada dashboard de ``uid``: {dashboard_uuid: score}
+
+        Cada apertura pesa la mitad cada ``USAGE_HALF_LIFE_DAYS`` días; las
+        aperturas aún en el buffer del proceso cuentan con peso completo.
+        """
+        uid = uid or self.env.uid
+        self.env.cr.execute("""
+            SELECT dashboard_uuid,
+                   open_count * power(0.5, extract(epoch FROM (now() at time zone 'UTC' - last_opened))
+                                           / 86400.0 / %s)
+              FROM superset_dashboard_usage
+             WHERE user_id = %s AND last_opened IS NOT NULL
+        """, (USAGE_HALF_LIFE_DAYS, uid))
+        scores = {uuid: float(score) for uuid, score in self.env.cr.fetchall()}
+        for uuid, count in USAGE_JOURNAL.pending_for(uid).items():
+            scores[uuid] = scores.get(uuid, 0.0) + count
+        return scores
@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+"""
+Presupuesto de tiempo (deadline) por operación
+
+Una acción del hub encadena varias llamadas a Superset (login, listado,
+embedded, guest token). En lugar de dar a cada paso el ``superset.timeout``
+completo, la operación abre un deadline y cada petición recibe como timeout
+lo que queda de él (acotado por el timeout de conexión y el de lectura). Si
+ya no queda presupuesto la petición no se envía y se lanza
+``SupersetDeadlineExceeded`` (subclase de ``requests.Timeout``, así que cada
+flujo la traduce a su error de timeout habitual).
+
+Dentro de ese margen, el timeout de cada endpoint se acota además por el
+aprendido de su latencia (``superset_adaptive_timeout``).
+
+Presupuestos por flujo (``superset.budget_<flujo>``, en segundos):
+
+- ``interactive``: acciones del usuario en el hub, corto
+- ``cron``: sincronizaciones programadas, largo
+"""
+import contextvars
+import functools
+import time
+
+import requests
+
+from .superset_adaptive_timeout import ADAPTIVE_TIMEOUTS
+
+# Por debajo de este presupuesto restante no merece la pena enviar la petición
+MIN_REQUEST_BUDGET = 0.1
+
+BUDGET_DEFAULTS = {
+    'interactive': 20,
+    'cron': 600,
+}
+
+_CURRENT_DEADLINE = contextvars.ContextVar('superset_deadline', default=None)
+
+
+class SupersetDeadlineExceeded(requests.exceptions.Timeout):
+    """Presupuesto de la operación agotado antes de completar todos los pasos"""
+
+
+class Deadline:
+    """Instante límite de una operación (reloj monotónico)"""
+
+    def __init__(self, budget, flow=None):
+        self.flow = flow
+        self.budget = budget
+        self.expires = time.monotonic() + budget
+
+    def remaining(self):
+        return self.expires - time.monotonic()
+
+
+def current_deadline():
+    return _CURRENT_DEADLINE.get()
+
+
+class deadline:
+    """Abrir un deadline; si ya hay uno más estricto en curso se conserva ese"""
+
+    def __init__(self, budget, flow=None):
+        self.deadline = Deadline(budget, flow)
+        self._token = None
+
+    def __enter__(self):
+        parent = _CURRENT_DEADLINE.get()
+        if parent is None or parent.expires > self.deadline.expires:
+            self._token = _CURRENT_DEADLINE.set(self.deadline)
+        return _CURRENT_DEADLINE.get()
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._token is not None:
+            _CURRENT_DEADLINE.reset(self._token)
+        return False
+
+
+def request_timeout(config, endpoint=None):
+    """Timeout ``(conexión, lectura)`` para la próxima petición según el presupuesto restante"""
+    connect = float(config.get('connect_timeout') or config.get('timeout', 30))
+    read = float(config.get('timeout', 30))
+    if endpoint and config.get('adaptive_timeouts'):
+        read = ADAPTIVE_TIMEOUTS.timeout_for(config.get('url'), endpoint, read)
+        connect = min(connect, read)
+    current = _CURRENT_DEADLINE.get()
+    if current is not None:
+        remaining = current.remaining()
+        if remaining < MIN_REQUEST_BUDGET:
+            raise SupersetDeadlineExceeded(
+                f'Presupuesto de {current.budget:g}s agotado ({current.flow or "operación"})')
+        connect, read = min(connect, remaining), min(read, remaining)
+    return (connect, read)
+
+
+def bind_deadline(func):
+    """Propagar el deadline actual a un callable que se ejecuta en otro hilo"""
+    current = _CURRENT_DEADLINE.get()
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        token = _CURRENT_DEADLINE.set(current)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _CURRENT_DEADLINE.reset(token)
+    return wrapper
+
+
+def flow_budget(env, flow):
+    """Presupuesto configurado para un flujo (``superset.budget_<flujo>``)"""
+    value = env['ir.config_parameter'].sudo().get_param(f'superset.budget_{flow}')
+    try:
+        return float(value) if value else float(BUDGET_DEFAULTS[flow])
+    except ValueError:
+        return float(BUDGET_DEFAULTS[flow])
+
+
+def with_deadline(flow):
+    """Decorador para puntos de entrada: ejecutar con el presupuesto del flujo"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            with deadline(flow_budget(self.env, flow), flow):
+                return func(self, *args, **kwargs)
+        return wrapper
+    return decorator
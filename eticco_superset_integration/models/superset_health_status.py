@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+from odoo import models, fields, api
+import json
+import logging
+
+import psycopg2
+
+_logger = logging.getLogger(__name__)
+
+# Columnas que escribe el monitor y leen los campos de estado
+HEALTH_FIELDS = ('state', 'latency_ms', 'token_valid', 'last_error', 'total_dashboards', 'with_embedding', 'last_check')
+
+
+class SupersetHealthStatus(models.Model):
+    """Último estado de Superset observado por el monitor de salud
+
+    Un registro por URL. Lo escribe el cron ``_cron_monitor_health`` (y los
+    refrescos forzados por el usuario); los badges y campos calculados de
+    Settings y del hub solo lo leen, así que nunca esperan a Superset.
+    """
+    _name = 'superset.health.status'
+    _description = 'Estado de Salud de Superset'
+    _rec_name = 'url'
+
+    url = fields.Char(string='URL', required=True)
+    state = fields.Selection([
+        ('up', 'Disponible'),
+        ('down', 'No disponible'),
+    ], string='Estado', required=True, default='down')
+    latency_ms = fields.Float(string='Latencia /health (ms)')
+    token_valid = fields.Boolean(string='Token Válido')
+    last_error = fields.Char(string='Último Error')
+    total_dashboards = fields.Integer(string='Dashboards Publicados')
+    with_embedding = fields.Integer(string='Con Embedding')
+    last_check = fields.Datetime(string='Última Comprobación')
+    # JSON {uuid: título} de los dashboards seleccionables en la última comprobación correcta
+    catalog_snapshot = fields.Text(string='Catálogo Publicado')
+
+    _sql_constraints = [
+        ('url_uniq', 'unique(url)', 'Ya existe un estado para esta URL de Superset.'),
+    ]
+
+    @api.model
+    def _read_status(self, url):
+        """Estado guardado para ``url`` como diccionario, o None si el monitor aún no ha pasado"""
+        self.env.cr.execute(f"""
+            SELECT {', '.join(HEALTH_FIELDS)}
+              FROM superset_health_status
+             WHERE url = %s
+        """, (url,))
+        row = self.env.cr.fetchone()
+        return dict(zip(HEALTH_FIELDS, row)) if row else None
+
+    @api.model
+    def _read_snapshot(self, url):
+        """Último catálogo publicado a los widgets para ``url`` ({uuid: título}; None si aún no hay)"""
+        self.env.cr.execute('SELECT catalog_snapshot FROM superset_health_status WHERE url = %s', (url,))
+        row = self.env.cr.fetchone()
+        return json.loads(row[0]) if row and row[0] is not None else None
+
+    @api.model
+    def _store_status(self, url, vals):
+        """Guardar el estado de ``url``; False si otra transacción lo está escribiendo a la vez"""
+        status = self.sudo().search([('url', '=', url)], limit=1)
+        try:
+            with self.env.cr.savepoint():
+                if status:
+                    status.write(vals)
+                else:
+                    self.sudo().create(dict(vals, url=url))
+        except (psycopg2.errors.SerializationFailure, psycopg2.IntegrityError):
+            _logger.debug('Estado de Superset escrito por otra transacción, se conserva ese')
+            return False
+        return True
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+from odoo import models, fields, api
+import logging
+
+_logger = logging.getLogger(__name__)
+
+# Columnas de estado por usuario (mismo nombre en el hub y en la tabla de estado)
+USER_STATE_FIELDS = ('selected_dashboard', 'dashboard_loaded', 'current_dashboard_id', 'current_embedding_uuid')
+
+
+class SupersetHubUserState(models.Model):
+    """Estado del hub por usuario: dashboard seleccionado y cargado
+
+    El hub es un registro compartido; guardar aquí la selección de cada usuario
+    evita que los visores concurrentes escriban (y bloqueen) la misma fila.
+    Las lecturas y escrituras se hacen en SQL directo con ``ON CONFLICT``.
+    """
+    _name = 'superset.hub.user.state'
+    _description = 'Estado del Hub por Usuario'
+    _rec_name = 'hub_id'
+
+    hub_id = fields.Many2one('superset.analytics.hub', string='Hub', required=True, ondelete='cascade')
+    user_id = fields.Many2one('res.users', string='Usuario', required=True, ondelete='cascade', index=True)
+    selected_dashboard = fields.Char(string='Dashboard Activo')
+    dashboard_loaded = fields.Boolean(string='Dashboard Cargado')
+    current_dashboard_id = fields.Integer(string='ID Dashboard')
+    current_embedding_uuid = fields.Char(string='Embedding UUID')
+
+    _sql_constraints = [
+        ('hub_user_uniq', 'unique(hub_id, user_id)', 'Ya existe un estado para este hub y usuario.'),
+    ]
+
+    @api.model
+    def _read_states(self, hub_ids, uid):
+        """Estado de ``uid`` en cada hub: {hub_id: {campo: valor}} (una sola consulta)"""
+        if not hub_ids:
+            return {}
+        self.flush_model()
+        self.env.cr.execute(f"""
+            SELECT hub_id, {', '.join(USER_STATE_FIELDS)}
+              FROM superset_hub_user_state
+             WHERE hub_id IN %s AND user_id = %s
+        """, (tuple(hub_ids), uid))
+        return {row[0]: dict(zip(USER_STATE_FIELDS, row[1:])) for row in self.env.cr.fetchall()}
+
+    @api.model
+    def _upsert_state(self, hub_id, uid, vals):
+        """Crear o actualizar el estado de ``uid`` en ``hub_id`` con un único INSERT ... ON CONFLICT"""
+        columns = [name for name in USER_STATE_FIELDS if name in vals]
+        if not columns:
+            return
+        params = {name: vals[name] or None for name in columns}
+        if 'dashboard_loaded' in params:
+            params['dashboard_loaded'] = bool(vals['dashboard_loaded'])
+        params.update(hub_id=hub_id, uid=uid)
+        self.env.cr.execute(f"""
+            INSERT INTO superset_hub_user_state (
+                hub_id, user_id, {', '.join(columns)},
+                create_uid, create_date, write_uid, write_date
+            )
+            VALUES (
+                %(hub_id)s, %(uid)s, {', '.join(f'%({name})s' for name in columns)},
+                %(uid)s, now() at time zone 'UTC', %(uid)s, now() at time zone 'UTC'
+            )
+            ON CONFLICT (hub_id, user_id) DO UPDATE SET
+                {', '.join(f'{name} = EXCLUDED.{name}' for name in columns)},
+                write_uid = EXCLUDED.write_uid,
+                write_date = EXCLUDED.write_date
+        """, params)
+        self.invalidate_model(columns)
@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+"""
+Métricas en proceso de las llamadas a Superset
+
+Contadores e histogramas de bajo coste (un lock y unas sumas por observación)
+que se exportan en formato texto de Prometheus desde ``/superset/metrics``.
+Cada proceso worker de Odoo mantiene sus propias métricas.
+"""
+import bisect
+import threading
+import time
+
+# Límites de los buckets de latencia en segundos (estilo Prometheus)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Histogram:
+    """Histograma acumulativo con buckets fijos"""
+
+    __slots__ = ('counts', 'total', 'count')
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(LATENCY_BUCKETS, value)] += 1
+        self.total += value
+        self.count += 1
+
+    def quantile(self, q):
+        """Estimar un percentil interpolando dentro del bucket (como histogram_quantile)"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        cumulative = 0
+        for index, bucket_count in enumerate(self.counts):
+            if cumulative + bucket_count >= rank and bucket_count:
+                lower = LATENCY_BUCKETS[index - 1] if index else 0.0
+                if index >= len(LATENCY_BUCKETS):
+                    return lower
+                upper = LATENCY_BUCKETS[index]
+                return lower + (upper - lower) * (rank - cumulative) / bucket_count
+            cumulative += bucket_count
+        return LATENCY_BUCKETS[-1]
+
+
+class SupersetMetrics:
+    """Registro de métricas de llamadas salientes y de cache"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.requests = {}      # (endpoint, method, status) -> contador
+            self.latency = {}       # endpoint -> Histogram
+            self.cache = {}         # (cache, 'hit'|'miss') -> contador
+            self.retries = {}       # (endpoint, 'retry'|'hedge'|'denied') -> contador
+            self.throttled = {}     # (endpoint, prioridad, 'delayed'|'rejected') -> contador
+            self.started = time.time()
+
+    def observe_request(self, endpoint, method, status, duration):
+        """Registrar una llamada HTTP a Superset (duración en segundos)"""
+        key = (endpoint, method.upper(), str(status))
+        with self._lock:
+            self.requests[key] = self.requests.get(key, 0) + 1
+            histogram = self.latency.get(endpoint)
+            if histogram is None:
+                histogram = self.latency[endpoint] = Histogram()
+            histogram.observe(duration)
+
+    def record_cache(self, cache, hit):
+        """Registrar acierto o fallo de una cache"""
+        key = (cache, 'hit' if hit else 'miss')
+        with self._lock:
+            self.cache[key] = self.cache.get(key, 0) + 1
+
+    def record_retry(self, endpoint, kind):
+        """Registrar un reintento, una petición de cobertura o un reintento denegado por presupuesto"""
+        key = (endpoint, kind)
+        with self._lock:
+            self.retries[key] = self.retries.get(key, 0) + 1
+
+    def record_throttle(self, endpoint, priority, result):
+        """Registrar una petición retenida o rechazada por el límite de llamadas salientes"""
+        key = (endpoint, priority, result)
+        with self._lock:
+            self.throttled[key] = self.throttled.get(key, 0) + 1
+
+    def latency_quantile(self, endpoint, q, min_count=1):
+        """Percentil de latencia (segundos) de un endpoint o None si hay menos de ``min_count`` muestras"""
+        with self._lock:
+            histogram = self.latency.get(endpoint)
+            if histogram is None or histogram.count < min_count:
+                return None
+            return histogram.quantile(q)
+
+    def render_prometheus(self):
+        """Exportar en formato texto de Prometheus (version 0.0.4)"""
+        lines = [
+            '# HELP superset_http_requests_total Llamadas HTTP salientes a Superset',
+            '# TYPE superset_http_requests_total counter',
+        ]
+        with self._lock:
+            for (endpoint, method, status), value in sorted(self.requests.items()):
+                lines.append('superset_http_requests_total{endpoint="%s",method="%s",status="%s"} %d'
+                             % (_escape(endpoint), method, status, value))
+
+            lines += [
+                '# HELP superset_http_request_duration_seconds Latencia de las llamadas a Superset',
+                '# TYPE superset_http_request_duration_seconds histogram',
+            ]
+            for endpoint, histogram in sorted(self.latency.items()):
+                label = _escape(endpoint)
+                cumulative = 0
+                for bound, bucket_count in zip(LATENCY_BUCKETS, histogram.counts):
+                    cumulative += bucket_count
+                    lines.append('superset_http_request_duration_seconds_bucket{endpoint="%s",le="%s"} %d'
+                                 % (label, bound, cumulative))
+                lines.append('superset_http_request_duration_seconds_bucket{endpoint="%s",le="+Inf"} %d'
+                             % (label, histogram.count))
+                lines.append('superset_http_request_duration_seconds_sum{endpoint="%s"} %.6f' % (label, histogram.total))
+                lines.append('superset_http_request_duration_seconds_count{endpoint="%s"} %d' % (label, histogram.count))
+
+            lines += [
+                '# HELP superset_cache_requests_total Consultas a las caches del módulo',
+                '# TYPE superset_cache_requests_total counter',
+            ]
+            for (cache, result), value in sorted(self.cache.items()):
+                lines.append('superset_cache_requests_total{cache="%s",result="%s"} %d'
+                             % (_escape(cache), result, value))
+
+            lines += [
+                '# HELP superset_http_retries_total Reintentos y peticiones de cobertura a Superset',
+                '# TYPE superset_http_retries_total counter',
+            ]
+            for (endpoint, kind), value in sorted(self.retries.items()):
+                lines.append('superset_http_retries_total{endpoint="%s",kind="%s"} %d'
+                             % (_escape(endpoint), kind, value))
+
+            lines += [
+                '# HELP superset_http_throttled_total Llamadas retenidas o rechazadas por el límite de llamadas',
+                '# TYPE superset_http_throttled_total counter',
+            ]
+            for (endpoint, priority, result), value in sorted(self.throttled.items()):
+                lines.append('superset_http_throttled_total{endpoint="%s",priority="%s",result="%s"} %d'
+                             % (_escape(endpoint), priority, result, value))
+        return '\n'.join(lines) + '\n'
+
+    def request_counts(self):
+        """Llamadas acumuladas por endpoint (instantánea para comparar antes/después)"""
+        counts = {}
+        with self._lock:
+            for (endpoint, _method, _status), value in self.requests.items():
+                counts[endpoint] = counts.get(endpoint, 0) + value
+        return counts
+
+    def summary(self):
+        """Resumen por endpoint y por cache para mostrar en Settings"""
+        with self._lock:
+            endpoints = {}
+            for (endpoint, _method, status), value in self.requests.items():
+                stats = endpoints.setdefault(endpoint, {'calls': 0, 'errors': 0})
+                stats['calls'] += value
+                if not status.isdigit() or int(status) >= 400:
+                    stats['errors'] += value
+            for endpoint, stats in endpoints.items():
+                histogram = self.latency.get(endpoint) or Histogram()
+                stats['p50_ms'] = histogram.quantile(0.5) * 1000
+                stats['p95_ms'] = histogram.quantile(0.95) * 1000
+                stats['avg_ms'] = (histogram.total / histogram.count * 1000) if histogram.count else 0.0
+
+            caches = {}
+            for (cache, result), value in self.cache.items():
+                caches.setdefault(cache, {'hit': 0, 'miss': 0})[result] = value
+            return {'since': self.started, 'endpoints': endpoints, 'caches': caches}
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+METRICS = SupersetMetrics()
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""
+Pool de nodos web de Superset con reparto por latencia y failover
+
+``superset.url`` es el nodo principal y la identidad de la conexión (caches,
+tokens y catálogo se comparten entre nodos, que usan la misma base de datos
+y ``SECRET_KEY``). ``superset.node_urls`` añade nodos, separados por comas o
+saltos de línea, con la URL de la API y opcionalmente el dominio público que
+carga el navegador::
+
+    http://10.0.0.11:8088 https://bi1.example.com, http://10.0.0.12:8088 https://bi2.example.com
+
+Cada petición elige un nodo sano al azar con peso inverso a su latencia media
+(EWMA). Un error de conexión marca el nodo como caído ``NODE_DOWN_SECONDS`` y
+la petición se repite de inmediato en otro nodo. El estado es por proceso.
+"""
+import random
+import threading
+import time
+
+NODE_DOWN_SECONDS = 30
+NODE_LATENCY_ALPHA = 0.2
+# Latencia supuesta para un nodo sin muestras si ningún otro las tiene (segundos)
+NODE_DEFAULT_LATENCY = 0.1
+
+
+def parse_nodes(primary_url, node_urls):
+    """Lista de nodos ``{'url', 'public_url'}`` a partir de la URL principal y ``superset.node_urls``"""
+    nodes = [{'url': primary_url, 'public_url': primary_url}] if primary_url else []
+    seen = {primary_url}
+    for line in (node_urls or '').replace(',', '\n').splitlines():
+        parts = line.split()
+        if not parts:
+            continue
+        url = parts[0].rstrip('/')
+        if url in seen:
+            continue
+        seen.add(url)
+        nodes.append({'url': url, 'public_url': parts[1].rstrip('/') if len(parts) > 1 else url})
+    return nodes
+
+
+class NodePool:
+    """Latencia y disponibilidad observadas de cada nodo, compartidas por los hilos del proceso"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.latency = {}       # url -> EWMA de latencia (segundos)
+            self.down_until = {}    # url -> instante monotónico hasta el que se evita
+
+    def choose(self, nodes, exclude=(), rng=random):
+        """Elegir un nodo ponderado por latencia entre los sanos (None si se han probado todos)"""
+        candidates = [node for node in nodes if node['url'] not in exclude]
+        if not candidates:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            # Si todos están marcados como caídos se prueba igualmente: mejor que fallar sin intentarlo
+            pool = [node for node in candidates if self.down_until.get(node['url'], 0) <= now] or candidates
+            known = [self.latency[node['url']] for node in pool if node['url'] in self.latency]
+            default = sum(known) / len(known) if known else NODE_DEFAULT_LATENCY
+            weights = [1.0 / max(self.latency.get(node['url'], default), 0.001) for node in pool]
+        return rng.choices(pool, weights)[0]
+
+    def observe(self, url, duration):
+        """Respuesta recibida del nodo: actualizar su latencia y darlo por sano"""
+        with self._lock:
+            previous = self.latency.get(url)
+            self.latency[url] = duration if previous is None else previous + NODE_LATENCY_ALPHA * (duration - previous)
+            self.down_until.pop(url, None)
+
+    def mark_down(self, url):
+        with self._lock:
+            self.down_until[url] = time.monotonic() + NODE_DOWN_SECONDS
+
+    def snapshot(self, nodes):
+        """Estado de cada nodo para Settings: latencia media y si está marcado como caído"""
+        now = time.monotonic()
+        with self._lock:
+            return [{
+                'url': node['url'],
+                'public_url': node['public_url'],
+                'latency_ms': self.latency[node['url']] * 1000 if node['url'] in self.latency else None,
+                'down': self.down_until.get(node['url'], 0) > now,
+            } for node in nodes]
+
+
+NODE_POOL = NodePool()
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""
+Perfilado muestreado de los puntos de entrada del hub
+
+Con ``superset.debug_mode`` activo y ``superset.profile_sample_rate`` > 0, una
+fracción de las llamadas a los métodos decorados con ``profiled`` se ejecuta
+bajo cProfile. Cada perfil se guarda como ``ir.attachment`` (formato pstats,
+``python -m pstats fichero.prof`` o snakeviz) con el top de funciones por
+tiempo acumulado en la descripción.
+"""
+import contextvars
+import cProfile
+import functools
+import io
+import logging
+import marshal
+import pstats
+import random
+import time
+from datetime import datetime
+
+_logger = logging.getLogger(__name__)
+
+PROFILE_PREFIX = 'superset_profile_'
+PROFILE_RES_MODEL = 'superset.utils'
+# Perfiles conservados: al guardar uno nuevo se eliminan los más antiguos
+PROFILE_MAX_FILES = 50
+PROFILE_SUMMARY_LINES = 25
+
+# cProfile no admite perfiles anidados: solo se perfila el punto de entrada más externo
+_PROFILING = contextvars.ContextVar('superset_profiling', default=False)
+
+
+def _should_profile(env):
+    if _PROFILING.get():
+        return False
+    ICPSudo = env['ir.config_parameter'].sudo()
+    if ICPSudo.get_param('superset.debug_mode', 'False').lower() != 'true':
+        return False
+    try:
+        rate = float(ICPSudo.get_param('superset.profile_sample_rate', '0') or 0)
+    except ValueError:
+        return False
+    return rate > 0 and random.random() < rate
+
+
+def profiled(name):
+    """Decorador: perfilar una muestra de las llamadas cuando el modo debug lo permite"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            if not _should_profile(self.env):
+                return func(self, *args, **kwargs)
+
+            profile = cProfile.Profile()
+            token = _PROFILING.set(True)
+            started = time.perf_counter()
+            try:
+                return profile.runcall(func, self, *args, **kwargs)
+            finally:
+                _PROFILING.reset(token)
+                _store_profile(self.env, name, profile, time.perf_counter() - started)
+        return wrapper
+    return decorator
+
+
+def _store_profile(env, name, profile, duration):
+    """Guardar el perfil como adjunto y podar los más antiguos"""
+    try:
+        profile.create_stats()
+        summary = io.StringIO()
+        pstats.Stats(profile, stream=summary).sort_stats('cumulative').print_stats(PROFILE_SUMMARY_LINES)
+
+        Attachment = env['ir.attachment'].sudo()
+        timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S_%f')
+        Attachment.create({
+            'name': f'{PROFILE_PREFIX}{name}_{timestamp}.prof',
+            'res_model': PROFILE_RES_MODEL,
+            'res_id': 0,
+            'type': 'binary',
+            'raw': marshal.dumps(profile.stats),
+            'mimetype': 'application/octet-stream',
+            'description': f'{name} · {duration * 1000:.0f} ms · usuario {env.uid}\n\n{summary.getvalue()}',
+        })
+        old = Attachment.search([
+            ('res_model', '=', PROFILE_RES_MODEL),
+            ('name', '=like', f'{PROFILE_PREFIX}%'),
+        ], order='id desc', offset=PROFILE_MAX_FILES)
+        old.unlink()
+        _logger.info('🔬 Perfil de %s guardado (%.0f ms)', name, duration * 1000)
+    except Exception as e:
+        _logger.warning('⚠️ No se pudo guardar el perfil de %s: %s', name, str(e))
@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+"""
+Limitación de las llamadas salientes a Superset: token bucket y concurrencia
+
+Superset suele correr con pocos workers de gunicorn y el ERP no debe tumbarlo
+cuando coinciden refrescos de estado de varios workers, crons y usuarios.
+Antes de enviar, cada petición necesita:
+
+- una ficha del token bucket (``superset.rate_limit`` peticiones/s, ráfagas
+  de ``RATE_BURST_SECONDS`` segundos), y
+- un hueco de concurrencia (``superset.max_concurrency`` peticiones en vuelo).
+
+Las peticiones interactivas tienen prioridad sobre las de fondo (deadline del
+flujo ``cron``): las de fondo no usan la reserva de fichas
+``BACKGROUND_RESERVE`` y ceden el hueco libre si hay una interactiva
+esperando. La espera se limita a lo que queda del deadline de la operación;
+si se agota se lanza ``SupersetThrottledError`` (subclase de
+``requests.Timeout``, así que cada flujo la traduce a su error de timeout).
+
+Cada URL de Superset (cada nodo de cada conexión) tiene su propio token
+bucket, así que una conexión de empresa no gasta las fichas de otra. Con
+``superset.rate_limit_shared`` el bucket vive en un fichero bajo ``data_dir``
+protegido con ``fcntl.flock`` y lo comparten todos los workers; el límite de
+concurrencia es siempre por proceso.
+"""
+import fcntl
+import hashlib
+import json
+import os
+import threading
+import time
+
+import requests
+
+from odoo.tools import config as odoo_config
+
+from .superset_deadline import current_deadline
+
+RATE_LIMIT_DIR = 'superset_rate_limit'
+# Tamaño de la ráfaga: fichas acumulables en segundos de tasa
+RATE_BURST_SECONDS = 2
+# Fracción del bucket reservada a las peticiones interactivas
+BACKGROUND_RESERVE = 0.2
+
+PRIORITY_INTERACTIVE = 'interactive'
+PRIORITY_BACKGROUND = 'background'
+
+
+class SupersetThrottledError(requests.exceptions.Timeout):
+    """La petición no obtuvo ficha o hueco dentro de su presupuesto y no se envió"""
+
+
+def request_priority():
+    """Prioridad de la petición en curso según el flujo de su deadline"""
+    current = current_deadline()
+    return PRIORITY_BACKGROUND if current is not None and current.flow == 'cron' else PRIORITY_INTERACTIVE
+
+
+class SharedTokenBucket:
+    """Token bucket persistido en disco y compartido por los workers de la instancia"""
+
+    def __init__(self, url):
+        digest = hashlib.sha1(url.encode()).hexdigest()[:16]
+        self.path = os.path.join(odoo_config['data_dir'], RATE_LIMIT_DIR, f'{digest}.json')
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+
+    def take(self, rate, burst, need):
+        """Consumir una ficha si hay ``need``; si no, segundos estimados hasta que las haya"""
+        with open(self.path, 'a+') as handle:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+            try:
+                handle.seek(0)
+                try:
+                    state = json.loads(handle.read() or '{}')
+                except ValueError:
+                    state = {}
+                now = time.time()
+                tokens = min(burst, state.get('tokens', burst) + (now - state.get('updated', now)) * rate)
+                wait = 0.0
+                if tokens >= need:
+                    tokens -= 1
+                else:
+                    wait = (need - tokens) / rate
+                handle.seek(0)
+                handle.truncate()
+                handle.write(json.dumps({'tokens': tokens, 'updated': now}))
+                handle.flush()
+                return wait
+            finally:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+
+
+class OutboundLimiter:
+    """Token bucket y límite de concurrencia con prioridad, compartidos por los hilos del proceso
+
+    ``_cond`` solo protege el estado en memoria (huecos, colas y buckets
+    locales por URL). El bucket compartido se actualiza fuera de él, con el hueco ya
+    reservado: la E/S del fichero y su ``flock`` nunca bloquean a los demás
+    hilos del worker.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._shared = {}
+        self.reset()
+
+    def reset(self):
+        with self._cond:
+            self.active = 0
+            self.waiting = {PRIORITY_INTERACTIVE: 0, PRIORITY_BACKGROUND: 0}
+            self.buckets = {}       # url -> [fichas, último relleno (monotonic)]
+            self._cond.notify_all()
+
+    def _bucket_limits(self, rate, priority):
+        """(ráfaga, fichas necesarias): las peticiones de fondo dejan intacta la reserva interactiva"""
+        burst = max(1.0, rate * RATE_BURST_SECONDS)
+        reserve = burst * BACKGROUND_RESERVE if priority == PRIORITY_BACKGROUND else 0.0
+        return burst, min(burst, 1 + reserve)
+
+    def _take_local_token(self, url, rate, priority):
+        """Ficha del bucket en memoria de ``url`` (con ``_cond`` adquirido); si no hay, segundos a esperar"""
+        burst, need = self._bucket_limits(rate, priority)
+        now = time.monotonic()
+        bucket = self.buckets.setdefault(url, [burst, now])
+        bucket[0] = min(burst, bucket[0] + (now - bucket[1]) * rate)
+        bucket[1] = now
+        if bucket[0] >= need:
+            bucket[0] -= 1
+            return 0.0
+        return (need - bucket[0]) / rate
+
+    def _shared_bucket(self, url):
+        with self._cond:
+            bucket = self._shared.get(url)
+            if bucket is None:
+                bucket = self._shared[url] = SharedTokenBucket(url)
+            return bucket
+
+    def _reserve_slot(self, config, priority):
+        """Ocupar un hueco de concurrencia (con ``_cond`` adquirido); False si no hay o cede a una interactiva"""
+        concurrency = config.get('max_concurrency') or 0
+        if concurrency:
+            if self.active >= concurrency:
+                return False
+            if priority == PRIORITY_BACKGROUND and self.waiting[PRIORITY_INTERACTIVE]:
+                return False
+        self.active += 1
+        return True
+
+    def acquire(self, config, priority=None):
+        """Esperar hueco y ficha; devuelve los segundos esperados o lanza ``SupersetThrottledError``"""
+        priority = priority or request_priority()
+        current = current_deadline()
+        budget = current.remaining() if current is not None else float(config.get('timeout', 30))
+        rate = float(config.get('rate_limit') or 0)
+        shared = self._shared_bucket(config['url']) if rate and config.get('rate_limit_shared') else None
+        started = time.monotonic()
+
+        def wait_or_fail(wait):
+            # Con ``_cond`` adquirido: esperar a un hueco libre (None) o a la próxima ficha
+            remaining = budget - (time.monotonic() - started)
+            if remaining <= 0:
+                raise SupersetThrottledError(
+                    f'Límite de llamadas a Superset: sin hueco en {budget:.1f}s ({priority})')
+            self._cond.wait(remaining if wait is None else min(remaining, wait))
+
+        with self._cond:
+            self.waiting[priority] += 1
+        try:
+            while True:
+                with self._cond:
+                    if not self._reserve_slot(config, priority):
+                        wait_or_fail(None)
+                        continue
+                    wait = self._take_local_token(config['url'], rate, priority) if rate and not shared else 0.0
+                    if wait:
+                        self.active -= 1
+                        wait_or_fail(wait)
+                        continue
+                    if not shared:
+                        return time.monotonic() - started
+                # Bucket compartido: fichero y flock fuera del lock del proceso, con el hueco reservado
+                wait = shared.take(rate, *self._bucket_limits(rate, priority))
+                if not wait:
+                    return time.monotonic() - started
+                with self._cond:
+                    self.active -= 1
+                    self._cond.notify_all()
+                    wait_or_fail(wait)
+        finally:
+            with self._cond:
+                self.waiting[priority] -= 1
+
+    def release(self):
+        with self._cond:
+            self.active = max(0, self.active - 1)
+            self._cond.notify_all()
+
+
+OUTBOUND_LIMITER = OutboundLimiter()
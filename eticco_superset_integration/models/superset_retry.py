@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+"""
+Reintentos con backoff exponencial y jitter, presupuesto de reintentos y
+peticiones de cobertura (hedging) para las llamadas idempotentes a Superset
+
+Solo se reintentan fallos transitorios de red o del balanceador: error de
+conexión, timeout de conexión y HTTP 502/503/504. Un timeout de lectura no se
+reintenta (el servidor ya está trabajando); para la cola de latencia están
+las peticiones de cobertura: si un GET supera el p95 observado del endpoint
+se lanza un duplicado y se usa la primera respuesta.
+
+Cada proceso mantiene un presupuesto de reintentos (token bucket): cada
+petición original aporta ``RETRY_BUDGET_RATIO`` fichas y cada reintento o
+duplicado consume una, de modo que una caída no multiplica la carga sobre
+Superset por el número de intentos.
+"""
+import random
+import threading
+
+# Reintentos y duplicados permitidos por petición original (10%) y reserva máxima
+RETRY_BUDGET_RATIO = 0.1
+RETRY_BUDGET_MAX = 10.0
+# Backoff: base * 2^intento con jitter completo, acotado
+RETRY_BACKOFF_BASE = 0.1
+RETRY_BACKOFF_MAX = 2.0
+RETRY_STATUSES = (502, 503, 504)
+# Las peticiones de cobertura solo se lanzan con latencias ya observadas suficientes
+HEDGE_MIN_SAMPLES = 20
+HEDGE_MIN_DELAY = 0.05
+
+
+class RetryBudget:
+    """Token bucket de reintentos compartido por todos los hilos del proceso"""
+
+    def __init__(self, ratio=RETRY_BUDGET_RATIO, maximum=RETRY_BUDGET_MAX):
+        self._lock = threading.Lock()
+        self.ratio = ratio
+        self.maximum = maximum
+        self.tokens = maximum
+        self.denied = 0
+
+    def deposit(self):
+        """Una petición original: acumular una fracción de reintento"""
+        with self._lock:
+            self.tokens = min(self.maximum, self.tokens + self.ratio)
+
+    def withdraw(self):
+        """Consumir una ficha para reintentar o duplicar; False si el presupuesto está agotado"""
+        with self._lock:
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            self.denied += 1
+            return False
+
+    def reset(self):
+        with self._lock:
+            self.tokens = self.maximum
+            self.denied = 0
+
+
+RETRY_BUDGET = RetryBudget()
+
+
+def backoff_delay(attempt, rng=random):
+    """Espera antes del reintento ``attempt`` (1, 2...): jitter completo sobre backoff exponencial"""
+    return rng.uniform(0, min(RETRY_BACKOFF_MAX, RETRY_BACKOFF_BASE * (2 ** attempt)))
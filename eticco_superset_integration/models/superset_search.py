@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+"""
+Búsqueda de dashboards sobre el catálogo cacheado (selector del hub)
+
+El selector ya no recibe todas las opciones: pide páginas a
+``superset.analytics.hub.search_dashboards`` según se escribe y se desplaza.
+La coincidencia es por trigramas, como ``pg_trgm``: cada palabra se rellena
+con dos espacios delante y uno detrás, y la similitud de un campo es la
+fracción de trigramas de la búsqueda que aparecen en él. Así "vent",
+"mensual" o "ventas mensuale" encuentran "Ventas Mensuales", y los acentos y
+mayúsculas no cuentan.
+
+Se busca en título, etiquetas y propietarios (con menos peso). El índice
+invertido se construye una vez por versión del catálogo y por proceso, así
+que una búsqueda solo recorre los dashboards que comparten trigramas con el
+texto y no todo el catálogo.
+"""
+import threading
+import unicodedata
+from collections import defaultdict
+
+# Similitud mínima para que un dashboard aparezca en los resultados
+SEARCH_MIN_SIMILARITY = 0.5
+# Peso de cada campo en la puntuación
+SEARCH_FIELD_WEIGHTS = {'title': 1.0, 'tags': 0.8, 'owners': 0.6}
+# Tamaño de página por defecto y máximo que acepta el servidor
+SEARCH_PAGE_SIZE = 50
+SEARCH_MAX_PAGE_SIZE = 200
+
+# Índices por clave de catálogo: (lista del catálogo indexada, índice)
+_SEARCH_INDEXES = {}
+_SEARCH_INDEX_LOCK = threading.Lock()
+
+
+def normalize(text):
+    """Minúsculas sin acentos ni signos: solo letras, dígitos y espacios"""
+    text = unicodedata.normalize('NFKD', text or '').lower()
+    return ''.join(char if char.isalnum() else ' ' for char in text if not unicodedata.combining(char))
+
+
+def trigrams(text):
+    """Trigramas de cada palabra del texto, al estilo de ``pg_trgm``"""
+    result = set()
+    for word in normalize(text).split():
+        padded = f'  {word} '
+        result.update(padded[index:index + 3] for index in range(len(padded) - 2))
+    return result
+
+
+def dashboard_fields(dashboard):
+    """Texto buscable de un dashboard del catálogo por campo"""
+    return {
+        'title': dashboard.get('dashboard_title') or '',
+        'tags': ' '.join(tag.get('name', '') for tag in dashboard.get('tags') or [] if isinstance(tag, dict)),
+        'owners': ' '.join(
+            ' '.join(filter(None, (owner.get('username'), owner.get('first_name'), owner.get('last_name'))))
+            for owner in dashboard.get('owners') or [] if isinstance(owner, dict)
+        ),
+    }
+
+
+class DashboardSearchIndex:
+    """Índice invertido trigrama -> (posición, campo) de los dashboards seleccionables"""
+
+    def __init__(self, dashboards):
+        self.dashboards = dashboards
+        self.titles = [normalize(dashboard.get('dashboard_title')) for dashboard in dashboards]
+        self.postings = defaultdict(list)
+        for position, dashboard in enumerate(dashboards):
+            for field, text in dashboard_fields(dashboard).items():
+                for trigram in trigrams(text):
+                    self.postings[trigram].append((position, field))
+
+    def scores(self, query):
+        """Puntuación de cada posición que supera ``SEARCH_MIN_SIMILARITY`` (+1 si el título contiene el texto)"""
+        query_trigrams = trigrams(query)
+        if not query_trigrams:
+            return {}
+        matches = defaultdict(int)
+        for trigram in query_trigrams:
+            for posting in self.postings.get(trigram, ()):
+                matches[posting] += 1
+        scores = {}
+        for (position, field), count in matches.items():
+            similarity = count / len(query_trigrams)
+            if similarity < SEARCH_MIN_SIMILARITY:
+                continue
+            score = similarity * SEARCH_FIELD_WEIGHTS[field]
+            if score > scores.get(position, 0.0):
+                scores[position] = score
+        # El título que contiene el texto tal cual va por delante de los parecidos
+        needle = ' '.join(normalize(query).split())
+        for position in scores:
+            if needle in self.titles[position]:
+                scores[position] += 1.0
+        return scores
+
+    def search(self, query, usage=None, offset=0, limit=SEARCH_PAGE_SIZE):
+        """Página de resultados y total: por coincidencia, después por uso y por título"""
+        usage = usage or {}
+        if (query or '').strip():
+            scores = self.scores(query)
+            positions = list(scores)
+        else:
+            scores = {}
+            positions = list(range(len(self.dashboards)))
+        positions.sort(key=lambda position: (
+            -scores.get(position, 0.0),
+            -usage.get(self.dashboards[position].get('uuid'), 0.0),
+            self.titles[position],
+        ))
+        page = positions[offset:offset + limit]
+        return [self.dashboards[position] for position in page], len(positions)
+
+
+def get_search_index(cache_key, catalog):
+    """Índice de los dashboards seleccionables del catálogo (se reconstruye si el catálogo cambia)"""
+    with _SEARCH_INDEX_LOCK:
+        entry = _SEARCH_INDEXES.get(cache_key)
+        if entry and entry[0] is catalog:
+            return entry[1]
+    # Mismo criterio que el selector: publicados y con embedding
+    index = DashboardSearchIndex([
+        dashboard for dashboard in catalog
+        if dashboard.get('published') and dashboard.get('embedded_uuid')
+    ])
+    with _SEARCH_INDEX_LOCK:
+        _SEARCH_INDEXES[cache_key] = (catalog, index)
+    return index
+
+
+def clear_search_indexes():
+    with _SEARCH_INDEX_LOCK:
+        _SEARCH_INDEXES.clear()
@@ -0,0 +1,238 @@
+# -*- coding: utf-8 -*-
+"""
+Trazas de las acciones del hub con ID de correlación
+
+Cada acción del widget OWL envía un ``superset_trace_id`` en el contexto de la
+RPC. Las etapas (login, listado, embedded, guest token...) se registran como
+spans y el ID viaja a Superset en las cabeceras ``X-Request-ID`` y
+``traceparent`` para cruzar las trazas de Odoo con los access logs de Superset.
+
+Exportadores (``superset.trace_exporter``):
+
+- ``log``: una línea JSON por traza en el logger ``...superset_tracing``
+- ``otel``: spans a OpenTelemetry si el paquete ``opentelemetry-api`` está instalado
+- ``none``: solo propagación de cabeceras, sin exportar spans
+"""
+import contextvars
+import functools
+import json
+import logging
+import re
+import threading
+import time
+import uuid
+
+_logger = logging.getLogger(__name__)
+
+try:
+    from opentelemetry import trace as otel_trace
+except ImportError:
+    otel_trace = None
+
+_CURRENT_TRACE = contextvars.ContextVar('superset_trace', default=None)
+_CURRENT_SPAN = contextvars.ContextVar('superset_span', default=None)
+
+TRACE_ID_RE = re.compile(r'^[0-9a-f]{32}$')
+
+
+class Trace:
+    """Traza de una acción: ID de correlación y spans registrados"""
+
+    def __init__(self, trace_id, name, exporter='log', uid=None):
+        self.trace_id = trace_id
+        self.name = name
+        self.exporter = exporter
+        self.uid = uid
+        self.spans = []
+        self.lock = threading.Lock()
+
+    def add_span(self, span):
+        with self.lock:
+            self.spans.append(span)
+
+
+def new_trace_id():
+    return uuid.uuid4().hex
+
+
+def current_trace():
+    return _CURRENT_TRACE.get()
+
+
+def current_trace_id():
+    trace = _CURRENT_TRACE.get()
+    return trace.trace_id if trace else None
+
+
+def current_span_name():
+    """Nombre de la etapa en curso (span abierto más interno)"""
+    span = _CURRENT_SPAN.get()
+    return span['name'] if span else None
+
+
+def trace_headers():
+    """Cabeceras de correlación para las peticiones salientes a Superset"""
+    trace = _CURRENT_TRACE.get()
+    if not trace:
+        return {}
+    span = _CURRENT_SPAN.get()
+    span_id = span['span_id'] if span else trace.trace_id[:16]
+    return {
+        'X-Request-ID': trace.trace_id,
+        'traceparent': f'00-{trace.trace_id}-{span_id}-01',
+    }
+
+
+class start_trace:
+    """Abrir una traza (o unirse a la actual si ya hay una en curso)"""
+
+    def __init__(self, name, trace_id=None, exporter='log', uid=None):
+        if trace_id and not TRACE_ID_RE.match(str(trace_id)):
+            trace_id = None
+        self.name = name
+        self.trace_id = trace_id or new_trace_id()
+        self.exporter = exporter
+        self.uid = uid
+        self._token = None
+        self._span = None
+
+    def __enter__(self):
+        if _CURRENT_TRACE.get() is None:
+            self._token = _CURRENT_TRACE.set(Trace(self.trace_id, self.name, self.exporter, self.uid))
+        self._span = trace_span(self.name)
+        self._span.__enter__()
+        return _CURRENT_TRACE.get()
+
+    def __exit__(self, exc_type, exc, tb):
+        self._span.__exit__(exc_type, exc, tb)
+        if self._token is not None:
+            trace = _CURRENT_TRACE.get()
+            _CURRENT_TRACE.reset(self._token)
+            _export(trace)
+        return False
+
+
+class trace_span:
+    """Registrar una etapa como span con inicio y duración"""
+
+    def __init__(self, name, **attributes):
+        self.name = name
+        self.attributes = attributes
+        self.span = None
+        self._token = None
+        self._started = None
+
+    def __enter__(self):
+        trace = _CURRENT_TRACE.get()
+        if trace is None:
+            return self
+        parent = _CURRENT_SPAN.get()
+        self.span = {
+            'span_id': uuid.uuid4().hex[:16],
+            'parent_id': parent['span_id'] if parent else None,
+            'name': self.name,
+            'start': time.time(),
+            'attributes': dict(self.attributes),
+        }
+        self._started = time.perf_counter()
+        self._token = _CURRENT_SPAN.set(self.span)
+        return self
+
+    def set(self, **attributes):
+        if self.span is not None:
+            self.span['attributes'].update(attributes)
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.span is None:
+            return False
+        self.span['duration_ms'] = round((time.perf_counter() - self._started) * 1000, 2)
+        if exc_type:
+            self.span['error'] = f'{exc_type.__name__}: {exc}'[:200]
+        _CURRENT_SPAN.reset(self._token)
+        _CURRENT_TRACE.get().add_span(self.span)
+        return False
+
+
+def bind_trace(func):
+    """Propagar traza y span actuales a un callable que se ejecuta en otro hilo"""
+    trace, span = _CURRENT_TRACE.get(), _CURRENT_SPAN.get()
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        trace_token = _CURRENT_TRACE.set(trace)
+        span_token = _CURRENT_SPAN.set(span)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _CURRENT_SPAN.reset(span_token)
+            _CURRENT_TRACE.reset(trace_token)
+    return wrapper
+
+
+def traced(name):
+    """Decorador para puntos de entrada del hub: traza con el ID recibido del widget
+
+    Al terminar vuelca el diario de llamadas lentas y el uso de dashboards si
+    sus buffers lo requieren.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            exporter = self.env['ir.config_parameter'].sudo().get_param('superset.trace_exporter', 'log')
+            try:
+                with start_trace(name, self.env.context.get('superset_trace_id'), exporter, self.env.uid):
+                    return func(self, *args, **kwargs)
+            finally:
+                self.env['superset.call.log']._flush_journal_if_due()
+                self.env['superset.dashboard.usage']._flush_usage_if_due()
+        return wrapper
+    return decorator
+
+
+def _export(trace):
+    if not trace or trace.exporter == 'none':
+        return
+    try:
+        if trace.exporter == 'otel' and otel_trace:
+            _export_otel(trace)
+        else:
+            _logger.info('SUPERSET TRACE %s', json.dumps({
+                'trace_id': trace.trace_id,
+                'name': trace.name,
+                'spans': sorted(trace.spans, key=lambda s: s['start']),
+            }, default=str))
+    except Exception as e:
+        _logger.debug('Error exportando traza %s: %s', trace.trace_id, str(e))
+
+
+def _export_otel(trace):
+    """Reemitir los spans registrados a través del SDK de OpenTelemetry configurado
+
+    El trace id de OpenTelemetry es el ID de correlación (el de ``X-Request-ID``
+    y ``traceparent``) y cada span cuelga del de su etapa padre, de modo que una
+    acción del hub (y las RPC que comparten ID) se ven como una sola traza.
+    """
+    tracer = otel_trace.get_tracer('eticco_superset_integration')
+    # Las raíces cuelgan del padre que anuncia ``trace_headers`` cuando no hay span abierto
+    root = otel_trace.set_span_in_context(otel_trace.NonRecordingSpan(otel_trace.SpanContext(
+        trace_id=int(trace.trace_id, 16),
+        span_id=int(trace.trace_id[:16], 16),
+        is_remote=True,
+        trace_flags=otel_trace.TraceFlags(otel_trace.TraceFlags.SAMPLED),
+    )))
+    contexts = {}
+    # Los padres empiezan antes (o a la vez y duran más) que sus hijos
+    for span in sorted(trace.spans, key=lambda s: (s['start'], -s.get('duration_ms', 0))):
+        start_ns = int(span['start'] * 1e9)
+        otel_span = tracer.start_span(
+            span['name'], context=contexts.get(span['parent_id'], root), start_time=start_ns,
+            attributes=dict(
+                span['attributes'],
+                **{'superset.trace_id': trace.trace_id, 'superset.span_id': span['span_id'],
+                   'superset.parent_id': span['parent_id'] or ''}
+            ),
+        )
+        if span.get('error'):
+            otel_span.set_attribute('error', span['error'])
+        otel_span.end(end_time=start_ns + int(span.get('duration_ms', 0) * 1e6))
+        contexts[span['span_id']] = otel_trace.set_span_in_context(otel_span)
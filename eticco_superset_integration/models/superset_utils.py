@@ -1,16 +1,97 @@
 # -*- coding: utf-8 -*-
 from odoo import models, fields, api, _
 from odoo.exceptions import ValidationError, UserError
+from odoo.modules.registry import Registry
 import requests
 import logging
 import functools
+import base64
+import json
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor, Future, FIRST_COMPLETED, wait
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+from .superset_metrics import METRICS
+from .superset_tracing import (
+    trace_span, trace_headers, bind_trace, traced, current_trace, current_span_name, start_trace,
+)
+from .superset_call_log import CALL_JOURNAL
+from .superset_profiling import profiled
+from .superset_deadline import (
+    SupersetDeadlineExceeded, MIN_REQUEST_BUDGET, deadline, bind_deadline, current_deadline, request_timeout,
+    with_deadline, flow_budget,
+)
+from .superset_circuit_breaker import (
+    SupersetCircuitOpenError, CIRCUIT_PROBE_TIMEOUT, get_circuit_breaker, is_circuit_failure,
+)
+from .superset_adaptive_timeout import ADAPTIVE_TIMEOUTS
+from .superset_node_pool import NODE_POOL, parse_nodes
+from .superset_rate_limit import OUTBOUND_LIMITER, SupersetThrottledError, request_priority
+from .superset_bus import BUS_CATALOG_DIFF, BUS_CATALOG_READY, BUS_STATUS, BUS_STATUS_FIELDS, BUS_WATCHED_FIELDS, bus_channel, catalog_diff, catalog_snapshot
+from .superset_search import SEARCH_PAGE_SIZE, get_search_index, clear_search_indexes
+from .superset_retry import RETRY_BUDGET, RETRY_STATUSES, HEDGE_MIN_SAMPLES, HEDGE_MIN_DELAY, backoff_delay
 
 _logger = logging.getLogger(__name__)
 
 # Cache global para tokens y estado del sistema
 _SUPERSET_CACHE = {}
 
+# Miniaturas de dashboards guardadas como ir.attachment
+THUMBNAIL_PREFIX = 'superset_thumbnail_'
+THUMBNAIL_RES_MODEL = 'superset.analytics.hub'
+THUMBNAIL_COLUMNS = ['id', 'uuid', 'published', 'changed_on_utc', 'thumbnail_url']
+
+# Plantillas de endpoints de la API de Superset (etiqueta de métricas)
+EP_LOGIN = '/api/v1/security/login'
+EP_GUEST_TOKEN = '/api/v1/security/guest_token/'
+EP_DASHBOARD_LIST = '/api/v1/dashboard/'
+EP_EMBEDDED = '/api/v1/dashboard/{id}/embedded'
+EP_CHARTS = '/api/v1/dashboard/{id}/charts'
+EP_THUMBNAIL = '/api/v1/dashboard/{id}/thumbnail/{digest}/'
+EP_WARM_UP = '/api/v1/chart/warm_up_cache'
+EP_HEALTH = '/health'
+
+# Endpoints interactivos de metadatos con timeout adaptativo. Charts, warm-up y miniaturas
+# ejecutan consultas lentas a propósito y conservan el ``superset.timeout`` completo
+ADAPTIVE_ENDPOINTS = frozenset((EP_LOGIN, EP_GUEST_TOKEN, EP_DASHBOARD_LIST, EP_EMBEDDED, EP_HEALTH))
+
+# Un dashboard recién calentado no se vuelve a calentar durante este tiempo
+WARMUP_COOLDOWN = 600
+
+# Catálogo de dashboards (listado + UUIDs de embedding) compartido por hub y Settings
+CATALOG_TTL = 300
+# Caducado el catálogo, se sirve la copia anterior hasta este tiempo mientras se refresca en segundo plano
+CATALOG_STALE_TTL = 3600
+# El estado del monitor de salud se considera antiguo pasado este tiempo (el cron corre cada minuto)
+HEALTH_STALE_AFTER = 300
+# Los UUIDs de embedding se reutilizan mientras el dashboard no cambie (changed_on)
+EMBEDDED_TTL = 3600
+
+
+# Métodos que se reintentan por defecto (el resto solo con ``retry=True``)
+IDEMPOTENT_METHODS = ('get', 'head')
+
+# Peticiones idempotentes en vuelo: clave -> Future compartido por los hilos que la esperan
+_IN_FLIGHT = {}
+_IN_FLIGHT_LOCK = threading.Lock()
+
+# Hilos para las peticiones de cobertura (hedging) de los GET lentos
+_HEDGE_EXECUTOR = ThreadPoolExecutor(max_workers=8, thread_name_prefix='superset_hedge')
+
+# Refrescos de catálogo en segundo plano en curso (uno por clave de cache y proceso)
+_CATALOG_REFRESHES = {}
+_CATALOG_REFRESH_LOCK = threading.Lock()
+
+
+class SupersetAPIError(UserError):
+    """Respuesta de error de la API de Superset conservando el código HTTP"""
+
+    def __init__(self, message, status_code=None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
 def cache_result(cache_key_func, duration=300):
     """Decorador para cachear resultados en memoria global"""
     def decorator(func):
@@ -25,7 +106,9 @@ def cache_result(cache_key_func, duration=300):
             # Verificar cache
             cache_entry = _SUPERSET_CACHE.get(cache_key)
             if cache_entry and cache_entry['expires'] > time.time():
+                METRICS.record_cache(func.__name__, hit=True)
                 return cache_entry['data']
+            METRICS.record_cache(func.__name__, hit=False)
             
             # Ejecutar función y cachear resultado
             result = func(self, *args, **kwargs)
@@ -38,6 +121,339 @@ def cache_result(cache_key_func, duration=300):
     return decorator
 
 
+def superset_request(method, config, path, endpoint, access_token=None, headers=None, retry=None, **kwargs):
+    """Petición HTTP a Superset: punto único de salida instrumentado con métricas
+
+    ``path`` es relativo a ``config['url']`` y ``endpoint`` es la plantilla de la
+    ruta (p. ej. ``EP_EMBEDDED``) usada como etiqueta de baja cardinalidad.
+    Las llamadas lentas o fallidas se anotan en el diario ``superset.call.log``.
+    Las excepciones de ``requests`` se propagan para que cada flujo las traduzca.
+
+    Los GET (y las llamadas con ``retry=True``, como la emisión de tokens) se
+    reintentan ante fallos transitorios con backoff y jitter, dentro del
+    deadline y del presupuesto de reintentos del proceso (ver ``superset_retry``).
+    Un GET idéntico (URL, parámetros y token) ya en vuelo en otro hilo no se
+    repite: se espera y se comparte su respuesta. Con varios nodes configurados
+    cada intento va al nodo elegido por ``NODE_POOL`` (ver ``superset_node_pool``).
+    """
+    headers = dict(headers or {})
+    if access_token:
+        headers['Authorization'] = f'Bearer {access_token}'
+    if retry is None:
+        retry = method.lower() in IDEMPOTENT_METHODS
+    attempts = max(1, config.get('retry_attempts', 1)) if retry else 1
+    hedge = retry and config.get('hedge_requests') and method.lower() == 'get'
+    RETRY_BUDGET.deposit()
+
+    nodes = config.get('nodes') or [{'url': config['url'], 'public_url': config['url']}]
+
+    def send():
+        # Cada intento recalcula su timeout con lo que queda del deadline y elige nodo;
+        # si el nodo no conecta se repite al momento en otro (failover)
+        tried = []
+        while True:
+            node = NODE_POOL.choose(nodes, tried)
+            started = time.perf_counter()
+            try:
+                response = _send_request(method, dict(config, url=node['url']), path, endpoint,
+                                         dict(headers), dict(kwargs))
+            except requests.exceptions.ConnectionError:
+                NODE_POOL.mark_down(node['url'])
+                tried.append(node['url'])
+                if len(tried) >= len(nodes):
+                    raise
+                _logger.warning('🔀 Nodo de Superset %s no disponible, probando otro', node['url'])
+                continue
+            NODE_POOL.observe(node['url'], time.perf_counter() - started)
+            return response
+
+    def run():
+        for attempt in range(1, attempts + 1):
+            last = attempt == attempts
+            try:
+                response = _hedged_request(send, endpoint) if hedge else send()
+            except (SupersetCircuitOpenError, SupersetDeadlineExceeded):
+                raise
+            except requests.exceptions.ConnectionError as e:
+                # Incluye ConnectTimeout; un ReadTimeout no llega aquí y no se reintenta
+                if last or not _wait_for_retry(endpoint, attempt):
+                    raise
+                _logger.info('🔁 Reintentando %s %s (%s/%s): %s', method.upper(), endpoint, attempt + 1, attempts,
+                             e.__class__.__name__)
+            else:
+                if response.status_code not in RETRY_STATUSES or last or not _wait_for_retry(endpoint, attempt):
+                    return response
+                _logger.info('🔁 Reintentando %s %s (%s/%s): HTTP %s', method.upper(), endpoint, attempt + 1, attempts,
+                             response.status_code)
+
+    if config.get('coalesce_requests') and method.lower() in IDEMPOTENT_METHODS \
+            and 'json' not in kwargs and 'data' not in kwargs:
+        # Sin deadline, un seguidor espera como mucho lo que el líder puede tardar en un intento
+        max_wait = float(config.get('timeout', 30)) + float(config.get('connect_timeout') or 0)
+        return _coalesced(_coalesce_key(method, config, path, access_token, kwargs), endpoint, run, max_wait)
+    return run()
+
+
+def _coalesce_key(method, config, path, access_token, kwargs):
+    """Identidad de una petición idempotente: método, URL, parámetros y credencial"""
+    params = kwargs.get('params')
+    if isinstance(params, dict):
+        params = tuple(sorted(params.items()))
+    return (method.lower(), f"{config['url']}{path}", repr(params), access_token)
+
+
+def _coalesced(key, endpoint, call, max_wait):
+    """Unirse a una petición idéntica en vuelo o ejecutarla y compartir su resultado
+
+    El primer hilo (líder) hace la llamada; los que llegan mientras tanto
+    esperan su respuesta (o su excepción) sin enviar nada, como mucho hasta
+    agotar su propio deadline o, sin deadline, ``max_wait`` segundos.
+    """
+    with _IN_FLIGHT_LOCK:
+        future = _IN_FLIGHT.get(key)
+        leader = future is None
+        if leader:
+            future = _IN_FLIGHT[key] = Future()
+    METRICS.record_cache('coalesced_request', hit=not leader)
+
+    if not leader:
+        current = current_deadline()
+        with trace_span(f'GET {endpoint}', endpoint=endpoint, status='coalesced'):
+            try:
+                return future.result(timeout=current.remaining() if current is not None else max_wait)
+            except FutureTimeoutError:
+                if current is None:
+                    raise SupersetDeadlineExceeded(
+                        f'Sin respuesta en {max_wait:g}s esperando una petición en curso')
+                raise SupersetDeadlineExceeded(
+                    f'Presupuesto de {current.budget:g}s agotado esperando una petición en curso')
+
+    try:
+        result = call()
+    except BaseException as e:
+        future.set_exception(e)
+        raise
+    else:
+        future.set_result(result)
+        return result
+    finally:
+        with _IN_FLIGHT_LOCK:
+            _IN_FLIGHT.pop(key, None)
+
+
+def _wait_for_retry(endpoint, attempt):
+    """Esperar el backoff antes de reintentar; False si no cabe en el deadline o no hay presupuesto"""
+    delay = backoff_delay(attempt)
+    current = current_deadline()
+    if current is not None and current.remaining() - delay < MIN_REQUEST_BUDGET:
+        return False
+    if not RETRY_BUDGET.withdraw():
+        METRICS.record_retry(endpoint, 'denied')
+        return False
+    METRICS.record_retry(endpoint, 'retry')
+    time.sleep(delay)
+    return True
+
+
+def _hedged_request(send, endpoint):
+    """Lanzar un duplicado si la petición supera el p95 observado del endpoint y usar la primera respuesta"""
+    threshold = METRICS.latency_quantile(endpoint, 0.95, HEDGE_MIN_SAMPLES)
+    if threshold is None:
+        return send()
+    primary = _HEDGE_EXECUTOR.submit(bind_trace(bind_deadline(send)))
+    done, _pending = wait([primary], timeout=max(threshold, HEDGE_MIN_DELAY))
+    if done or not RETRY_BUDGET.withdraw():
+        return primary.result()
+    METRICS.record_retry(endpoint, 'hedge')
+    hedge = _HEDGE_EXECUTOR.submit(bind_trace(bind_deadline(send)))
+    done, pending = wait([primary, hedge], return_when=FIRST_COMPLETED)
+    first = done.pop()
+    if first.exception() is not None and pending:
+        # La primera en terminar ha fallado: la otra aún puede responder
+        return pending.pop().result()
+    return first.result()
+
+
+def _send_request(method, config, path, endpoint, headers, kwargs):
+    """Un intento de petición: deadline, circuit breaker, límite de llamadas, métricas y diario"""
+    stage = current_span_name()
+    breaker = get_circuit_breaker(config['url']) if config.get('circuit_threshold') else None
+    limiter = OUTBOUND_LIMITER if config.get('rate_limit') or config.get('max_concurrency') else None
+    own_timeout = 'timeout' not in kwargs
+    adaptive_endpoint = endpoint if endpoint in ADAPTIVE_ENDPOINTS else None
+
+    with trace_span(f'{method.upper()} {endpoint}', endpoint=endpoint) as span:
+        # Fallos inmediatos: no cuentan como llamada HTTP en métricas ni en el diario
+        try:
+            # Timeout (conexión, lectura) acotado por lo que queda del deadline de la operación
+            kwargs.setdefault('timeout', request_timeout(config, adaptive_endpoint))
+        except SupersetDeadlineExceeded:
+            span.set(status='deadline_exceeded')
+            raise
+        if breaker:
+            try:
+                breaker.before_request(config.get('circuit_reset_timeout', 30), lambda: _probe_health(config))
+            except SupersetCircuitOpenError:
+                span.set(status='circuit_open')
+                raise
+        if limiter:
+            priority = request_priority()
+            try:
+                waited = limiter.acquire(config, priority)
+            except SupersetThrottledError:
+                span.set(status='throttled')
+                METRICS.record_throttle(endpoint, priority, 'rejected')
+                raise
+            if waited:
+                METRICS.record_throttle(endpoint, priority, 'delayed')
+                if own_timeout:
+                    try:
+                        kwargs['timeout'] = request_timeout(config, adaptive_endpoint)
+                    except SupersetDeadlineExceeded:
+                        limiter.release()
+                        span.set(status='deadline_exceeded')
+                        raise
+        # Correlación con los access logs de Superset
+        headers.update(trace_headers())
+        status = 'error'
+        started = time.perf_counter()
+        try:
+            response = getattr(requests, method.lower())(f"{config['url']}{path}", headers=headers, **kwargs)
+            status = response.status_code
+            return response
+        except requests.exceptions.Timeout:
+            status = 'timeout'
+            raise
+        except requests.exceptions.ConnectionError:
+            status = 'connection_error'
+            raise
+        finally:
+            duration = time.perf_counter() - started
+            METRICS.observe_request(endpoint, method, status, duration)
+            if adaptive_endpoint and isinstance(status, int):
+                ADAPTIVE_TIMEOUTS.observe(config['url'], endpoint, duration)
+            elif adaptive_endpoint and status == 'timeout':
+                ADAPTIVE_TIMEOUTS.record_timeout(config['url'], endpoint)
+            span.set(status=str(status))
+            trace = current_trace()
+            CALL_JOURNAL.record(
+                endpoint, method, status, duration, config.get('slow_call_ms', 1000),
+                stage=stage, uid=trace.uid if trace else None, trace_id=trace.trace_id if trace else None,
+            )
+            if limiter:
+                limiter.release()
+            if breaker:
+                if is_circuit_failure(status):
+                    breaker.record_failure(config['circuit_threshold'])
+                else:
+                    breaker.record_success()
+
+
+def _probe_health(config):
+    """Sonda de semiapertura del circuit breaker: un GET a /health con timeout corto"""
+    status = 'error'
+    started = time.perf_counter()
+    try:
+        response = requests.get(f"{config['url']}/health",
+                                timeout=min(CIRCUIT_PROBE_TIMEOUT, config.get('timeout', 30)))
+        status = response.status_code
+        return status == 200
+    except requests.exceptions.RequestException:
+        return False
+    finally:
+        METRICS.observe_request(EP_HEALTH, 'get', status, time.perf_counter() - started)
+
+
+def _fetch_dashboard_charts(config, access_token, dashboard_id):
+    """Charts de un dashboard (se ejecuta en hilos del pool, sin acceso al ORM)"""
+    try:
+        response = superset_request('get', config, f'/api/v1/dashboard/{dashboard_id}/charts', EP_CHARTS,
+                                    access_token=access_token)
+        if response.status_code != 200:
+            _logger.debug('No se pudieron obtener charts del dashboard %s (HTTP %s)',
+                          dashboard_id, response.status_code)
+            return []
+        return [{
+            'dashboard_id': dashboard_id,
+            'chart_id': chart.get('id'),
+            'chart_name': chart.get('slice_name') or '',
+        } for chart in response.json().get('result', []) if chart.get('id')]
+    except requests.exceptions.RequestException as e:
+        _logger.debug('Error obteniendo charts del dashboard %s: %s', dashboard_id, str(e))
+        return []
+
+
+def _warm_up_chart(config, access_token, job):
+    """Calentar un chart y medir la duración (hilo del pool, sin acceso al ORM)"""
+    started = time.time()
+    result = dict(job, status='ok', error=False)
+    try:
+        response = superset_request(
+            'put', config, '/api/v1/chart/warm_up_cache', EP_WARM_UP,
+            access_token=access_token,
+            json={'chart_id': job['chart_id'], 'dashboard_id': job['dashboard_id']},
+            headers={'Content-Type': 'application/json'}
+        )
+        if response.status_code != 200:
+            result.update(status='error', error=f'HTTP {response.status_code}')
+        else:
+            viz_errors = [r.get('viz_error') for r in response.json().get('result', []) if r.get('viz_error')]
+            if viz_errors:
+                result.update(status='error', error=str(viz_errors[0])[:200])
+    except requests.exceptions.Timeout:
+        result.update(status='timeout', error='Timeout')
+    except requests.exceptions.RequestException as e:
+        result.update(status='error', error=str(e)[:200])
+    result['duration_ms'] = (time.time() - started) * 1000
+    return result
+
+
+def _background_thread(dbname, uid, company_id, job, name, context=None):
+    """Hilo (sin arrancar) que ejecuta ``job(utils)`` con cursor y entorno propios
+
+    Al hilo solo pasan la base de datos, el usuario y la empresa: nunca el
+    entorno ni el cursor de la petición que lo lanza, que se cierran al
+    responder. Lo que escriba ``job`` se confirma al terminar.
+    """
+    def run():
+        try:
+            with Registry(dbname).cursor() as cr:
+                utils = api.Environment(cr, uid, dict(context or {}))['superset.utils']
+                job(utils.with_company(company_id) if company_id else utils)
+        except Exception as e:
+            _logger.warning('⚠️ Error en la tarea de Superset en segundo plano %s: %s', name, str(e))
+    return threading.Thread(target=run, name=name, daemon=True)
+
+
+def _detached_thread(dbname, uid, company_id, fetch, apply, name, context=None):
+    """Hilo (sin arrancar) que habla con Superset sin retener ninguna conexión a PostgreSQL
+
+    Tres fases: una transacción corta lee la configuración; ``fetch(utils,
+    config)`` hace la E/S con Superset con el cursor ya devuelto al pool (solo
+    HTTP y cache en memoria, sin tocar el ORM); y ``apply(utils, config,
+    resultado)`` guarda el resultado en otra transacción corta. Un Superset
+    lento retiene el hilo, nunca una conexión del pool de Odoo.
+    """
+    context = dict(context or {})
+
+    def run():
+        try:
+            with Registry(dbname).cursor() as cr:
+                utils = api.Environment(cr, uid, context)['superset.utils']
+                if company_id:
+                    utils = utils.with_company(company_id)
+                config = utils.get_superset_config()
+                exporter = utils.env['ir.config_parameter'].sudo().get_param('superset.trace_exporter', 'log')
+            with start_trace(name, context.get('superset_trace_id'), exporter, uid):
+                result = fetch(utils, config)
+            if apply:
+                with Registry(dbname).cursor() as cr:
+                    apply(utils.with_env(utils.env(cr=cr)), config, result)
+        except Exception as e:
+            _logger.warning('⚠️ Error en la tarea de Superset en segundo plano %s: %s', name, str(e))
+    return threading.Thread(target=run, name=name, daemon=True)
+
+
 class SupersetUtils(models.AbstractModel):
     """Utilidades comunes para integración con Superset"""
     _name = 'superset.utils'
@@ -45,16 +461,45 @@ class SupersetUtils(models.AbstractModel):
 
     @api.model
     def get_superset_config(self):
-        """Obtener configuración de Superset de manera centralizada"""
+        """Obtener configuración de Superset de manera centralizada
+
+        Global (parámetros ``superset.*``) salvo que la empresa activa tenga una
+        ``superset.connection`` asignada.
+        """
         ICPSudo = self.env['ir.config_parameter'].sudo()
+        url = ICPSudo.get_param('superset.url', '').rstrip('/')
         config = {
-            'url': ICPSudo.get_param('superset.url', '').rstrip('/'),
+            'url': url,
+            'nodes': parse_nodes(url, ICPSudo.get_param('superset.node_urls', '')),
             'username': ICPSudo.get_param('superset.username', ''),
             'password': ICPSudo.get_param('superset.password', ''),
             'timeout': int(ICPSudo.get_param('superset.timeout', '30')),
+            'connect_timeout': int(ICPSudo.get_param('superset.connect_timeout', '5')),
+            'budget_interactive': flow_budget(self.env, 'interactive'),
+            'budget_cron': flow_budget(self.env, 'cron'),
             'debug_mode': ICPSudo.get_param('superset.debug_mode', 'False').lower() == 'true',
             'cache_tokens': ICPSudo.get_param('superset.cache_tokens', 'True').lower() == 'true',
+            'thumbnails': ICPSudo.get_param('superset.thumbnails', 'True').lower() == 'true',
+            'warmup_concurrency': int(ICPSudo.get_param('superset.warmup_concurrency', '4')),
+            'trace_exporter': ICPSudo.get_param('superset.trace_exporter', 'log'),
+            'slow_call_ms': int(ICPSudo.get_param('superset.slow_call_threshold_ms', '1000')),
+            'circuit_threshold': int(ICPSudo.get_param('superset.circuit_failure_threshold', '5')),
+            'circuit_reset_timeout': int(ICPSudo.get_param('superset.circuit_reset_timeout', '30')),
+            'retry_attempts': int(ICPSudo.get_param('superset.retry_attempts', '3')),
+            'hedge_requests': ICPSudo.get_param('superset.hedge_requests', 'False').lower() == 'true',
+            'adaptive_timeouts': ICPSudo.get_param('superset.adaptive_timeouts', 'True').lower() == 'true',
+            'rate_limit': float(ICPSudo.get_param('superset.rate_limit', '50')),
+            'max_concurrency': int(ICPSudo.get_param('superset.max_concurrency', '8')),
+            'rate_limit_shared': ICPSudo.get_param('superset.rate_limit_shared', 'False').lower() == 'true',
+            'coalesce_requests': ICPSudo.get_param('superset.coalesce_requests', 'True').lower() == 'true',
+            'catalog_ttl': CATALOG_TTL,
+            'connection_id': False,
+            'connection_key': 'default',
         }
+        # Conexión propia de la empresa activa: sustituye URL, credenciales, timeouts y cache
+        connection = self.env['superset.connection']._for_company(self.env.company)
+        if connection:
+            config.update(connection._config_values())
         return config
 
     @api.model
@@ -92,10 +537,11 @@ class SupersetUtils(models.AbstractModel):
             
         self.validate_config(config)
         
-        cache_key = f"superset_token_{hash(config['url'] + config['username'])}"
+        cache_key = f"superset_token_{config.get('connection_key', 'default')}_{hash(config['url'] + config['username'])}"
         
         if config.get('cache_tokens') and not force_refresh:
             cached_token = self._get_cached_token(cache_key)
+            METRICS.record_cache('access_token', hit=bool(cached_token))
             if cached_token:
                 return cached_token
         
@@ -129,18 +575,17 @@ class SupersetUtils(models.AbstractModel):
     def _fetch_new_token(self, config):
         """Obtener nuevo token desde Superset API"""
         try:
-            login_url = f"{config['url']}/api/v1/security/login"
             login_data = {
                 'username': config['username'],
                 'password': config['password'],
                 'provider': 'db'
             }
             
-            response = requests.post(
-                login_url,
+            response = superset_request(
+                'post', config, '/api/v1/security/login', EP_LOGIN,
                 json=login_data,
                 headers={'Content-Type': 'application/json'},
-                timeout=config.get('timeout', 30)
+                retry=True,
             )
             
             if response.status_code == 401:
@@ -202,8 +647,7 @@ class SupersetUtils(models.AbstractModel):
     def _test_health_endpoint(self, config):
         """Probar endpoint de salud"""
         try:
-            health_url = f"{config['url']}/health"
-            response = requests.get(health_url, timeout=config.get('timeout', 30))
+            response = superset_request('get', config, '/health', EP_HEALTH)
             
             if response.status_code != 200:
                 raise UserError(_('Superset no está disponible (HTTP %s)') % response.status_code)
@@ -219,13 +663,8 @@ class SupersetUtils(models.AbstractModel):
     def _test_api_access(self, config, access_token):
         """Probar acceso a la API de dashboards"""
         try:
-            dashboards_url = f"{config['url']}/api/v1/dashboard/"
-            
-            response = requests.get(
-                dashboards_url,
-                headers={'Authorization': f'Bearer {access_token}'},
-                timeout=config.get('timeout', 30)
-            )
+            response = superset_request('get', config, '/api/v1/dashboard/', EP_DASHBOARD_LIST,
+                                        access_token=access_token)
             
             if response.status_code == 401:
                 raise UserError(_('Token de acceso inválido o expirado'))
@@ -243,6 +682,598 @@ class SupersetUtils(models.AbstractModel):
         except requests.exceptions.RequestException as e:
             raise UserError(_('Error de red: %s') % str(e))
 
+    def _fetch_dashboards(self, config, access_token, columns=None, page_size=100):
+        """Listar dashboards paginando la API (q en formato rison)"""
+        columns_rison = f",columns:!({','.join(columns)})" if columns else ''
+        dashboards = []
+        page = 0
+
+        while True:
+            params = {'q': f'(page:{page},page_size:{page_size}{columns_rison})'}
+            response = superset_request('get', config, '/api/v1/dashboard/', EP_DASHBOARD_LIST,
+                                        access_token=access_token, params=params)
+            if response.status_code != 200:
+                raise SupersetAPIError(_('Error accediendo a API de dashboards (HTTP %s)') % response.status_code,
+                                       status_code=response.status_code)
+
+            data = response.json()
+            result = data.get('result', [])
+            dashboards.extend(result)
+
+            if len(result) < page_size or len(dashboards) >= data.get('count', 0):
+                break
+            page += 1
+
+        return dashboards
+
+    # ------------------------------------------------------------------
+    # Catálogo de dashboards
+    # ------------------------------------------------------------------
+
+    def _catalog_cache_keys(self, config):
+        scope = f"{config.get('connection_key', 'default')}_{hash(config['url'] + config.get('username', ''))}"
+        return f'dashboard_catalog_{scope}', f'embedded_uuids_{scope}'
+
+    @api.model
+    def get_dashboard_catalog(self, config=None, access_token=None, force_refresh=False, wait=True):
+        """Listado de dashboards con su UUID de embedding, cacheado ``CATALOG_TTL`` segundos
+
+        Es la única fuente de dashboards para el selector, el hub, el estado del
+        sistema y Settings: con el catálogo caliente ninguno hace peticiones HTTP.
+        Caducado el TTL se sigue sirviendo la copia anterior (hasta
+        ``CATALOG_STALE_TTL``) y se reconstruye en un hilo aparte, de modo que
+        solo el primer acceso (cache vacía) o ``force_refresh`` esperan a Superset.
+        Con ``wait=False`` (RPC del hub, dentro de la transacción) tampoco el
+        primer acceso espera: se lanza la construcción y se devuelve None.
+        Los errores HTTP del listado se propagan como ``SupersetAPIError``.
+        """
+        if not config:
+            config = self.get_superset_config()
+        catalog_key, _embedded_key = self._catalog_cache_keys(config)
+        now = time.time()
+
+        cache_entry = _SUPERSET_CACHE.get(catalog_key)
+        if cache_entry and not force_refresh:
+            if cache_entry['expires'] > now:
+                METRICS.record_cache('dashboard_catalog', hit=True)
+                return cache_entry['data']
+            if cache_entry.get('stale_until', 0) > now:
+                METRICS.record_cache('dashboard_catalog_stale', hit=True)
+                self._schedule_catalog_refresh(config)
+                return cache_entry['data']
+        METRICS.record_cache('dashboard_catalog', hit=False)
+
+        if not wait and not getattr(threading.current_thread(), 'testing', False):
+            self._schedule_catalog_refresh(config, notify=True)
+            return None
+        return self._build_dashboard_catalog(config, access_token, reuse_embedded=not force_refresh)
+
+    def _build_dashboard_catalog(self, config, access_token=None, reuse_embedded=True):
+        """Pedir el listado a Superset y guardar el catálogo en cache (sin acceso al ORM)
+
+        El UUID de embedding se resuelve para los dashboards publicados y se
+        reutiliza mientras su ``changed_on`` no cambie, de modo que al caducar
+        el catálogo solo se vuelve a pedir el listado.
+        """
+        catalog_key, embedded_key = self._catalog_cache_keys(config)
+        now = time.time()
+
+        if not access_token:
+            access_token = self.get_access_token(config)
+        dashboards = self._fetch_dashboards(config, access_token)
+
+        embedded_entry = _SUPERSET_CACHE.get(embedded_key)
+        known = embedded_entry['data'] if embedded_entry and embedded_entry['expires'] > now and reuse_embedded else {}
+        embedded = {}
+        catalog = []
+        for dashboard in dashboards:
+            entry = dict(dashboard)
+            if dashboard.get('published'):
+                memo = known.get(dashboard.get('id'))
+                changed_on = dashboard.get('changed_on_utc') or dashboard.get('changed_on') or ''
+                if memo and memo[0] == changed_on:
+                    entry['embedded_uuid'] = memo[1]
+                else:
+                    try:
+                        entry['embedded_uuid'] = self._fetch_embedded_uuid(config, access_token, dashboard.get('id'))
+                    except SupersetDeadlineExceeded:
+                        raise
+                    except requests.exceptions.RequestException as e:
+                        # Sin memorizar: se reintenta en la próxima construcción del catálogo
+                        _logger.error('Error verificando embedding para dashboard %s: %s',
+                                      dashboard.get('id'), str(e))
+                        entry['embedded_uuid'] = None
+                        catalog.append(entry)
+                        continue
+                embedded[dashboard.get('id')] = (changed_on, entry['embedded_uuid'])
+            catalog.append(entry)
+
+        _SUPERSET_CACHE[embedded_key] = {'data': embedded, 'expires': now + EMBEDDED_TTL}
+        _SUPERSET_CACHE[catalog_key] = {
+            'data': catalog,
+            'expires': now + config.get('catalog_ttl', CATALOG_TTL),
+            'stale_until': now + config.get('catalog_ttl', CATALOG_TTL) + CATALOG_STALE_TTL,
+        }
+        return catalog
+
+    def _schedule_catalog_refresh(self, config, notify=False):
+        """Lanzar (si no hay uno en curso) el refresco del catálogo en un hilo aparte
+
+        El hilo (``_detached_thread``) no recibe el entorno de la petición y no
+        retiene ninguna conexión a PostgreSQL mientras espera a Superset. Con
+        ``notify`` avisa a los widgets de la conexión al terminar.
+        """
+        catalog_key, _embedded_key = self._catalog_cache_keys(config)
+        with _CATALOG_REFRESH_LOCK:
+            thread = _CATALOG_REFRESHES.get(catalog_key)
+            if thread and thread.is_alive():
+                return thread
+            config = dict(config)
+            notify_ready = lambda utils, _config, catalog: utils._notify_catalog_ready(config, catalog)
+            thread = _detached_thread(self.env.cr.dbname, self.env.uid, None,
+                                      lambda utils, _config: utils._refresh_catalog_in_background(config),
+                                      notify_ready if notify else None, 'superset_catalog_refresh')
+            _CATALOG_REFRESHES[catalog_key] = thread
+        thread.start()
+        return thread
+
+    def _refresh_catalog_in_background(self, config):
+        """Hilo de refresco: solo HTTP y cache en memoria; devuelve el catálogo (None si falla)"""
+        started = time.perf_counter()
+        try:
+            # Sin deadline de la petición que lo lanzó: usa el presupuesto de los procesos en segundo plano
+            with deadline(config.get('budget_cron', 600), 'cron'):
+                catalog = self._build_dashboard_catalog(config)
+            _logger.info('🔄 Catálogo de Superset refrescado en segundo plano: %s dashboards (%.0f ms)',
+                         len(catalog), (time.perf_counter() - started) * 1000)
+            return catalog
+        except Exception as e:
+            # Se sigue sirviendo la copia anterior; el próximo acceso lo reintenta
+            _logger.warning('⚠️ Error refrescando el catálogo de Superset en segundo plano: %s', str(e))
+            return None
+
+    def _notify_catalog_ready(self, config, catalog):
+        """Avisar a los widgets de que ya pueden pedir las opciones del selector"""
+        if catalog is not None:
+            channel = bus_channel(config.get('connection_key'))
+            self.env['bus.bus'].sudo()._sendone(channel, BUS_CATALOG_READY, {})
+
+    def _fetch_embedded_uuid(self, config, access_token, dashboard_id):
+        """UUID de embedding de un dashboard (None si no tiene embedding habilitado)"""
+        response = superset_request('get', config, f'/api/v1/dashboard/{dashboard_id}/embedded', EP_EMBEDDED,
+                                    access_token=access_token)
+        if response.status_code != 200:
+            return None
+        return response.json().get('result', {}).get('uuid') or None
+
+    @api.model
+    def get_catalog_dashboard(self, dashboard_uuid, config=None, access_token=None):
+        """Dashboard del catálogo por UUID con ``embedded_uuid`` resuelto (None si no existe)
+
+        Los dashboards no publicados no llevan el embedding en el catálogo y se
+        consultan bajo demanda; las excepciones de ``requests`` se propagan.
+        """
+        if not config:
+            config = self.get_superset_config()
+        dashboard = next((d for d in self.get_dashboard_catalog(config, access_token)
+                          if d.get('uuid') == dashboard_uuid), None)
+        if dashboard is None or 'embedded_uuid' in dashboard:
+            return dashboard
+        if not access_token:
+            access_token = self.get_access_token(config)
+        dashboard['embedded_uuid'] = self._fetch_embedded_uuid(config, access_token, dashboard.get('id'))
+        return dashboard
+
+    @api.model
+    def search_dashboard_catalog(self, query='', offset=0, limit=SEARCH_PAGE_SIZE, usage=None, config=None):
+        """Página de dashboards seleccionables que coinciden con ``query`` y total de coincidencias
+
+        Busca por trigramas en título, etiquetas y propietarios sobre el
+        catálogo cacheado (ver ``superset_search``); sin texto devuelve todos
+        ordenados por ``usage`` ({uuid: puntuación}) y título.
+        """
+        if not config:
+            config = self.get_superset_config()
+        catalog = self.get_dashboard_catalog(config)
+        catalog_key, _embedded_key = self._catalog_cache_keys(config)
+        return get_search_index(catalog_key, catalog).search(query, usage, offset, limit)
+
+    # ------------------------------------------------------------------
+    # Miniaturas de dashboards
+    # ------------------------------------------------------------------
+
+    def _get_thumbnail_attachments(self, dashboard_uuids=None):
+        """Adjuntos de miniaturas indexados por UUID de dashboard"""
+        res_model, res_id = self._thumbnail_owner()
+        domain = [
+            ('res_model', '=', res_model),
+            ('res_id', '=', res_id),
+            ('name', '=like', f'{THUMBNAIL_PREFIX}%'),
+        ]
+        if dashboard_uuids is not None:
+            domain.append(('name', 'in', [self._thumbnail_name(uuid) for uuid in dashboard_uuids]))
+        attachments = self.env['ir.attachment'].sudo().search(domain)
+        return {att.name[len(THUMBNAIL_PREFIX):-len('.png')]: att for att in attachments}
+
+    def _thumbnail_owner(self):
+        """(res_model, res_id) de las miniaturas: cada conexión por empresa guarda las suyas"""
+        connection_id = self.get_superset_config().get('connection_id')
+        return ('superset.connection', connection_id) if connection_id else (THUMBNAIL_RES_MODEL, 0)
+
+    def _thumbnail_name(self, dashboard_uuid):
+        return f'{THUMBNAIL_PREFIX}{dashboard_uuid}.png'
+
+    def _download_thumbnail(self, config, access_token, thumbnail_url):
+        """Descargar miniatura; None si Superset aún la está generando (HTTP 202)"""
+        response = superset_request('get', config, thumbnail_url, EP_THUMBNAIL, access_token=access_token)
+        if response.status_code == 200 and response.headers.get('Content-Type', '').startswith('image/'):
+            return response.content
+        if response.status_code not in (202, 404):
+            _logger.debug('Miniatura no disponible %s (HTTP %s)', thumbnail_url, response.status_code)
+        return None
+
+    @api.model
+    def refresh_dashboard_thumbnails(self, force=False):
+        """Sincronizar miniaturas en ir.attachment, clave: dashboard + changed_on"""
+        config = self.get_superset_config()
+        if not config.get('thumbnails') or not self.is_configured():
+            return {'updated': 0, 'removed': 0}
+
+        self.validate_config(config)
+        access_token = self.get_access_token(config)
+        dashboards = [d for d in self._fetch_dashboards(config, access_token, columns=THUMBNAIL_COLUMNS)
+                      if d.get('published') and d.get('uuid')]
+
+        Attachment = self.env['ir.attachment'].sudo()
+        existing = self._get_thumbnail_attachments()
+        updated = 0
+
+        for dashboard in dashboards:
+            dashboard_uuid = dashboard['uuid']
+            changed_on = dashboard.get('changed_on_utc') or ''
+            attachment = existing.pop(dashboard_uuid, None)
+
+            if attachment and attachment.description == changed_on and not force:
+                continue
+            if not dashboard.get('thumbnail_url'):
+                continue
+
+            try:
+                image = self._download_thumbnail(config, access_token, dashboard['thumbnail_url'])
+            except requests.exceptions.RequestException as e:
+                _logger.debug('Error descargando miniatura de %s: %s', dashboard.get('id'), str(e))
+                continue
+            if not image:
+                continue
+
+            values = {
+                'datas': base64.b64encode(image),
+                'description': changed_on,
+                'mimetype': 'image/png',
+            }
+            if attachment:
+                attachment.write(values)
+            else:
+                res_model, res_id = self._thumbnail_owner()
+                Attachment.create(dict(values,
+                                       name=self._thumbnail_name(dashboard_uuid),
+                                       res_model=res_model,
+                                       res_id=res_id))
+            updated += 1
+
+        # Dashboards que ya no existen o dejaron de estar publicados
+        removed = len(existing)
+        for attachment in existing.values():
+            attachment.unlink()
+
+        self.log_debug(f'Miniaturas sincronizadas: {updated} actualizadas, {removed} eliminadas')
+        return {'updated': updated, 'removed': removed}
+
+    @api.model
+    @traced('cron.refresh_dashboard_thumbnails')
+    @with_deadline('cron')
+    def _cron_refresh_dashboard_thumbnails(self):
+        """Cron: refrescar miniaturas caducadas"""
+        for utils in self._connection_environments():
+            try:
+                utils.refresh_dashboard_thumbnails()
+            except Exception as e:
+                _logger.error('Error refrescando miniaturas de Superset: %s', str(e))
+
+    @api.model
+    def get_thumbnail_urls(self, dashboard_uuids=None):
+        """URLs de miniaturas cacheadas (sin peticiones HTTP a Superset)"""
+        if not self.get_superset_config().get('thumbnails'):
+            return {}
+        return {
+            dashboard_uuid: f'/superset/thumbnail/{dashboard_uuid}?unique={attachment.checksum}'
+            for dashboard_uuid, attachment in self._get_thumbnail_attachments(dashboard_uuids).items()
+        }
+
+    # ------------------------------------------------------------------
+    # Calentamiento de cache de charts
+    # ------------------------------------------------------------------
+
+    def _resolve_dashboard_ids(self, config, access_token, dashboard_uuids):
+        """Mapear UUIDs de dashboard a IDs numéricos usando el catálogo cacheado"""
+        mapping = {d.get('uuid'): d.get('id') for d in self.get_dashboard_catalog(config, access_token)
+                   if d.get('uuid')}
+        return [mapping[uuid] for uuid in dashboard_uuids if uuid in mapping]
+
+    @api.model
+    def warm_up_dashboards(self, dashboard_ids=None, trigger='cron'):
+        """Calentar la cache de Superset de todos los charts de los dashboards
+
+        Las peticiones HTTP se lanzan en paralelo con concurrencia limitada por
+        ``superset.warmup_concurrency``; los tiempos se registran por chart.
+        """
+        config = self.get_superset_config()
+        self.validate_config(config)
+        access_token = self.get_access_token(config)
+
+        if dashboard_ids is None:
+            dashboard_ids = [d['id'] for d in self._fetch_dashboards(config, access_token, columns=['id', 'published'])
+                             if d.get('published')]
+
+        # Evitar calentar repetidamente el mismo dashboard (selecciones seguidas)
+        now = time.time()
+        pending = []
+        for dashboard_id in dashboard_ids:
+            cache_key = f"warmup_{hash(config['url'])}_{dashboard_id}"
+            cache_entry = _SUPERSET_CACHE.get(cache_key)
+            if trigger != 'cron' and cache_entry and cache_entry['expires'] > now:
+                continue
+            _SUPERSET_CACHE[cache_key] = {'data': True, 'expires': now + WARMUP_COOLDOWN}
+            pending.append(dashboard_id)
+
+        if not pending:
+            return {'dashboards': 0, 'charts': 0, 'errors': 0}
+
+        max_workers = max(1, config.get('warmup_concurrency', 4))
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='superset_warmup') as executor:
+            charts_per_dashboard = executor.map(bind_trace(bind_deadline(
+                lambda dashboard_id: _fetch_dashboard_charts(config, access_token, dashboard_id))), pending)
+            jobs = [job for jobs in charts_per_dashboard for job in jobs]
+            results = list(executor.map(bind_trace(bind_deadline(
+                lambda job: _warm_up_chart(config, access_token, job))), jobs))
+
+        self.env['superset.chart.warmup'].sudo()._record_results(
+            results, trigger, config.get('connection_id') or False)
+
+        errors = len([r for r in results if r['status'] != 'ok'])
+        self.log_debug(f'Warm-up ({trigger}): {len(pending)} dashboards, {len(results)} charts, {errors} errores')
+        return {'dashboards': len(pending), 'charts': len(results), 'errors': errors}
+
+    @api.model
+    def warm_up_dashboard_uuids(self, dashboard_uuids, trigger='select'):
+        """Calentar dashboards identificados por UUID (selector del hub)"""
+        config = self.get_superset_config()
+        self.validate_config(config)
+        access_token = self.get_access_token(config)
+        dashboard_ids = self._resolve_dashboard_ids(config, access_token, dashboard_uuids)
+        return self.warm_up_dashboards(dashboard_ids, trigger=trigger)
+
+    @api.model
+    def schedule_dashboard_warmup(self, dashboard_uuids, trigger='select'):
+        """Encolar el calentamiento de dashboards por UUID y volver sin esperar
+
+        Corre en un hilo con cursor propio y con el presupuesto de los procesos
+        en segundo plano (prioridad ``background`` en el limitador): un
+        dashboard con muchos charts no retiene el worker de la petición ni
+        compite con el tráfico interactivo. En tests se ejecuta en línea, ya
+        que un cursor nuevo no vería la transacción del test.
+        """
+        if getattr(threading.current_thread(), 'testing', False):
+            self._warm_up_in_background(dashboard_uuids, trigger)
+        else:
+            _background_thread(
+                self.env.cr.dbname, self.env.uid, self.env.company.id,
+                lambda utils: utils._warm_up_in_background(dashboard_uuids, trigger),
+                'superset_warmup', {'superset_trace_id': self.env.context.get('superset_trace_id')},
+            ).start()
+        return {'queued': len(dashboard_uuids)}
+
+    def run_detached(self, fetch, apply=None, name='superset_detached'):
+        """Ejecutar ``fetch`` (E/S con Superset) fuera de la transacción y ``apply`` en una corta
+
+        Devuelve None: el hilo de ``_detached_thread`` publica el resultado
+        desde ``apply`` (normalmente por el bus). En tests se ejecuta en línea
+        y devuelve lo que devuelva ``apply`` (o ``fetch`` si no hay ``apply``),
+        ya que un cursor nuevo no vería la transacción del test.
+        """
+        if getattr(threading.current_thread(), 'testing', False):
+            config = self.get_superset_config()
+            result = fetch(self, config)
+            return apply(self, config, result) if apply else result
+        _detached_thread(
+            self.env.cr.dbname, self.env.uid, self.env.company.id, fetch, apply, name,
+            {'superset_trace_id': self.env.context.get('superset_trace_id')},
+        ).start()
+        return None
+
+    @traced('background.warm_up_dashboards')
+    def _warm_up_in_background(self, dashboard_uuids, trigger):
+        with deadline(flow_budget(self.env, 'cron'), 'cron'):
+            return self.warm_up_dashboard_uuids(dashboard_uuids, trigger=trigger)
+
+    @api.model
+    @traced('cron.warm_up_dashboards')
+    @with_deadline('cron')
+    def _cron_warm_up_dashboards(self):
+        """Cron: calentar cache de todos los dashboards antes del horario laboral"""
+        for utils in self._connection_environments():
+            if not utils.is_configured():
+                continue
+            try:
+                utils.warm_up_dashboards(trigger='cron')
+            except Exception as e:
+                _logger.error('Error calentando cache de Superset: %s', str(e))
+
+    @api.model
+    def check_health(self, config=None):
+        """Sondear /health, el token y el catálogo y guardar el resultado en ``superset.health.status``
+
+        Lo ejecutan el cron del monitor y los refrescos forzados por el usuario.
+        Si algo falla se conservan los últimos recuentos de dashboards conocidos.
+        Los cambios de catálogo y de estado se publican a los widgets abiertos.
+        """
+        if not config:
+            config = self.get_superset_config()
+        if not self.is_configured():
+            return False
+
+        vals, catalog = self._probe_superset(config)
+        return self._store_health(config, vals, catalog)
+
+    def _probe_superset(self, config, force_catalog=False):
+        """E/S de la comprobación de salud: /health, token, catálogo y nodos (sin acceso al ORM)
+
+        Devuelve ``(vals, catálogo)`` para ``_store_health``; puede ejecutarse
+        fuera de la transacción (``run_detached``).
+        """
+        catalog = None
+        vals = {'state': 'down', 'token_valid': False, 'last_error': False, 'last_check': fields.Datetime.now()}
+        try:
+            started = time.perf_counter()
+            response = superset_request('get', config, '/health', EP_HEALTH)
+            vals['latency_ms'] = (time.perf_counter() - started) * 1000
+            if response.status_code != 200:
+                raise SupersetAPIError(_('/health respondió HTTP %s') % response.status_code,
+                                       status_code=response.status_code)
+            access_token = self.get_access_token(config)
+            vals['token_valid'] = True
+            catalog = self.get_dashboard_catalog(config, access_token, force_refresh=force_catalog)
+            dashboards = [d for d in catalog if d.get('published')]
+            vals.update(
+                state='up',
+                total_dashboards=len(dashboards),
+                with_embedding=len([d for d in dashboards if d.get('embedded_uuid')]),
+                catalog_snapshot=json.dumps(catalog_snapshot(catalog)),
+            )
+        except Exception as e:
+            if self.get_circuit_state(config) == 'open':
+                vals['last_error'] = 'Superset no disponible (circuito abierto)'
+            else:
+                vals['last_error'] = str(e)[:200]
+            _logger.warning('🩺 Superset no disponible: %s', vals['last_error'])
+
+        if len(config.get('nodes') or []) > 1:
+            self._probe_nodes(config)
+        return vals, catalog
+
+    def _store_health(self, config, vals, catalog):
+        """Guardar el resultado de ``_probe_superset`` y publicar los cambios por el bus"""
+        Status = self.env['superset.health.status']
+        previous_status = Status._read_status(config['url'])
+        previous_snapshot = Status._read_snapshot(config['url'])
+        if Status._store_status(config['url'], vals):
+            self._publish_changes(config, previous_status, previous_snapshot, catalog)
+        return vals['state'] == 'up'
+
+    def _publish_changes(self, config, previous_status, previous_snapshot, catalog):
+        """Enviar por el bus la diferencia de catálogo y el estado si han cambiado
+
+        La primera comprobación de una URL solo fija la referencia: los widgets
+        ya cargan el catálogo completo al abrirse.
+        """
+        channel = bus_channel(config.get('connection_key'))
+        Bus = self.env['bus.bus'].sudo()
+        if catalog is not None and previous_snapshot is not None:
+            diff = catalog_diff(previous_snapshot, catalog)
+            if diff:
+                Bus._sendone(channel, BUS_CATALOG_DIFF, diff)
+                _logger.info('📣 Catálogo de Superset publicado: %s nuevos, %s cambiados, %s retirados',
+                             len(diff['added']), len(diff['updated']), len(diff['removed']))
+        current_status = self.env['superset.health.status']._read_status(config['url'])
+        if previous_status is None or any(previous_status[key] != current_status[key] for key in BUS_WATCHED_FIELDS):
+            status = self.get_monitored_status()
+            Bus._sendone(channel, BUS_STATUS, {key: status.get(key) for key in BUS_STATUS_FIELDS})
+
+    def _probe_nodes(self, config):
+        """Sondear /health en cada nodo para que el reparto deje de enviar tráfico a los caídos"""
+        for node in config['nodes']:
+            started = time.perf_counter()
+            if _probe_health(dict(config, url=node['url'])):
+                NODE_POOL.observe(node['url'], time.perf_counter() - started)
+            else:
+                NODE_POOL.mark_down(node['url'])
+                _logger.warning('🩺 Nodo de Superset %s no responde a /health', node['url'])
+
+    @api.model
+    def get_superset_domain(self, config=None):
+        """Dominio público del nodo elegido para el navegador (SDK de embedding)"""
+        if not config:
+            config = self.get_superset_config()
+        node = NODE_POOL.choose(config.get('nodes') or [])
+        return node['public_url'] if node else config['url']
+
+    @api.model
+    @traced('cron.monitor_health')
+    @with_deadline('cron')
+    def _cron_monitor_health(self):
+        """Cron: comprobar periódicamente la salud de Superset"""
+        for utils in self._connection_environments():
+            try:
+                utils.check_health()
+            except Exception as e:
+                _logger.error('Error comprobando la salud de Superset: %s', str(e))
+
+    def _trigger_health_check(self):
+        """Adelantar el cron del monitor (como mucho una vez por minuto y proceso)"""
+        cache_entry = _SUPERSET_CACHE.get('health_check_triggered')
+        if cache_entry and cache_entry['expires'] > time.time():
+            return
+        _SUPERSET_CACHE['health_check_triggered'] = {'data': True, 'expires': time.time() + 60}
+        cron = self.env.ref('eticco_superset_integration.ir_cron_superset_health_monitor', raise_if_not_found=False)
+        if cron:
+            cron.sudo()._trigger()
+
+    @api.model
+    def get_monitored_status(self):
+        """Estado del sistema para badges y campos calculados (solo lee el registro del monitor, sin HTTP)
+
+        Mismas claves que ``get_system_status``. Si el monitor aún no ha pasado o
+        su último resultado es antiguo, se adelanta su ejecución.
+        """
+        if not self.is_configured():
+            return {
+                'has_configuration': False,
+                'connection_status': 'Configuración incompleta',
+                'total_dashboards': 0,
+                'with_embedding': 0,
+                'last_check': None
+            }
+
+        config = self.get_superset_config()
+        record = self.env['superset.health.status']._read_status(config['url'])
+        age = (fields.Datetime.now() - record['last_check']).total_seconds() if record else None
+        if age is None or age > HEALTH_STALE_AFTER:
+            self._trigger_health_check()
+        if not record:
+            return {
+                'has_configuration': True,
+                'connection_status': 'Comprobando conexión...',
+                'total_dashboards': 0,
+                'with_embedding': 0,
+                'last_check': None
+            }
+
+        if record['state'] == 'up':
+            connection_status = 'Conectado correctamente'
+        elif self.get_circuit_state(config) == 'open':
+            connection_status = 'Superset no disponible (circuito abierto)'
+        else:
+            connection_status = f"Error de conexión: {(record['last_error'] or '')[:50]}..."
+        return {
+            'has_configuration': True,
+            'connection_status': connection_status,
+            'total_dashboards': record['total_dashboards'] or 0,
+            'with_embedding': record['with_embedding'] or 0,
+            'latency_ms': record['latency_ms'],
+            'token_valid': record['token_valid'],
+            'last_check': time.time() - age,
+        }
+
     @api.model
     def clear_token_cache(self):
         """Limpiar cache de tokens"""
@@ -253,14 +1284,46 @@ class SupersetUtils(models.AbstractModel):
                 _SUPERSET_CACHE.pop(key, None)
             return {'success': True, 'message': _('Cache de tokens limpiado')}
         except Exception as e:
-            _logger.error('Error limpiando cache: %s', str(e))
+            _logger.error('Error limpiando cache de tokens: %s', str(e))
             return {'success': False, 'message': str(e)}
 
+    @api.model
+    def get_circuit_state(self, config=None):
+        """Estado de los circuit breakers del pool de nodos configurado
+
+        'closed', 'open', 'half_open' (abierto pero ya toca sondear) o False si está desactivado.
+        Es 'open' solo si el circuito de todos los nodos está abierto: con un nodo
+        sano las llamadas hacen failover a él y el hub no debe fallar sin intentarlo.
+        """
+        if not config:
+            config = self.get_superset_config()
+        if not config.get('url') or not config.get('circuit_threshold'):
+            return False
+        reset_timeout = config.get('circuit_reset_timeout', 30)
+        states = set()
+        for node in config.get('nodes') or [{'url': config['url']}]:
+            state = get_circuit_breaker(node['url']).snapshot()
+            if state['state'] == 'open' and time.time() - state['opened_at'] >= reset_timeout:
+                states.add('half_open')
+            else:
+                states.add(state['state'])
+        if 'closed' in states:
+            return 'closed'
+        return 'half_open' if 'half_open' in states else 'open'
+
     @api.model
     def clear_all_cache(self):
-        """Limpiar todo el cache"""
+        """Limpiar todo el cache (circuito, presupuesto de reintentos y timeouts aprendidos incluidos)"""
         try:
             _SUPERSET_CACHE.clear()
+            clear_search_indexes()
+            config = self.get_superset_config()
+            for node in config.get('nodes') or []:
+                get_circuit_breaker(node['url']).reset()
+            NODE_POOL.reset()
+            RETRY_BUDGET.reset()
+            ADAPTIVE_TIMEOUTS.reset()
+            OUTBOUND_LIMITER.reset()
             return {'success': True, 'message': _('Cache completo limpiado')}
         except Exception as e:
             _logger.error('Error limpiando cache completo: %s', str(e))
@@ -325,6 +1388,22 @@ class SupersetUtils(models.AbstractModel):
             
         return True
     
+    def _connection_key(self):
+        """Partición de las caches en memoria para la conexión de la empresa activa"""
+        return self.get_superset_config()['connection_key']
+
+    def _connection_environments(self):
+        """Un ``superset.utils`` por conexión distinta: la global y la de cada empresa con conexión propia"""
+        companies = self.env.company | self.env['superset.connection'].sudo().search([]).company_ids
+        environments, seen = [], set()
+        for company in companies:
+            utils = self.sudo().with_company(company)
+            key = utils._connection_key()
+            if key not in seen:
+                seen.add(key)
+                environments.append(utils)
+        return environments
+
     @api.model
     def is_configured(self):
         """Verificar si Superset está configurado (sin hacer peticiones HTTP)"""
@@ -334,7 +1413,8 @@ class SupersetUtils(models.AbstractModel):
         except:
             return False
     
-    @cache_result(lambda self, force_refresh: f"system_status_{force_refresh}", duration=300)
+    @cache_result(lambda self, force_refresh: f"system_status_{self._connection_key()}_{force_refresh}", duration=300)
+    @profiled('utils.get_system_status')
     def get_system_status(self, force_refresh=False):
         """Obtener estado del sistema de forma unificada y optimizada"""
         # Verificación básica primero (sin HTTP)
@@ -349,7 +1429,7 @@ class SupersetUtils(models.AbstractModel):
         
         # Si force_refresh es True, limpiar cache antes de continuar
         if force_refresh:
-            cache_key = f"system_status_{force_refresh}"
+            cache_key = f"system_status_{self._connection_key()}_{force_refresh}"
             _SUPERSET_CACHE.pop(cache_key, None)
         
         # Calcular estado completo con HTTP (solo si es necesario)
@@ -357,61 +1437,38 @@ class SupersetUtils(models.AbstractModel):
             config = self.get_superset_config()
             self.validate_config(config)
             
-            # Verificar conectividad básica
-            access_token = self.get_access_token(config)
-            
-            # Obtener estadísticas de dashboards
-            dashboards_url = f"{config['url']}/api/v1/dashboard/"
-            params = {'q': '(page:0,page_size:100)'}
-            
-            response = requests.get(
-                dashboards_url,
-                params=params,
-                headers={'Authorization': f'Bearer {access_token}'},
-                timeout=config.get('timeout', 30)
-            )
-            
-            if response.status_code == 200:
-                data = response.json()
-                dashboards = [d for d in data.get('result', []) if d.get('published')]
-                
-                # Contar dashboards con embedding
-                embedding_count = 0
-                for dashboard in dashboards:
-                    try:
-                        embedding_url = f"{config['url']}/api/v1/dashboard/{dashboard.get('id')}/embedded"
-                        embedding_response = requests.get(
-                            embedding_url,
-                            headers={'Authorization': f'Bearer {access_token}'},
-                            timeout=config.get('timeout', 30)
-                        )
-                        if (embedding_response.status_code == 200 and 
-                            embedding_response.json().get('result', {}).get('uuid')):
-                            embedding_count += 1
-                    except:
-                        pass
-                
-                status = {
+            # Estadísticas desde el catálogo (sin HTTP si está caliente)
+            try:
+                catalog = self.get_dashboard_catalog(config, force_refresh=force_refresh)
+            except SupersetAPIError as api_error:
+                if not api_error.status_code:
+                    raise
+                return {
                     'has_configuration': True,
-                    'connection_status': 'Conectado correctamente',
-                    'total_dashboards': len(dashboards),
-                    'with_embedding': embedding_count,
-                    'last_check': time.time()
-                }
-            else:
-                status = {
-                    'has_configuration': True,
-                    'connection_status': f'Error HTTP {response.status_code}',
+                    'connection_status': f'Error HTTP {api_error.status_code}',
                     'total_dashboards': 0,
                     'with_embedding': 0,
                     'last_check': time.time()
                 }
+
+            dashboards = [d for d in catalog if d.get('published')]
+            status = {
+                'has_configuration': True,
+                'connection_status': 'Conectado correctamente',
+                'total_dashboards': len(dashboards),
+                'with_embedding': len([d for d in dashboards if d.get('embedded_uuid')]),
+                'last_check': time.time()
+            }
                 
         except Exception as e:
             _logger.debug('Error verificando conexión con Superset: %s', str(e))
+            if self.get_circuit_state() == 'open':
+                connection_status = 'Superset no disponible (circuito abierto)'
+            else:
+                connection_status = f'Error de conexión: {str(e)[:50]}...'
             status = {
                 'has_configuration': True,
-                'connection_status': f'Error de conexión: {str(e)[:50]}...',
+                'connection_status': connection_status,
                 'total_dashboards': 0,
                 'with_embedding': 0,
                 'last_check': time.time()
@@ -113,6 +113,15 @@ run_specific_test() {
     $ODOO_BIN -d $DB_NAME --addons-path=$ADDONS_PATH --test-enable --test-file=$MODULE_NAME/tests/$test_file --stop-after-init --log-level=info
 }
 
+run_benchmark() {
+    print_step "Ejecutando benchmark de flujos contra Superset falso..."
+    
+    # Los benchmarks están etiquetados fuera de la suite estándar
+    $ODOO_BIN -d $DB_NAME --addons-path=$ADDONS_PATH --test-enable --test-tags superset_benchmark --stop-after-init --log-level=info
+    
+    print_success "Informe: ${SUPERSET_BENCH_REPORT:-superset_benchmark_report.json}"
+}
+
 cleanup() {
     print_step "Limpiando..."
     dropdb $DB_NAME 2>/dev/null || true
@@ -129,6 +138,7 @@ show_usage() {
     echo "  -a, --addons-path   Ruta de addons (default: $ADDONS_PATH)"
     echo "  -o, --odoo-bin      Ejecutable de Odoo (default: $ODOO_BIN)"
     echo "  --no-cleanup        No eliminar base de datos al final"
+    echo "  --benchmark         Ejecutar benchmark de flujos (informe JSON)"
     echo ""
     echo -e "${BLUE}TESTS ESPECÍFICOS:${NC}"
     echo "  test_superset_utils.py      - Tests de utilidades"
@@ -141,15 +151,20 @@ show_usage() {
     echo "  $0 test_superset_utils.py             # Test específico"
     echo "  $0 -d my_test_db                      # Con DB personalizada"
     echo "  $0 --no-cleanup                       # Mantener DB después"
+    echo "  $0 --benchmark                        # Benchmark 10/100/1000 dashboards"
     echo ""
     echo -e "${BLUE}VARIABLES DE ENTORNO:${NC}"
     echo "  ODOO_BIN=/path/to/odoo-bin $0         # Odoo personalizado"
     echo "  ADDONS_PATH=/path/to/addons $0        # Addons path personalizado"
+    echo "  SUPERSET_BENCH_SIZES=10,100 $0 --benchmark      # Tamaños de catálogo"
+    echo "  SUPERSET_BENCH_LATENCY=0.05 $0 --benchmark      # Latencia Superset (s)"
+    echo "  SUPERSET_BENCH_BASELINE=old.json $0 --benchmark # Comparar con informe previo"
 }
 
 # Procesar argumentos
 CLEANUP=true
 SPECIFIC_TEST=""
+BENCHMARK=false
 
 while [[ $# -gt 0 ]]; do
     case $1 in
@@ -173,6 +188,10 @@ while [[ $# -gt 0 ]]; do
             CLEANUP=false
             shift
             ;;
+        --benchmark)
+            BENCHMARK=true
+            shift
+            ;;
         test_*.py)
             SPECIFIC_TEST="$1"
             shift
@@ -199,7 +218,10 @@ main() {
     install_module
     
     # Ejecutar tests
-    if [ -n "$SPECIFIC_TEST" ]; then
+    if [ "$BENCHMARK" = true ]; then
+        run_benchmark
+        TEST_RESULT=$?
+    elif [ -n "$SPECIFIC_TEST" ]; then
         run_specific_test "$SPECIFIC_TEST"
         TEST_RESULT=$?
     else
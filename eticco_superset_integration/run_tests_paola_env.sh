@@ -18,6 +18,9 @@ MODULE_PATH="$PROJECT_PATH/extra_addons/eticco_superset_integration"
 ODOO_URL="http://localhost:9179"
 DB_NAME="${DB_NAME:-test_superset}"
 MODULE_NAME="eticco_superset_integration"
+LOAD_USERS="${LOAD_USERS:-10}"
+LOAD_DURATION="${LOAD_DURATION:-60}"
+LOAD_FAKE_PUBLIC_URL="${LOAD_FAKE_PUBLIC_URL:-http://host.docker.internal:8088}"
 
 print_header() {
     echo -e "${BLUE}================================${NC}"
@@ -167,6 +170,22 @@ run_standalone_tests() {
     done
 }
 
+run_load_tests() {
+    print_step "Ejecutando pruebas de carga ($LOAD_USERS usuarios, ${LOAD_DURATION}s)..."
+
+    cd "$MODULE_PATH"
+
+    # El Superset falso corre en el host; Odoo (en Docker) lo alcanza por host.docker.internal
+    if python3 load_test_scenarios.py "$ODOO_URL" "$DB_NAME" \
+        --users "$LOAD_USERS" --duration "$LOAD_DURATION" \
+        --start-fake --fake-host 0.0.0.0 --fake-public-url "$LOAD_FAKE_PUBLIC_URL" \
+        --report "load_report_$(date +%Y%m%d_%H%M%S).json"; then
+        print_success "Pruebas de carga completadas"
+    else
+        print_error "Pruebas de carga con errores por encima del 5%"
+    fi
+}
+
 install_test_dependencies() {
     print_step "Instalando dependencias de test..."
     
@@ -193,11 +212,14 @@ show_usage() {
     echo "  --standalone        Solo tests standalone"
     echo "  --all               Todos los tipos de tests"
     echo "  --install-deps      Instalar dependencias primero"
+    echo "  --load              Pruebas de carga con usuarios concurrentes"
+    echo "                      (LOAD_USERS, LOAD_DURATION, LOAD_FAKE_PUBLIC_URL)"
     echo ""
     echo -e "${BLUE}EJEMPLOS:${NC}"
     echo "  $0                      # Tests via Docker"
     echo "  $0 --all               # Todos los tests"
     echo "  $0 --standalone        # Solo tests standalone"
+    echo "  LOAD_USERS=50 $0 --load  # Carga con 50 usuarios"
     echo ""
     echo -e "${BLUE}REQUISITOS:${NC}"
     echo "  - Docker y docker-compose instalados"
@@ -231,6 +253,10 @@ while [[ $# -gt 0 ]]; do
             TEST_TYPE="all"
             shift
             ;;
+        --load)
+            TEST_TYPE="load"
+            shift
+            ;;
         --install-deps)
             INSTALL_DEPS=true
             shift
@@ -270,6 +296,9 @@ main() {
         "standalone")
             run_standalone_tests
             ;;
+        "load")
+            run_load_tests
+            ;;
         "all")
             print_step "Ejecutando todos los tipos de tests..."
             run_standalone_tests
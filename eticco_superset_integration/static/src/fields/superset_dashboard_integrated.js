@@ -4,6 +4,23 @@ import { Component, useState, useRef, onWillStart, onMounted, onPatched, onWillU
 import { registry } from "@web/core/registry";
 import { useService } from "@web/core/utils/hooks";
 import { _t } from "@web/core/l10n/translation";
+import { getTabCache, guestTokenTtl } from "./superset_tab_cache";
+
+// Selector virtualizado: solo se pintan las filas visibles (más un margen)
+const PICKER_ROW_HEIGHT = 36;
+const PICKER_VISIBLE_ROWS = 8;
+const PICKER_OVERSCAN = 4;
+const PICKER_PAGE_SIZE = 50;
+const PICKER_SEARCH_DEBOUNCE_MS = 200;
+
+// Vigencia de lo que comparten las pestañas de la sesión (ms)
+const TAB_OPTIONS_TTL = 60000;
+const TAB_CATALOG_TTL = 60000;
+const TAB_STATUS_TTL = 300000;
+// Espera máxima de los datos de un dashboard pedidos fuera de la transacción (llegan por el bus)
+const DASHBOARD_DATA_TIMEOUT_MS = 30000;
+// Resultados del bus recibidos antes de que alguien los espere (p. ej. de otras pestañas)
+const DASHBOARD_RESULTS_LIMIT = 20;
 
 /**
  * Componente integrado para selección y visualización automática de dashboards de Superset
@@ -15,7 +32,30 @@ export class SupersetDashboardIntegrated extends Component {
     setup() {
         this.notification = useService("notification");
         this.rpc = useService("rpc");
+        this.busService = useService("bus_service");
+        this.user = useService("user");
+        // Arranque, catálogo, estado y guest tokens compartidos con las otras pestañas de la sesión
+        const companies = (this.props.record.context.allowed_company_ids || []).join('-');
+        this.tabCache = getTabCache(`${this.user.userId}:${companies}`);
+        this.onCatalogDiff = this.onCatalogDiff.bind(this);
+        this.onStatusChange = this.onStatusChange.bind(this);
+        this.onCatalogReady = this.onCatalogReady.bind(this);
+        this.onDashboardData = this.onDashboardData.bind(this);
+        // Datos de dashboard pedidos fuera de la transacción: request_id -> resolver / resultado
+        this.dashboardWaiters = new Map();
+        this.dashboardResults = new Map();
+        // Primer catálogo en construcción en el servidor (se espera a superset_catalog_ready)
+        this.catalogPending = false;
         this.dashboardRef = useRef("dashboardContainer");
+        this.pickerListRef = useRef("pickerList");
+        this.pickerRowHeight = PICKER_ROW_HEIGHT;
+        // Cada búsqueda invalida las respuestas pendientes de las anteriores
+        this.pickerSearchSeq = 0;
+        this.pickerSearchTimer = null;
+        // Datos del dashboard preferido (con guest token) recibidos al inicializar
+        this.prefetched = null;
+        // Apertura en curso cuyo tiempo de carga se envía al servidor
+        this.pendingOpen = null;
         
         this.state = useState({
             isLoading: false,
@@ -27,7 +67,20 @@ export class SupersetDashboardIntegrated extends Component {
             dashboardData: null,
             isEmbedded: false,
             lastLoadedId: null,
-            lastError: null
+            lastError: null,
+            thumbnails: {},
+            isLiveReady: false,
+            // Último estado recibido por el bus (o por otra pestaña)
+            status: this.tabCache.get('status') || null,
+            picker: {
+                open: false,
+                query: '',
+                results: [],
+                total: 0,
+                loading: false,
+                scrollTop: 0,
+                activeIndex: 0
+            }
         });
 
         onWillStart(this.onWillStart.bind(this));
@@ -41,13 +94,23 @@ export class SupersetDashboardIntegrated extends Component {
     }
 
     async onMounted() {
+        // 📣 Cambios de catálogo y estado publicados por el monitor de salud
+        this.busService.subscribe("superset_catalog_diff", this.onCatalogDiff);
+        this.busService.subscribe("superset_status", this.onStatusChange);
+        this.busService.subscribe("superset_catalog_ready", this.onCatalogReady);
+        this.busService.subscribe("superset_dashboard_data", this.onDashboardData);
+        this.busService.start();
+
         console.log('🔍 [TIMING] onMounted - has_configuration inicial:', this.props.record.data.has_configuration);
         
-        // ⭐ FORZAR cálculo de campos antes de mostrar la interfaz
-        await this.ensureConfigurationIsComputed();
+        // Estado del monitor de salud: abrir el hub nunca espera a Superset
+        await this.loadMonitoredStatus();
         
         // Verificar configuración y auto-seleccionar después del montaje
         await this.initializeConfiguration();
+
+        // 🖼️ Miniaturas cacheadas como placeholder mientras carga el embed
+        await this.loadThumbnails();
         
         // 🚀 Auto-selección inteligente y carga automática
         await this.performIntelligentAutoSelection();
@@ -55,10 +118,15 @@ export class SupersetDashboardIntegrated extends Component {
 
     onPatched() {
         // NO AUTO-CARGAR desde onPatched para evitar bucles infinitos
-        // La carga se hará directamente desde onDashboardSelectionChange
+        // La carga se hará directamente desde selectDashboard
     }
 
     onWillUnmount() {
+        this.busService.unsubscribe("superset_catalog_diff", this.onCatalogDiff);
+        this.busService.unsubscribe("superset_status", this.onStatusChange);
+        this.busService.unsubscribe("superset_catalog_ready", this.onCatalogReady);
+        this.busService.unsubscribe("superset_dashboard_data", this.onDashboardData);
+        clearTimeout(this.pickerSearchTimer);
         this.clearDashboard();
     }
 
@@ -76,6 +144,90 @@ export class SupersetDashboardIntegrated extends Component {
                this.state.isEmbedded;
     }
 
+    get currentThumbnailUrl() {
+        return this.state.thumbnails[this.currentDashboardId] || null;
+    }
+
+    get hasConfiguration() {
+        return this.state.status ? this.state.status.has_configuration : this.props.record.data.has_configuration;
+    }
+
+    get isSupersetDown() {
+        const status = this.state.status;
+        return Boolean(status && status.has_configuration && status.connection_status !== 'Conectado correctamente');
+    }
+
+    get currentDashboardLabel() {
+        const dashboardId = this.currentDashboardId;
+        if (!this.isDashboardValid(dashboardId)) {
+            return '';
+        }
+        const result = this.state.picker.results.find((row) => row.id === dashboardId);
+        if (result) {
+            return result.title;
+        }
+        const option = this.getDashboardOptions().find(([key]) => key === dashboardId);
+        if (option) {
+            return option[1].replace(/^📊\s*/, '');
+        }
+        return this.props.record.data.current_dashboard_title || '';
+    }
+
+    get pickerViewportHeight() {
+        const rows = Math.min(Math.max(this.state.picker.results.length, 1), PICKER_VISIBLE_ROWS);
+        return rows * PICKER_ROW_HEIGHT;
+    }
+
+    get pickerWindow() {
+        // Ventana de filas a pintar según el scroll: el DOM no crece con el catálogo
+        const picker = this.state.picker;
+        const start = Math.max(0, Math.floor(picker.scrollTop / PICKER_ROW_HEIGHT) - PICKER_OVERSCAN);
+        const end = Math.min(picker.results.length, start + PICKER_VISIBLE_ROWS + 2 * PICKER_OVERSCAN);
+        return {
+            rows: picker.results.slice(start, end).map((row, offset) => ({ ...row, index: start + offset })),
+            offsetY: start * PICKER_ROW_HEIGHT,
+            totalHeight: picker.results.length * PICKER_ROW_HEIGHT
+        };
+    }
+
+    get showThumbnailPlaceholder() {
+        return Boolean(this.currentThumbnailUrl) && !this.state.isLiveReady;
+    }
+
+    newTraceId() {
+        // ID de correlación W3C (32 hex) que viaja hasta las cabeceras enviadas a Superset
+        if (window.crypto && window.crypto.randomUUID) {
+            return window.crypto.randomUUID().replace(/-/g, '');
+        }
+        return Array.from({ length: 32 }, () => Math.floor(Math.random() * 16).toString(16)).join('');
+    }
+
+    async callHub(method, extraArgs = [], rpcOptions = {}, traceId = this.newTraceId()) {
+        // Llamada al hub con el superset_trace_id en el contexto
+        try {
+            return await this.rpc('/web/dataset/call_kw', {
+                model: this.props.record.resModel,
+                method: method,
+                args: [this.props.record.resId, ...extraArgs],
+                kwargs: {
+                    context: { ...this.props.record.context, superset_trace_id: traceId }
+                }
+            }, rpcOptions);
+        } catch (error) {
+            error.traceId = traceId;
+            throw error;
+        }
+    }
+
+    async loadThumbnails() {
+        try {
+            this.state.thumbnails = await this.callHub('get_dashboard_thumbnails') || {};
+        } catch (error) {
+            // Las miniaturas son opcionales: sin ellas se muestra el loading normal
+            console.error('Error obteniendo miniaturas:', error);
+        }
+    }
+
     getDashboardOptions() {
         const field = this.props.record.fields[this.props.name];
         const hasConfiguration = this.props.record.data.has_configuration;
@@ -93,8 +245,122 @@ export class SupersetDashboardIntegrated extends Component {
         ];
     }
 
-    async onDashboardSelectionChange(event) {
-        const newValue = event.target.value;
+    openPicker() {
+        if (this.state.picker.open) {
+            return;
+        }
+        this.state.picker.open = true;
+        this.state.picker.query = '';
+        this.searchDashboards(true);
+    }
+
+    closePicker() {
+        clearTimeout(this.pickerSearchTimer);
+        this.state.picker.open = false;
+        this.state.picker.query = '';
+    }
+
+    onPickerInput(event) {
+        this.state.picker.query = event.target.value;
+        clearTimeout(this.pickerSearchTimer);
+        this.pickerSearchTimer = setTimeout(() => this.searchDashboards(true), PICKER_SEARCH_DEBOUNCE_MS);
+    }
+
+    onPickerScroll(event) {
+        const picker = this.state.picker;
+        picker.scrollTop = event.target.scrollTop;
+        // Siguiente página al acercarse al final de lo cargado
+        const lastVisible = Math.ceil((picker.scrollTop + this.pickerViewportHeight) / PICKER_ROW_HEIGHT);
+        if (!picker.loading && picker.results.length < picker.total
+                && lastVisible >= picker.results.length - PICKER_OVERSCAN) {
+            this.searchDashboards(false);
+        }
+    }
+
+    onPickerKeydown(event) {
+        const picker = this.state.picker;
+        if (!picker.open) {
+            return;
+        }
+        if (event.key === 'ArrowDown' || event.key === 'ArrowUp') {
+            event.preventDefault();
+            const step = event.key === 'ArrowDown' ? 1 : -1;
+            picker.activeIndex = Math.min(Math.max(picker.activeIndex + step, 0), Math.max(picker.results.length - 1, 0));
+            this.scrollPickerTo(picker.activeIndex);
+        } else if (event.key === 'Enter') {
+            event.preventDefault();
+            const row = picker.results[picker.activeIndex];
+            if (row) {
+                this.selectDashboard(row.id);
+            }
+        } else if (event.key === 'Escape') {
+            this.closePicker();
+            event.target.blur();
+        }
+    }
+
+    scrollPickerTo(index) {
+        const list = this.pickerListRef.el;
+        if (!list) {
+            return;
+        }
+        const top = index * PICKER_ROW_HEIGHT;
+        if (top < list.scrollTop) {
+            list.scrollTop = top;
+        } else if (top + PICKER_ROW_HEIGHT > list.scrollTop + this.pickerViewportHeight) {
+            list.scrollTop = top + PICKER_ROW_HEIGHT - this.pickerViewportHeight;
+        }
+    }
+
+    async searchDashboards(reset) {
+        // Búsqueda paginada en el servidor sobre el catálogo cacheado
+        const picker = this.state.picker;
+        const seq = ++this.pickerSearchSeq;
+        const offset = reset ? 0 : picker.results.length;
+        picker.loading = true;
+        try {
+            const fetchPage = () => this.callHub(
+                'search_dashboards', [picker.query, offset, PICKER_PAGE_SIZE], { silent: true }
+            );
+            // La primera página sin filtro es la instantánea del catálogo: una RPC para todas las pestañas
+            const result = !picker.query && offset === 0
+                ? await this.tabCache.share('catalog:first_page', fetchPage, (page) => page.error ? 0 : TAB_CATALOG_TTL)
+                : await fetchPage();
+            if (seq !== this.pickerSearchSeq) {
+                return;
+            }
+            if (reset) {
+                picker.results = result.records;
+                picker.scrollTop = 0;
+                picker.activeIndex = 0;
+                if (this.pickerListRef.el) {
+                    this.pickerListRef.el.scrollTop = 0;
+                }
+            } else {
+                // Un aviso del bus puede haber añadido ya alguna fila de esta página
+                const known = new Set(picker.results.map((row) => row.id));
+                picker.results = picker.results.concat(result.records.filter((row) => !known.has(row.id)));
+            }
+            picker.total = result.total;
+        } catch (error) {
+            console.error('Error buscando dashboards (traza ' + error.traceId + '):', error);
+        } finally {
+            if (seq === this.pickerSearchSeq) {
+                picker.loading = false;
+            }
+        }
+    }
+
+    async selectDashboard(newValue) {
+        this.closePicker();
+        if (newValue === this.currentDashboardId) {
+            return;
+        }
+
+        // 🔥 Calentar cache de charts en paralelo mientras se prepara el embed
+        if (this.isDashboardValid(newValue)) {
+            this.warmUpDashboard(newValue);
+        }
         
         // Actualizar el record
         await this.props.record.update({
@@ -106,13 +372,10 @@ export class SupersetDashboardIntegrated extends Component {
             this.clearDashboard();
         }
 
-        // Guardar cambios
+        // Guardar cambios (la selección se guarda por usuario en el servidor)
         await this.props.record.save();
-
-        // 💾 Guardar preferencia del usuario
-        if (this.isDashboardValid(newValue)) {
-            await this.saveLastUsedDashboard(newValue);
-        }
+        // El dashboard preferido que compartían las pestañas ya no es este
+        this.tabCache.invalidate('options');
 
         // 🚀 CARGA DIRECTA INMEDIATA (sin esperar onPatched)
         if (this.isDashboardValid(newValue) && !this.state.isLoading) {
@@ -120,6 +383,124 @@ export class SupersetDashboardIntegrated extends Component {
         }
     }
 
+    async onCatalogDiff(diff) {
+        // Parchear la lista cargada en lugar de recargar la página
+        this.tabCache.invalidate('catalog:');
+        this.tabCache.invalidate('options');
+        const picker = this.state.picker;
+        const removed = new Set(diff.removed);
+        const updated = new Map(diff.updated.map((row) => [row.id, row]));
+        const allLoaded = picker.results.length >= picker.total;
+        let results = picker.results
+            .filter((row) => !removed.has(row.id))
+            .map((row) => updated.get(row.id) || row);
+        if (picker.query) {
+            picker.total = Math.max(0, picker.total - (picker.results.length - results.length));
+        } else {
+            if (allLoaded) {
+                results = results.concat(diff.added);
+            }
+            picker.total = Math.max(0, picker.total - diff.removed.length) + diff.added.length;
+        }
+        picker.results = results;
+
+        if (removed.has(this.currentDashboardId)) {
+            this.clearDashboard();
+            this.notification.add(
+                _t('El dashboard seleccionado ya no está disponible en Superset'),
+                { type: 'warning' }
+            );
+        }
+        if (diff.added.length) {
+            this.notification.add(
+                `🆕 ${diff.added.length} dashboard(s) nuevo(s) disponible(s)`,
+                { type: 'info', sticky: false }
+            );
+            if (!this.isDashboardValid(this.currentDashboardId)) {
+                await this.initializeConfiguration();
+                await this.performIntelligentAutoSelection();
+            }
+        }
+    }
+
+    async onStatusChange(status) {
+        const wasConfigured = this.hasConfiguration;
+        this.state.status = status;
+        this.tabCache.set('status', status, TAB_STATUS_TTL);
+        // Superset vuelve a estar configurado o disponible: recalcular opciones sin recargar
+        if (status.has_configuration && !wasConfigured && !this.isDashboardValid(this.currentDashboardId)) {
+            await this.initializeConfiguration();
+            await this.performIntelligentAutoSelection();
+        }
+    }
+
+    async onCatalogReady() {
+        // El primer catálogo ya está en cache en el servidor: pedir las opciones de verdad
+        if (!this.catalogPending) {
+            return;
+        }
+        this.catalogPending = false;
+        await this.initializeConfiguration();
+        await this.performIntelligentAutoSelection();
+    }
+
+    onDashboardData(message) {
+        const waiter = this.dashboardWaiters.get(message.request_id);
+        if (waiter) {
+            this.dashboardWaiters.delete(message.request_id);
+            waiter(message.data);
+            return;
+        }
+        // El aviso puede llegar antes que la respuesta de la RPC que lo anuncia
+        this.dashboardResults.set(message.request_id, message.data);
+        if (this.dashboardResults.size > DASHBOARD_RESULTS_LIMIT) {
+            this.dashboardResults.delete(this.dashboardResults.keys().next().value);
+        }
+    }
+
+    awaitDashboardData(result) {
+        // El servidor pide login, catálogo y guest token sin retener la transacción y
+        // responde por el bus; null si no llega a tiempo
+        if (!result || !result.pending) {
+            return Promise.resolve(result);
+        }
+        const requestId = result.request_id;
+        if (this.dashboardResults.has(requestId)) {
+            const data = this.dashboardResults.get(requestId);
+            this.dashboardResults.delete(requestId);
+            return Promise.resolve(data);
+        }
+        return new Promise((resolve) => {
+            const timer = setTimeout(() => {
+                this.dashboardWaiters.delete(requestId);
+                resolve(null);
+            }, DASHBOARD_DATA_TIMEOUT_MS);
+            this.dashboardWaiters.set(requestId, (data) => {
+                clearTimeout(timer);
+                resolve(data);
+            });
+        });
+    }
+
+    async fetchDashboardData(traceId) {
+        const data = await this.awaitDashboardData(
+            await this.callHub('get_dashboard_data_for_js', [], {}, traceId)
+        );
+        return data || {
+            error: 'Timeout esperando a Superset',
+            error_type: 'timeout_error',
+            user_message: _t('Superset no ha respondido a tiempo. Intenta de nuevo en unos segundos.'),
+            action_required: 'retry_later'
+        };
+    }
+
+    warmUpDashboard(dashboardId) {
+        // Fire-and-forget: no se espera la respuesta para no retrasar la carga
+        this.callHub('warm_up_dashboard', [dashboardId], { silent: true }).catch((error) => {
+            console.error('Error calentando cache del dashboard (traza ' + error.traceId + '):', error);
+        });
+    }
+
     async loadSupersetSDK() {
         if (window.supersetEmbeddedSdk) {
             return;
@@ -154,13 +535,23 @@ export class SupersetDashboardIntegrated extends Component {
             // Paso 1: Verificar configuración
             await this.simulateProgress(300); // Pequeña pausa para UX
             this.setLoadingState(true, '🔑 Autenticando con Superset...', 2);
-            
-            const dashboardData = await this.rpc('/web/dataset/call_kw', {
-                model: this.props.record.resModel,
-                method: 'get_dashboard_data_for_js',
-                args: [this.props.record.resId],
-                kwargs: {}
-            });
+
+            const dashboardId = this.currentDashboardId;
+            this.pendingOpen = {
+                dashboardId: dashboardId,
+                startedAt: performance.now(),
+                // Una recarga del mismo dashboard no cuenta como nueva apertura
+                countOpen: this.state.lastLoadedId !== dashboardId
+            };
+
+            // Guest token ya pedido al inicializar: sin otra llamada al servidor
+            const traceId = this.newTraceId();
+            const dashboardData = await this.takePrefetchedData(dashboardId)
+                || await this.tabCache.share(
+                    `dashboard:${dashboardId}`,
+                    () => this.fetchDashboardData(traceId),
+                    guestTokenTtl
+                );
 
             if (dashboardData.error) {
                 // Crear error estructurado con información detallada
@@ -169,6 +560,7 @@ export class SupersetDashboardIntegrated extends Component {
                 errorObj.actionRequired = dashboardData.action_required;
                 errorObj.technicalDetails = dashboardData.technical_details;
                 errorObj.originalError = dashboardData.error;
+                errorObj.traceId = traceId;
                 throw errorObj;
             }
 
@@ -188,7 +580,7 @@ export class SupersetDashboardIntegrated extends Component {
             );
 
         } catch (error) {
-            console.error('❌ Error cargando dashboard:', error);
+            console.error('❌ Error cargando dashboard (traza ' + (error.traceId || '-') + '):', error);
             
             // Manejar errores según su tipo específico
             let errorMessage = error.message || _t('Error desconocido cargando dashboard');
@@ -301,6 +693,18 @@ export class SupersetDashboardIntegrated extends Component {
             
             this.state.isEmbedded = true;
 
+            // Mantener la miniatura visible hasta que el iframe termine de cargar
+            const iframe = container.querySelector('iframe');
+            if (iframe) {
+                iframe.addEventListener('load', () => {
+                    this.state.isLiveReady = true;
+                    this.recordDashboardOpen();
+                }, { once: true });
+            } else {
+                this.state.isLiveReady = true;
+                this.recordDashboardOpen();
+            }
+
         } catch (error) {
             throw new Error('Error embebiendo dashboard: ' + error.message);
         }
@@ -312,6 +716,7 @@ export class SupersetDashboardIntegrated extends Component {
         }
         
         this.state.isEmbedded = false;
+        this.state.isLiveReady = false;
         this.state.dashboardData = null;
         this.state.error = null;
         this.state.errorType = null;
@@ -429,26 +834,16 @@ export class SupersetDashboardIntegrated extends Component {
         }
     }
     
-    async ensureConfigurationIsComputed() {
-        console.log('🔍 [TIMING] ensureConfigurationIsComputed - Forzando cálculo...');
-        
+    async loadMonitoredStatus() {
+        // Solo lee el registro del monitor; la comprobación completa es cosa del botón 🔄 Actualizar
         try {
-            // Forzar cálculo de campos computados ANTES de mostrar la interfaz
-            await this.rpc('/web/dataset/call_kw', {
-                model: this.props.record.resModel,
-                method: 'force_refresh_configuration',
-                args: [this.props.record.resId],
-                kwargs: {}
-            });
-            
-            // Recargar el record para obtener los campos actualizados
-            await this.props.record.load();
-            
-            console.log('✅ [TIMING] ensureConfigurationIsComputed - Configuración forzada. has_configuration:', 
-                       this.props.record.data.has_configuration);
-            
+            const status = await this.tabCache.share(
+                'status', () => this.callHub('get_hub_status'), () => TAB_STATUS_TTL
+            );
+            this.state.status = status;
+            console.log('✅ [TIMING] loadMonitoredStatus - has_configuration:', status.has_configuration);
         } catch (error) {
-            console.error('❌ [TIMING] Error forzando configuración:', error);
+            console.error('❌ [TIMING] Error leyendo el estado del monitor:', error);
         }
     }
 
@@ -461,12 +856,30 @@ export class SupersetDashboardIntegrated extends Component {
         console.log('🔍 [TIMING] initializeConfiguration - has_configuration antes:', this.props.record.data.has_configuration);
         
         try {
-            const result = await this.rpc('/web/dataset/call_kw', {
-                model: this.props.record.resModel,
-                method: 'refresh_dashboard_options',
-                args: [this.props.record.resId],
-                kwargs: {}
-            });
+            const result = await this.tabCache.share(
+                'options',
+                () => this.callHub('refresh_dashboard_options'),
+                // Con guest token prefetched, no más allá de su caducidad; lo que aún está
+                // pendiente en el servidor (catálogo o guest token) no se comparte
+                (options) => {
+                    if (options.catalog_pending || options.dashboard_request) {
+                        return 0;
+                    }
+                    return options.dashboard_data
+                        ? Math.min(TAB_OPTIONS_TTL, guestTokenTtl(options.dashboard_data))
+                        : TAB_OPTIONS_TTL;
+                }
+            );
+            this.catalogPending = Boolean(result.catalog_pending);
+
+            // Dashboard más probable del usuario ya seleccionado en el servidor, con su guest token
+            // (o la promesa del que llega por el bus)
+            if (result.preferred_dashboard && (result.dashboard_data || result.dashboard_request)) {
+                this.prefetched = {
+                    dashboardId: result.preferred_dashboard,
+                    data: result.dashboard_data || this.awaitDashboardData(result.dashboard_request)
+                };
+            }
 
             if (result.options_refreshed) {
                 await this.props.record.load();
@@ -505,6 +918,7 @@ export class SupersetDashboardIntegrated extends Component {
             if (validOptions.length === 1) {
                 const [dashboardId, dashboardTitle] = validOptions[0];
                 console.log('🚀 [TIMING] Auto-seleccionando único dashboard:', dashboardTitle);
+                this.warmUpDashboard(dashboardId);
                 
                 await this.props.record.update({
                     [this.props.name]: dashboardId
@@ -520,26 +934,9 @@ export class SupersetDashboardIntegrated extends Component {
                 return;
             }
 
-            // Caso 3: Múltiples dashboards - verificar preferencia del usuario
+            // Caso 3: Múltiples dashboards sin historial de uso - el usuario elige
+            // (con historial, el servidor ya ha seleccionado el más usado: caso 1)
             if (validOptions.length > 1) {
-                const lastUsedDashboard = await this.getLastUsedDashboard();
-                
-                if (lastUsedDashboard && this.isDashboardValid(lastUsedDashboard)) {
-                    const stillAvailable = validOptions.some(([key]) => key === lastUsedDashboard);
-                    
-                    if (stillAvailable) {
-                        console.log('🔄 [TIMING] Restaurando último dashboard usado');
-                        
-                        await this.props.record.update({
-                            [this.props.name]: lastUsedDashboard
-                        });
-                        await this.props.record.save();
-                        
-                        await this.loadDashboard();
-                        return;
-                    }
-                }
-                
                 this.notification.add(
                     `📋 ${validOptions.length} dashboards disponibles. Selecciona uno para comenzar.`,
                     { type: 'info', sticky: false }
@@ -551,30 +948,24 @@ export class SupersetDashboardIntegrated extends Component {
         }
     }
 
-    async getLastUsedDashboard() {
-        try {
-            // Intentar obtener preferencia del usuario desde localStorage
-            const userId = this.env?.services?.user?.userId || 'default';
-            const storageKey = `superset_last_dashboard_${userId}`;
-            const lastUsed = localStorage.getItem(storageKey);
-            
-            return lastUsed || null;
-        } catch (error) {
-            console.error('Error obteniendo último dashboard usado:', error);
-            return null;
-        }
+    takePrefetchedData(dashboardId) {
+        // Los datos prefetched solo sirven una vez (el guest token caduca); pueden ser una promesa
+        const prefetched = this.prefetched;
+        this.prefetched = null;
+        return prefetched && prefetched.dashboardId === dashboardId ? prefetched.data : null;
     }
 
-    async saveLastUsedDashboard(dashboardId) {
-        try {
-            if (this.isDashboardValid(dashboardId)) {
-                const userId = this.env?.services?.user?.userId || 'default';
-                const storageKey = `superset_last_dashboard_${userId}`;
-                localStorage.setItem(storageKey, dashboardId);
-            }
-        } catch (error) {
-            console.error('Error guardando último dashboard usado:', error);
+    recordDashboardOpen() {
+        // Uso por usuario en el servidor: ordena el selector y elige el dashboard al entrar
+        const open = this.pendingOpen;
+        this.pendingOpen = null;
+        if (!open || !open.countOpen) {
+            return;
         }
+        const loadMs = Math.round(performance.now() - open.startedAt);
+        this.callHub('record_dashboard_open', [open.dashboardId, loadMs], { silent: true }).catch((error) => {
+            console.error('Error registrando uso del dashboard:', error);
+        });
     }
 }
 
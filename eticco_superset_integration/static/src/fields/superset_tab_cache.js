@@ -0,0 +1,248 @@
+/** @odoo-module **/
+
+/**
+ * Cache compartida entre las pestañas de la misma sesión
+ *
+ * Las pestañas del hub comparten el arranque (configuración y opciones), la
+ * primera página del catálogo, el estado y los guest tokens vigentes. Los
+ * valores se guardan en localStorage con su caducidad (así una pestaña nueva
+ * los lee al abrir) y se anuncian por BroadcastChannel, o por el evento
+ * `storage` si el navegador no lo tiene.
+ *
+ * `share(clave, fetcher, ttl)` garantiza que solo la primera pestaña hace la
+ * RPC: las demás esperan su resultado. La exclusión usa Web Locks cuando
+ * existe y, si no, un testigo con caducidad en localStorage.
+ */
+
+const PREFIX = "superset_tab_cache";
+// Tiempo máximo que se espera a la pestaña que tiene la petición en curso
+const LEASE_MS = 30000;
+// Margen antes de la caducidad real de un guest token para dejar de reutilizarlo
+const GUEST_TOKEN_MARGIN_MS = 30000;
+// Vigencia de un guest token sin `exp` legible (Superset: 5 minutos por defecto)
+const GUEST_TOKEN_DEFAULT_TTL_MS = 4 * 60 * 1000;
+
+const caches = new Map();
+
+function newTabId() {
+    return Math.random().toString(36).slice(2) + Date.now().toString(36);
+}
+
+export class SupersetTabCache {
+    constructor(scope) {
+        this.scope = `${PREFIX}:${scope}`;
+        this.tabId = newTabId();
+        this.memory = new Map();
+        this.waiters = new Map();
+
+        if (window.BroadcastChannel) {
+            this.channel = new BroadcastChannel(this.scope);
+            this.channel.onmessage = (event) => this.onMessage(event.data);
+        } else {
+            window.addEventListener("storage", (event) => {
+                if (event.key === this.messageKey && event.newValue) {
+                    this.onMessage(JSON.parse(event.newValue));
+                }
+            });
+        }
+    }
+
+    get messageKey() {
+        return `${this.scope}:message`;
+    }
+
+    entryKey(key) {
+        return `${this.scope}:entry:${key}`;
+    }
+
+    leaseKey(key) {
+        return `${this.scope}:lease:${key}`;
+    }
+
+    readStorage(storageKey) {
+        try {
+            const raw = localStorage.getItem(storageKey);
+            return raw ? JSON.parse(raw) : null;
+        } catch {
+            return null;
+        }
+    }
+
+    writeStorage(storageKey, value) {
+        try {
+            localStorage.setItem(storageKey, JSON.stringify(value));
+        } catch {
+            // Sin cuota o almacenamiento bloqueado: queda el aviso por el canal
+        }
+    }
+
+    removeStorage(storageKey) {
+        try {
+            localStorage.removeItem(storageKey);
+        } catch {
+            // Nada que limpiar
+        }
+    }
+
+    get(key) {
+        const entry = this.memory.get(key) || this.readStorage(this.entryKey(key));
+        if (!entry) {
+            return undefined;
+        }
+        if (entry.expires <= Date.now()) {
+            this.memory.delete(key);
+            this.removeStorage(this.entryKey(key));
+            return undefined;
+        }
+        this.memory.set(key, entry);
+        return entry.value;
+    }
+
+    set(key, value, ttlMs) {
+        const entry = { value, expires: Date.now() + ttlMs };
+        this.memory.set(key, entry);
+        this.writeStorage(this.entryKey(key), entry);
+        this.post({ type: "value", key, entry });
+    }
+
+    invalidate(prefix) {
+        this.dropPrefix(prefix);
+        this.post({ type: "invalidate", prefix });
+    }
+
+    dropPrefix(prefix) {
+        for (const key of [...this.memory.keys()]) {
+            if (key.startsWith(prefix)) {
+                this.memory.delete(key);
+            }
+        }
+        const storagePrefix = this.entryKey(prefix);
+        try {
+            for (const storageKey of Object.keys(localStorage)) {
+                if (storageKey.startsWith(storagePrefix)) {
+                    localStorage.removeItem(storageKey);
+                }
+            }
+        } catch {
+            // Almacenamiento no disponible
+        }
+    }
+
+    post(message) {
+        const payload = { ...message, from: this.tabId };
+        if (this.channel) {
+            this.channel.postMessage(payload);
+        } else {
+            // El evento `storage` solo salta si el valor cambia: el nonce lo asegura
+            this.writeStorage(this.messageKey, { ...payload, nonce: newTabId() });
+        }
+    }
+
+    onMessage(message) {
+        if (!message || message.from === this.tabId) {
+            return;
+        }
+        if (message.type === "value") {
+            this.memory.set(message.key, message.entry);
+            this.resolveWaiters(message.key, message.entry.value);
+        } else if (message.type === "released") {
+            // La otra pestaña terminó sin resultado reutilizable: cada una pide el suyo
+            this.resolveWaiters(message.key, undefined);
+        } else if (message.type === "invalidate") {
+            this.dropPrefix(message.prefix);
+        }
+    }
+
+    resolveWaiters(key, value) {
+        const waiters = this.waiters.get(key) || [];
+        this.waiters.delete(key);
+        for (const resolve of waiters) {
+            resolve(value);
+        }
+    }
+
+    waitFor(key, timeoutMs) {
+        return new Promise((resolve) => {
+            const done = (value) => {
+                clearTimeout(timer);
+                resolve(value);
+            };
+            const timer = setTimeout(() => {
+                const waiters = (this.waiters.get(key) || []).filter((waiter) => waiter !== done);
+                this.waiters.set(key, waiters);
+                resolve(undefined);
+            }, timeoutMs);
+            this.waiters.set(key, [...(this.waiters.get(key) || []), done]);
+        });
+    }
+
+    async share(key, fetcher, ttlFor) {
+        // Valor vigente de cualquier pestaña, o una sola petición para todas
+        const cached = this.get(key);
+        if (cached !== undefined) {
+            return cached;
+        }
+        if (navigator.locks) {
+            return navigator.locks.request(`${this.scope}:${key}`, async () => {
+                const value = this.get(key);
+                return value !== undefined ? value : this.fetchAndStore(key, fetcher, ttlFor);
+            });
+        }
+
+        const lease = this.readStorage(this.leaseKey(key));
+        if (lease && lease.owner !== this.tabId && lease.expires > Date.now()) {
+            const value = await this.waitFor(key, lease.expires - Date.now());
+            if (value !== undefined) {
+                return value;
+            }
+        }
+        this.writeStorage(this.leaseKey(key), { owner: this.tabId, expires: Date.now() + LEASE_MS });
+        try {
+            return await this.fetchAndStore(key, fetcher, ttlFor);
+        } finally {
+            this.removeStorage(this.leaseKey(key));
+        }
+    }
+
+    async fetchAndStore(key, fetcher, ttlFor) {
+        let value;
+        try {
+            value = await fetcher();
+        } catch (error) {
+            this.post({ type: "released", key });
+            throw error;
+        }
+        const ttl = ttlFor(value);
+        if (ttl > 0) {
+            this.set(key, value, ttl);
+        } else {
+            this.post({ type: "released", key });
+        }
+        return value;
+    }
+}
+
+export function getTabCache(scope) {
+    // Una instancia por sesión y empresas activas, compartida por los widgets de la pestaña
+    if (!caches.has(scope)) {
+        caches.set(scope, new SupersetTabCache(scope));
+    }
+    return caches.get(scope);
+}
+
+export function guestTokenTtl(data) {
+    // Vigencia reutilizable de unos datos de dashboard según el `exp` de su guest token
+    if (!data || !data.success || !data.guest_token) {
+        return 0;
+    }
+    try {
+        const payload = data.guest_token.split(".")[1].replace(/-/g, "+").replace(/_/g, "/");
+        const claims = JSON.parse(atob(payload));
+        if (claims.exp) {
+            return Math.max(0, claims.exp * 1000 - Date.now() - GUEST_TOKEN_MARGIN_MS);
+        }
+    } catch {
+        // Token opaco: vigencia por defecto
+    }
+    return GUEST_TOKEN_DEFAULT_TTL_MS;
+}
@@ -1,2 +1,10 @@
 # -*- coding: utf-8 -*-
-# Tests para el módulo de integración con Superset
\ No newline at end of file
+# Tests para el módulo de integración con Superset
+from . import test_superset_utils
+from . import test_analytics_hub
+from . import test_configuration_flow
+from . import test_integration
+from . import test_superset_http
+from . import test_superset_call_log
+from . import test_superset_call_budget
+from . import test_benchmark_flows
@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+from collections import Counter
+from contextlib import contextmanager
+
+from odoo.tests.common import TransactionCase
+
+from ..models.superset_circuit_breaker import get_circuit_breaker
+from ..models.superset_metrics import METRICS
+from ..models.superset_utils import (
+    EP_LOGIN, EP_GUEST_TOKEN, EP_DASHBOARD_LIST, EP_EMBEDDED, EP_CHARTS,
+    EP_THUMBNAIL, EP_WARM_UP, EP_HEALTH,
+)
+from .fake_superset import FakeSuperset
+
+# Categorías de llamadas salientes (mismos nombres que los endpoints del Superset falso)
+ENDPOINT_CATEGORIES = {
+    EP_LOGIN: 'login',
+    EP_GUEST_TOKEN: 'guest_token',
+    EP_DASHBOARD_LIST: 'dashboard_list',
+    EP_EMBEDDED: 'embedded',
+    EP_CHARTS: 'charts',
+    EP_THUMBNAIL: 'thumbnail',
+    EP_WARM_UP: 'warm_up',
+    EP_HEALTH: 'health',
+}
+
+
+class SupersetCallCounter:
+    """Llamadas salientes a Superset contadas por categoría durante un bloque"""
+
+    def __init__(self):
+        self.calls = Counter()
+
+    @property
+    def total(self):
+        return sum(self.calls.values())
+
+    def __repr__(self):
+        return f'{self.total} llamadas {dict(self.calls)}'
+
+
+class SupersetCallBudgetMixin:
+    """Presupuestos de llamadas HTTP para tests de regresión de rendimiento
+
+    Cuenta a partir de las métricas de ``superset_request``, por lo que funciona
+    igual contra el Superset falso que con ``requests`` mockeado::
+
+        with self.assertSupersetCalls(max_total=1, guest_token=1):
+            hub.get_dashboard_data_for_js()
+    """
+
+    @contextmanager
+    def countSupersetCalls(self):
+        counter = SupersetCallCounter()
+        before = METRICS.request_counts()
+        try:
+            yield counter
+        finally:
+            for endpoint, value in METRICS.request_counts().items():
+                delta = value - before.get(endpoint, 0)
+                if delta:
+                    counter.calls[ENDPOINT_CATEGORIES.get(endpoint, endpoint)] += delta
+
+    @contextmanager
+    def assertSupersetCalls(self, max_total=None, **max_by_category):
+        """Fallar si el bloque supera el total o el máximo de alguna categoría"""
+        with self.countSupersetCalls() as counter:
+            yield counter
+        if max_total is not None:
+            self.assertLessEqual(counter.total, max_total,
+                                 f'Presupuesto de llamadas a Superset superado: {counter!r}')
+        for category, limit in max_by_category.items():
+            self.assertLessEqual(counter.calls[category], limit,
+                                 f'Presupuesto de llamadas "{category}" superado: {counter!r}')
+
+
+class FakeSupersetCase(SupersetCallBudgetMixin, TransactionCase):
+    """Base de tests que apunta la configuración a un Superset falso en proceso"""
+
+    fake_dashboards = 10
+    fake_embedded_ratio = 1.0
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.fake = FakeSuperset(dashboards=cls.fake_dashboards, embedded_ratio=cls.fake_embedded_ratio).start()
+        cls.addClassCleanup(cls.fake.stop)
+
+    @classmethod
+    def _request_handler(cls, s, r, /, **kw):
+        # El arnés de Odoo compara ``timeout < 10`` y solo admite números; el
+        # código envía siempre ``(conexión, lectura)``, también desde los pools
+        timeout = kw.get('timeout')
+        if isinstance(timeout, tuple):
+            kw['timeout'] = max(value for value in timeout if value is not None)
+        return super()._request_handler(s, r, **kw)
+
+    def setUp(self):
+        super().setUp()
+        # Estado limpio del servidor falso y de la cache global entre tests
+        self.fake.latency = 0.0
+        self.fake.error_rate = 0.0
+        self.fake.error_endpoints = set()
+        self.fake.error_status = 500
+        self.fake.error_counts.clear()
+        self.fake.set_dashboards(self.fake_dashboards, self.fake_embedded_ratio)
+        self.fake.reset_stats()
+
+        self.utils = self.env['superset.utils']
+        self.utils.clear_all_cache()
+        self.addCleanup(self.utils.clear_all_cache)
+
+        ICPSudo = self.env['ir.config_parameter'].sudo()
+        ICPSudo.set_param('superset.url', self.fake.url)
+        ICPSudo.set_param('superset.username', self.fake.username)
+        ICPSudo.set_param('superset.password', self.fake.password)
+        ICPSudo.set_param('superset.timeout', '30')
+        # El estado del circuit breaker persiste en data_dir entre tests y ejecuciones
+        get_circuit_breaker(self.fake.url).reset()
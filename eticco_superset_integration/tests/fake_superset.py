@@ -0,0 +1,403 @@
+# -*- coding: utf-8 -*-
+"""
+Servidor Superset falso para tests y pruebas de carga
+
+Implementa en proceso (solo librería estándar) las rutas de la API de Superset
+que usa el módulo: login, refresh, listado de dashboards con paginación rison y
+columnas, /embedded, charts, miniaturas, warm-up, guest_token y /health.
+
+La latencia, la tasa de errores y el número de dashboards son configurables, y
+el servidor lleva estadísticas de llamadas por endpoint, concurrencia máxima y
+conexiones TCP abiertas para poder verificar reutilización y paralelismo.
+
+Uso standalone (p. ej. para ``load_test_scenarios.py``)::
+
+    python fake_superset.py --port 8088 --dashboards 100 --latency 0.05
+"""
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+# PNG de 1x1 píxel para las miniaturas
+FAKE_PNG = bytes.fromhex(
+    '89504e470d0a1a0a0000000d4948445200000001000000010806000000'
+    '1f15c4890000000d49444154789c63f8ffff3f0005fe02fea7d6a4f30000'
+    '000049454e44ae426082'
+)
+
+ROUTES = [
+    ('POST', re.compile(r'^/api/v1/security/login$'), 'login'),
+    ('POST', re.compile(r'^/api/v1/security/refresh$'), 'refresh'),
+    ('POST', re.compile(r'^/api/v1/security/guest_token/?$'), 'guest_token'),
+    ('GET', re.compile(r'^/api/v1/dashboard/?$'), 'dashboard_list'),
+    ('GET', re.compile(r'^/api/v1/dashboard/(?P<id>\d+)/embedded$'), 'embedded'),
+    ('GET', re.compile(r'^/api/v1/dashboard/(?P<id>\d+)/charts$'), 'charts'),
+    ('GET', re.compile(r'^/api/v1/dashboard/(?P<id>\d+)/thumbnail/(?P<digest>[^/]+)/?$'), 'thumbnail'),
+    ('PUT', re.compile(r'^/api/v1/chart/warm_up_cache$'), 'warm_up'),
+    ('GET', re.compile(r'^/health$'), 'health'),
+]
+
+
+def parse_rison(value):
+    """Parser rison mínimo: objetos ``(a:1)``, listas ``!(a,b)``, strings y números"""
+    pos = 0
+
+    def parse_value():
+        nonlocal pos
+        char = value[pos]
+        if char == '(':
+            pos += 1
+            result = {}
+            while value[pos] != ')':
+                key = parse_atom()
+                pos += 1  # ':'
+                result[key] = parse_value()
+                if value[pos] == ',':
+                    pos += 1
+            pos += 1
+            return result
+        if value.startswith('!(', pos):
+            pos += 2
+            result = []
+            while value[pos] != ')':
+                result.append(parse_value())
+                if value[pos] == ',':
+                    pos += 1
+            pos += 1
+            return result
+        if value.startswith('!t', pos) or value.startswith('!f', pos) or value.startswith('!n', pos):
+            pos += 2
+            return {'!t': True, '!f': False, '!n': None}[value[pos - 2:pos]]
+        atom = parse_atom()
+        if re.fullmatch(r'-?\d+', atom):
+            return int(atom)
+        return atom
+
+    def parse_atom():
+        nonlocal pos
+        if value[pos] == "'":
+            end = pos + 1
+            chars = []
+            while value[end] != "'":
+                if value[end] == '!':
+                    end += 1
+                chars.append(value[end])
+                end += 1
+            pos = end + 1
+            return ''.join(chars)
+        match = re.compile(r"[^():,'!]+").match(value, pos)
+        pos = match.end()
+        return match.group(0)
+
+    return parse_value() if value else {}
+
+
+class FakeSuperset:
+    """Servidor HTTP que imita la API de Superset dentro del proceso de tests"""
+
+    def __init__(self, dashboards=10, embedded_ratio=1.0, charts_per_dashboard=3,
+                 latency=0.0, error_rate=0.0, error_endpoints=None, username='admin',
+                 password='admin', thumbnail_async=False, seed=0):
+        self.username = username
+        self.password = password
+        self.latency = latency
+        self.error_rate = error_rate
+        self.error_endpoints = set(error_endpoints or [])
+        # Código HTTP de los fallos inyectados (503 simula backend caído para el circuit breaker)
+        self.error_status = 500
+        # Fallos puntuales: endpoint -> número de peticiones que aún deben fallar
+        self.error_counts = Counter()
+        self.charts_per_dashboard = charts_per_dashboard
+        self.thumbnail_async = thumbnail_async
+        self.random = random.Random(seed)
+        self.set_dashboards(dashboards, embedded_ratio)
+
+        self.lock = threading.Lock()
+        self.access_tokens = set()
+        self.refresh_tokens = set()
+        self.thumbnails_requested = set()
+        self.reset_stats()
+
+        self.server = None
+        self.thread = None
+
+    # ------------------------------------------------------------------
+    # Configuración y estadísticas
+    # ------------------------------------------------------------------
+
+    def set_dashboards(self, count, embedded_ratio=1.0):
+        """Regenerar el catálogo con ``count`` dashboards publicados"""
+        embedded_count = int(round(count * embedded_ratio))
+        self.dashboards = [{
+            'id': index,
+            'uuid': str(uuid.UUID(int=index)),
+            'dashboard_title': f'Dashboard {index:04d}',
+            'description': f'Dashboard de prueba {index}',
+            'published': True,
+            'changed_on_utc': '2024-01-01T00:00:00.000000+0000',
+            'thumbnail_url': f'/api/v1/dashboard/{index}/thumbnail/digest{index}/',
+            'owners': [{'username': 'admin'}],
+            'tags': [{'name': f'area{index % 5}'}],
+            'embedded_uuid': str(uuid.UUID(int=10 ** 6 + index)) if index <= embedded_count else None,
+        } for index in range(1, count + 1)]
+        self.dashboards_by_id = {d['id']: d for d in self.dashboards}
+
+    def reset_stats(self):
+        with self.lock:
+            self.calls = Counter()
+            self.request_log = []
+            self.connections = set()
+            self.in_flight = 0
+            self.max_concurrency = 0
+
+    @property
+    def total_calls(self):
+        return sum(self.calls.values())
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    # ------------------------------------------------------------------
+    # Ciclo de vida
+    # ------------------------------------------------------------------
+
+    def start(self, host='127.0.0.1', port=0):
+        handler = type('FakeSupersetHandler', (_FakeSupersetHandler,), {'fake': self})
+        self.server = ThreadingHTTPServer((host, port), handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, name='fake_superset', daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    # ------------------------------------------------------------------
+    # Lógica de los endpoints
+    # ------------------------------------------------------------------
+
+    def _latency_for(self, endpoint):
+        if isinstance(self.latency, dict):
+            return self.latency.get(endpoint, self.latency.get('default', 0.0))
+        return self.latency
+
+    def _should_fail(self, endpoint):
+        if endpoint in self.error_endpoints:
+            return True
+        with self.lock:
+            if self.error_counts[endpoint] > 0:
+                self.error_counts[endpoint] -= 1
+                return True
+        return self.error_rate and self.random.random() < self.error_rate
+
+    def handle(self, method, endpoint, match, query, headers, body):
+        """Devuelve (status, content_type, payload) para una petición enrutada"""
+        if endpoint not in ('login', 'health') and not self._is_authorized(endpoint, headers):
+            return 401, 'application/json', {'msg': 'Token is missing or invalid'}
+
+        handler = getattr(self, f'_handle_{endpoint}')
+        return handler(match, query, body)
+
+    def _is_authorized(self, endpoint, headers):
+        token = headers.get('Authorization', '').replace('Bearer ', '')
+        tokens = self.refresh_tokens if endpoint == 'refresh' else self.access_tokens
+        return token in tokens
+
+    def _handle_login(self, match, query, body):
+        if body.get('username') != self.username or body.get('password') != self.password:
+            return 401, 'application/json', {'message': 'Not authorized'}
+        access_token, refresh_token = uuid.uuid4().hex, uuid.uuid4().hex
+        with self.lock:
+            self.access_tokens.add(access_token)
+            self.refresh_tokens.add(refresh_token)
+        return 200, 'application/json', {'access_token': access_token, 'refresh_token': refresh_token}
+
+    def _handle_refresh(self, match, query, body):
+        access_token = uuid.uuid4().hex
+        with self.lock:
+            self.access_tokens.add(access_token)
+        return 200, 'application/json', {'access_token': access_token}
+
+    def _handle_dashboard_list(self, match, query, body):
+        params = parse_rison(query.get('q', [''])[0])
+        page = params.get('page', 0)
+        page_size = params.get('page_size', 20)
+        columns = params.get('columns')
+        rows = self.dashboards[page * page_size:(page + 1) * page_size]
+        public = [{k: v for k, v in d.items() if k != 'embedded_uuid'} for d in rows]
+        if columns:
+            public = [{k: v for k, v in d.items() if k in columns} for d in public]
+        return 200, 'application/json', {'count': len(self.dashboards), 'result': public}
+
+    def _handle_embedded(self, match, query, body):
+        dashboard = self.dashboards_by_id.get(int(match.group('id')))
+        if not dashboard or not dashboard['embedded_uuid']:
+            return 404, 'application/json', {'message': 'Not found'}
+        return 200, 'application/json', {'result': {
+            'uuid': dashboard['embedded_uuid'],
+            'dashboard_id': str(dashboard['id']),
+            'allowed_domains': [],
+        }}
+
+    def _handle_charts(self, match, query, body):
+        dashboard_id = int(match.group('id'))
+        if dashboard_id not in self.dashboards_by_id:
+            return 404, 'application/json', {'message': 'Not found'}
+        return 200, 'application/json', {'result': [{
+            'id': dashboard_id * 100 + index,
+            'slice_name': f'Chart {dashboard_id}.{index}',
+        } for index in range(1, self.charts_per_dashboard + 1)]}
+
+    def _handle_thumbnail(self, match, query, body):
+        dashboard_id = int(match.group('id'))
+        if dashboard_id not in self.dashboards_by_id:
+            return 404, 'application/json', {'message': 'Not found'}
+        with self.lock:
+            first_request = dashboard_id not in self.thumbnails_requested
+            self.thumbnails_requested.add(dashboard_id)
+        if self.thumbnail_async and first_request:
+            return 202, 'application/json', {'message': 'OK Async'}
+        return 200, 'image/png', FAKE_PNG
+
+    def _handle_warm_up(self, match, query, body):
+        return 200, 'application/json', {'result': [{
+            'chart_id': body.get('chart_id'),
+            'viz_error': None,
+            'viz_status': 'success',
+        }]}
+
+    def _handle_guest_token(self, match, query, body):
+        return 200, 'application/json', {'token': f'guest-{uuid.uuid4().hex}'}
+
+    def _handle_health(self, match, query, body):
+        return 200, 'text/plain', 'OK'
+
+
+class _FakeSupersetHandler(BaseHTTPRequestHandler):
+    """Handler HTTP/1.1 con keep-alive para poder medir reutilización de conexiones"""
+    protocol_version = 'HTTP/1.1'
+    fake = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self._dispatch('GET')
+
+    def do_POST(self):
+        self._dispatch('POST')
+
+    def do_PUT(self):
+        self._dispatch('PUT')
+
+    def _dispatch(self, method):
+        fake = self.fake
+        parsed = urlparse(self.path)
+        length = int(self.headers.get('Content-Length') or 0)
+        raw_body = self.rfile.read(length) if length else b''
+
+        endpoint, match = None, None
+        for route_method, pattern, name in ROUTES:
+            match = pattern.match(parsed.path)
+            if match and route_method == method:
+                endpoint = name
+                break
+
+        with fake.lock:
+            fake.calls[endpoint or 'unknown'] += 1
+            fake.connections.add(self.client_address)
+            fake.in_flight += 1
+            fake.max_concurrency = max(fake.max_concurrency, fake.in_flight)
+            fake.request_log.append({
+                'method': method,
+                'endpoint': endpoint,
+                'path': parsed.path,
+                'time': time.time(),
+                'headers': dict(self.headers),
+            })
+
+        try:
+            if not endpoint:
+                self._respond(404, 'application/json', {'message': 'Not found'})
+                return
+
+            delay = fake._latency_for(endpoint)
+            if delay:
+                time.sleep(delay)
+
+            if fake._should_fail(endpoint):
+                self._respond(fake.error_status, 'application/json', {'message': 'Fake internal error'})
+                return
+
+            try:
+                body = json.loads(raw_body) if raw_body else {}
+            except ValueError:
+                body = {}
+            status, content_type, payload = fake.handle(
+                method, endpoint, match, parse_qs(parsed.query), self.headers, body)
+            self._respond(status, content_type, payload)
+        finally:
+            with fake.lock:
+                fake.in_flight -= 1
+
+    def _respond(self, status, content_type, payload):
+        if isinstance(payload, bytes):
+            data = payload
+        elif content_type == 'application/json':
+            data = json.dumps(payload).encode()
+        else:
+            data = str(payload).encode()
+        try:
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+        except (BrokenPipeError, ConnectionResetError):
+            # El cliente abandonó la petición (timeout en el lado de Odoo)
+            pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Servidor Superset falso para pruebas')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8088)
+    parser.add_argument('--dashboards', type=int, default=10)
+    parser.add_argument('--embedded-ratio', type=float, default=1.0)
+    parser.add_argument('--latency', type=float, default=0.0, help='Latencia por petición (segundos)')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Probabilidad de HTTP 500 (0-1)')
+    args = parser.parse_args()
+
+    fake = FakeSuperset(dashboards=args.dashboards, embedded_ratio=args.embedded_ratio,
+                        latency=args.latency, error_rate=args.error_rate)
+    fake.start(args.host, args.port)
+    print(f'🧪 Superset falso escuchando en {fake.url} ({args.dashboards} dashboards)')
+    try:
+        while True:
+            time.sleep(60)
+            print(f'📊 Llamadas: {dict(fake.calls)} | concurrencia máxima: {fake.max_concurrency}')
+    except KeyboardInterrupt:
+        fake.stop()
+
+
+if __name__ == '__main__':
+    main()
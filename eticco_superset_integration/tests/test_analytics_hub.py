@@ -1,11 +1,14 @@
 # -*- coding: utf-8 -*-
+from odoo import fields
 from odoo.tests.common import TransactionCase
 from odoo.exceptions import ValidationError, UserError
 from unittest.mock import patch, Mock
 import requests
 
+from .common import SupersetCallBudgetMixin
 
-class TestAnalyticsHub(TransactionCase):
+
+class TestAnalyticsHub(SupersetCallBudgetMixin, TransactionCase):
     """Tests para el modelo superset.analytics.hub"""
 
     def setUp(self):
@@ -22,40 +25,42 @@ class TestAnalyticsHub(TransactionCase):
         self.env['ir.config_parameter'].sudo().set_param('superset.username', 'admin')
         self.env['ir.config_parameter'].sudo().set_param('superset.password', 'admin')
 
+        # El catálogo y los tokens viven en una cache global de proceso
+        self.env['superset.utils'].clear_all_cache()
+        self.addCleanup(self.env['superset.utils'].clear_all_cache)
+
     def test_create_hub_record(self):
         """Test: Crear registro de Analytics Hub"""
         self.assertTrue(self.hub.exists())
         self.assertEqual(self.hub.display_name, 'Test Analytics Hub')
         self.assertFalse(self.hub.dashboard_loaded)
 
-    @patch.object(None, 'get_dashboard_stats_cached')
-    def test_compute_system_status_configured(self, mock_stats):
+    def test_compute_system_status_configured(self):
         """Test: Calcular estado del sistema cuando está configurado"""
-        # Mock de estadísticas
-        mock_stats.return_value = {
+        # Estado leído del monitor de salud
+        status = {
             'has_configuration': True,
             'total_dashboards': 5,
             'with_embedding': 3
         }
         
         # Simular campo computado
-        with patch.object(self.env['superset.utils'], 'get_dashboard_stats_cached', return_value=mock_stats.return_value):
+        with patch.object(type(self.env['superset.utils']), 'get_monitored_status', return_value=status):
             self.hub._compute_system_status()
         
         self.assertTrue(self.hub.has_configuration)
         self.assertEqual(self.hub.available_dashboards_count, 3)
 
-    @patch.object(None, 'get_dashboard_stats_cached')
-    def test_compute_system_status_not_configured(self, mock_stats):
+    def test_compute_system_status_not_configured(self):
         """Test: Calcular estado del sistema cuando no está configurado"""
-        # Mock de estadísticas para sistema no configurado
-        mock_stats.return_value = {
+        # Estado del monitor para sistema no configurado
+        status = {
             'has_configuration': False,
             'total_dashboards': 0,
             'with_embedding': 0
         }
         
-        with patch.object(self.env['superset.utils'], 'get_dashboard_stats_cached', return_value=mock_stats.return_value):
+        with patch.object(type(self.env['superset.utils']), 'get_monitored_status', return_value=status):
             self.hub._compute_system_status()
         
         self.assertFalse(self.hub.has_configuration)
@@ -91,12 +96,8 @@ class TestAnalyticsHub(TransactionCase):
         self.assertIn('Configurar Superset', selection[0][1])
 
     @patch('requests.get')
-    @patch.object(None, 'get_access_token')
-    def test_get_dashboard_selection_success(self, mock_get_token, mock_get):
+    def test_get_dashboard_selection_success(self, mock_get):
         """Test: Obtener selección de dashboards exitosamente"""
-        # Mock token
-        mock_get_token.return_value = 'test_token'
-        
         # Mock respuesta de dashboards
         mock_dashboards_response = Mock()
         mock_dashboards_response.status_code = 200
@@ -131,12 +132,17 @@ class TestAnalyticsHub(TransactionCase):
             mock_embedding_response    # Tercera llamada: embedding para dashboard 2
         ]
         
-        with patch.object(self.env['superset.utils'], 'get_access_token', return_value='test_token'):
+        with patch.object(type(self.env['superset.utils']), 'get_access_token', return_value='test_token'):
             selection = self.hub._get_dashboard_selection()
         
+        # Sin historial de uso del usuario: ordenados por título
         self.assertEqual(len(selection), 2)
-        self.assertEqual(selection[0][0], 'dashboard-uuid-1')
-        self.assertIn('Sales Dashboard', selection[0][1])
+        self.assertEqual([value for value, _label in selection], ['dashboard-uuid-2', 'dashboard-uuid-1'])
+        self.assertIn('Sales Dashboard', selection[1][1])
+
+        # Reconstruir el selector sale del catálogo cacheado
+        with self.assertSupersetCalls(max_total=0):
+            self.assertEqual(self.hub._get_dashboard_selection(), selection)
 
     @patch('requests.get')  
     def test_get_dashboard_selection_no_dashboards(self, mock_get):
@@ -147,7 +153,7 @@ class TestAnalyticsHub(TransactionCase):
         mock_response.json.return_value = {'result': []}
         mock_get.return_value = mock_response
         
-        with patch.object(self.env['superset.utils'], 'get_access_token', return_value='test_token'):
+        with patch.object(type(self.env['superset.utils']), 'get_access_token', return_value='test_token'):
             selection = self.hub._get_dashboard_selection()
         
         self.assertEqual(len(selection), 1)
@@ -155,14 +161,16 @@ class TestAnalyticsHub(TransactionCase):
 
     def test_onchange_selected_dashboard_valid(self):
         """Test: Cambio a dashboard válido"""
-        self.hub.selected_dashboard = 'test-uuid-123'
+        with patch.object(type(self.hub), '_get_dashboard_selection', return_value=[('test-uuid-123', 'Test')]):
+            self.hub.selected_dashboard = 'test-uuid-123'
         self.hub._onchange_selected_dashboard()
         
         self.assertTrue(self.hub.dashboard_loaded)
 
     def test_onchange_selected_dashboard_invalid(self):
         """Test: Cambio a dashboard inválido"""
-        self.hub.selected_dashboard = 'no_config'
+        with patch.object(type(self.hub), '_get_dashboard_selection', return_value=[('no_config', 'Configurar')]):
+            self.hub.selected_dashboard = 'no_config'
         self.hub._onchange_selected_dashboard()
         
         self.assertFalse(self.hub.dashboard_loaded)
@@ -177,20 +185,25 @@ class TestAnalyticsHub(TransactionCase):
         self.assertIn('Selecciona un dashboard válido', str(context.exception))
 
     def test_action_refresh_dashboards(self):
-        """Test: Refrescar dashboards"""
-        # Establecer algunos valores primero
-        self.hub.selected_dashboard = 'test-uuid'
+        """Test: Refrescar dashboards sin recargar la página ni perder la selección"""
+        utils_class = type(self.env['superset.utils'])
+        with patch.object(type(self.hub), '_get_dashboard_selection', return_value=[('test-uuid', 'Test')]):
+            self.hub.selected_dashboard = 'test-uuid'
         self.hub.dashboard_loaded = True
         
-        result = self.hub.action_refresh_dashboards()
+        with patch.object(utils_class, 'get_dashboard_catalog', return_value=[]) as mock_catalog, \
+                patch.object(utils_class, 'check_health', return_value=True) as mock_health:
+            result = self.hub.action_refresh_dashboards()
         
-        # Verificar que se limpiaron los valores
-        self.assertFalse(self.hub.selected_dashboard)
-        self.assertFalse(self.hub.dashboard_loaded)
+        # El catálogo se reconstruye y el monitor publica los cambios por el bus
+        self.assertTrue(mock_catalog.call_args.kwargs['force_refresh'])
+        mock_health.assert_called_once()
+        self.assertEqual(self.hub.selected_dashboard, 'test-uuid')
+        self.assertTrue(self.hub.dashboard_loaded)
         
         # Verificar tipo de acción retornada
         self.assertEqual(result['type'], 'ir.actions.client')
-        self.assertEqual(result['tag'], 'reload')
+        self.assertEqual(result['tag'], 'display_notification')
 
     def test_action_open_settings(self):
         """Test: Abrir configuración de Superset"""
@@ -221,7 +234,8 @@ class TestAnalyticsHub(TransactionCase):
     @patch('requests.post')
     def test_get_dashboard_data_for_js_success(self, mock_post, mock_get):
         """Test: Obtener datos para JavaScript exitosamente"""
-        self.hub.selected_dashboard = 'test-dashboard-uuid'
+        with patch.object(type(self.hub), '_get_dashboard_selection', return_value=[('test-dashboard-uuid', 'Test')]):
+            self.hub.selected_dashboard = 'test-dashboard-uuid'
         
         # Mock respuesta de dashboards
         mock_dashboards_response = Mock()
@@ -249,9 +263,9 @@ class TestAnalyticsHub(TransactionCase):
         mock_get.side_effect = [mock_dashboards_response, mock_embedding_response]
         mock_post.return_value = mock_token_response
         
-        with patch.object(self.env['superset.utils'], 'get_access_token', return_value='access_token'):
-            with patch.object(self.env['superset.utils'], 'get_superset_config', return_value={'url': 'http://localhost:8088', 'timeout': 30}):
-                result = self.hub.get_dashboard_data_for_js()
+        # Configuración de setUp; el dashboard no publicado resuelve su embedding bajo demanda
+        with patch.object(type(self.env['superset.utils']), 'get_access_token', return_value='access_token'):
+            result = self.hub.get_dashboard_data_for_js()
         
         self.assertIn('embedding_uuid', result)
         self.assertIn('guest_token', result)
@@ -281,7 +295,14 @@ class TestAnalyticsHub(TransactionCase):
 
     def test_force_refresh_configuration(self):
         """Test: Forzar refresco de configuración"""
-        result = self.hub.force_refresh_configuration()
+        probe = ({'state': 'down', 'token_valid': False, 'last_error': 'Sin Superset',
+                  'last_check': fields.Datetime.now()}, None)
+        with patch.object(type(self.env['superset.utils']), '_probe_superset', return_value=probe) as mock_probe:
+            result = self.hub.force_refresh_configuration()
+        
+        # Comprobación completa con el catálogo reconstruido y su resultado guardado
+        self.assertTrue(mock_probe.call_args.kwargs['force_catalog'])
+        self.assertEqual(self.env['superset.health.status']._read_status('http://localhost:8088')['state'], 'down')
         
         self.assertEqual(result['type'], 'ir.actions.client')
         self.assertEqual(result['tag'], 'reload')
@@ -303,4 +324,65 @@ class TestAnalyticsHub(TransactionCase):
         hub = self.AnalyticsHub.get_default_hub()
         
         # Debería retornar el existente
-        self.assertEqual(hub.id, self.hub.id)
\ No newline at end of file
+        self.assertEqual(hub.id, self.hub.id)
+
+    def test_user_state_is_per_user(self):
+        """Test: Cada usuario guarda su propia selección sin escribir la fila del hub"""
+        other_user = self.env['res.users'].create({
+            'name': 'Otro Usuario Superset',
+            'login': 'superset_state_user',
+            'groups_id': [(4, self.env.ref('eticco_superset_integration.group_superset_user').id)],
+        })
+        options = [('uuid-a', '📊 A'), ('uuid-b', '📊 B')]
+        self.env.flush_all()
+        self.env.cr.execute('SELECT write_date FROM superset_analytics_hub WHERE id = %s', (self.hub.id,))
+        write_date = self.env.cr.fetchone()[0]
+
+        with patch.object(type(self.hub), '_get_dashboard_selection', return_value=options):
+            self.hub.write({'selected_dashboard': 'uuid-a', 'dashboard_loaded': True})
+            self.hub.with_user(other_user).write({'selected_dashboard': 'uuid-b'})
+
+            with self.assertRaises(ValueError):
+                self.hub.write({'selected_dashboard': 'uuid-inexistente'})
+
+        self.hub.invalidate_recordset()
+        self.assertEqual(self.hub.selected_dashboard, 'uuid-a')
+        self.assertTrue(self.hub.dashboard_loaded)
+        other_hub = self.hub.with_user(other_user)
+        self.assertEqual(other_hub.selected_dashboard, 'uuid-b')
+        self.assertFalse(other_hub.dashboard_loaded)
+
+        self.env.flush_all()
+        self.env.cr.execute('SELECT write_date FROM superset_analytics_hub WHERE id = %s', (self.hub.id,))
+        self.assertEqual(self.env.cr.fetchone()[0], write_date)
+        self.assertEqual(self.env['superset.hub.user.state'].search_count([('hub_id', '=', self.hub.id)]), 2)
+
+    def test_user_state_skips_unchanged_writes(self):
+        """Test: Reescribir el mismo estado no vuelve a hacer upsert"""
+        State = self.env['superset.hub.user.state']
+        self.hub._write_user_state({'current_dashboard_id': 7, 'dashboard_loaded': True})
+
+        with patch.object(type(State), '_upsert_state') as mock_upsert:
+            self.hub._write_user_state({'current_dashboard_id': 7, 'dashboard_loaded': True})
+            mock_upsert.assert_not_called()
+
+            self.hub._write_user_state({'current_dashboard_id': 8, 'dashboard_loaded': True})
+            mock_upsert.assert_called_once_with(self.hub.id, self.env.uid, {'current_dashboard_id': 8})
+
+    def test_refresh_options_clears_stale_selection(self):
+        """Test: Una selección que ya no está en el catálogo se corrige al pedir las opciones, no en el compute"""
+        with patch.object(type(self.hub), '_get_dashboard_selection', return_value=[('uuid-retirado', 'Viejo')]):
+            self.hub.write({'selected_dashboard': 'uuid-retirado', 'dashboard_loaded': True})
+        self.hub._write_user_state({'current_dashboard_id': 7, 'current_embedding_uuid': 'emb-viejo'})
+
+        options = [('uuid1', 'Dashboard 1'), ('uuid2', 'Dashboard 2')]
+        status = {'has_configuration': True, 'total_dashboards': 2, 'with_embedding': 2}
+        with patch.object(type(self.hub), '_get_dashboard_selection', return_value=options), \
+                patch.object(type(self.env['superset.utils']), 'get_monitored_status', return_value=status):
+            result = self.hub.refresh_dashboard_options()
+
+        self.assertNotIn('preferred_dashboard', result)
+        self.assertFalse(self.hub.selected_dashboard)
+        self.assertFalse(self.hub.dashboard_loaded)
+        self.assertFalse(self.hub.current_dashboard_id)
+        self.assertFalse(self.hub.current_embedding_uuid)
@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark end-to-end de los flujos del hub y de Settings contra el Superset falso
+
+No forma parte de la suite estándar. Ejecutar con::
+
+    ./run_odoo_tests.sh --benchmark
+
+Variables de entorno:
+
+- ``SUPERSET_BENCH_SIZES``: tamaños de catálogo (default ``10,100,1000``)
+- ``SUPERSET_BENCH_LATENCY``: latencia por petición del Superset falso en segundos (default ``0.002``)
+- ``SUPERSET_BENCH_REPORT``: ruta del informe JSON (default ``superset_benchmark_report.json``)
+- ``SUPERSET_BENCH_BASELINE``: informe anterior con el que comparar y avisar de regresiones
+"""
+import json
+import logging
+import os
+import time
+import tracemalloc
+
+from odoo.tests import tagged
+
+from .common import FakeSupersetCase
+
+_logger = logging.getLogger(__name__)
+
+# Una regresión es un flujo un 20% más lento o con más llamadas HTTP que en la baseline
+REGRESSION_THRESHOLD = 1.2
+
+
+@tagged('-standard', 'superset_benchmark')
+class TestBenchmarkFlows(FakeSupersetCase):
+    """Mide tiempo, llamadas HTTP y memoria de los flujos principales"""
+
+    def _measure(self, flow, func):
+        """Ejecutar ``func`` midiendo tiempo de pared, llamadas salientes y pico de memoria"""
+        self.fake.reset_stats()
+        tracemalloc.start()
+        started = time.perf_counter()
+        try:
+            func()
+            error = None
+        except Exception as e:
+            error = str(e)
+        wall_ms = (time.perf_counter() - started) * 1000
+        _current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return {
+            'flow': flow,
+            'wall_ms': round(wall_ms, 2),
+            'http_calls': self.fake.total_calls,
+            'http_calls_by_endpoint': dict(self.fake.calls),
+            'peak_memory_kb': round(peak / 1024, 1),
+            'error': error,
+        }
+
+    def _flows(self):
+        """Flujos a medir: (nombre, callable)"""
+        Hub = self.env['superset.analytics.hub']
+        hub = Hub.get_default_hub()
+        embedded = next(d for d in self.fake.dashboards if d['embedded_uuid'])
+
+        def switch_dashboard():
+            hub.selected_dashboard = embedded['uuid']
+            hub.get_dashboard_data_for_js()
+
+        def open_hub():
+            # Lo que hace el cliente web al abrir el hub, en su orden
+            Hub.fields_get(['selected_dashboard'])
+            hub.read(['selected_dashboard', 'has_configuration', 'available_dashboards_count'])
+            hub.get_hub_status()
+            hub.refresh_dashboard_options()
+            hub.get_dashboard_thumbnails()
+
+        def open_settings():
+            settings = self.env['res.config.settings'].create({})
+            settings.read(['superset_connection_status', 'superset_dashboards_count', 'superset_embedding_count'])
+
+        return [
+            ('get_default_hub', Hub.get_default_hub),
+            ('hub_open', open_hub),
+            ('force_refresh_configuration', hub.force_refresh_configuration),
+            ('refresh_dashboard_options', hub.refresh_dashboard_options),
+            ('_get_dashboard_selection', hub._get_dashboard_selection),
+            ('get_dashboard_data_for_js', switch_dashboard),
+            ('get_system_status', lambda: self.utils.get_system_status(force_refresh=False)),
+            ('res_config_settings_computes', open_settings),
+        ]
+
+    def _run_size(self, size):
+        self.fake.set_dashboards(size)
+        results = []
+        for phase in ('cold', 'warm'):
+            for flow, func in self._flows():
+                if phase == 'cold':
+                    self.utils.clear_all_cache()
+                result = self._measure(flow, func)
+                result.update(phase=phase, dashboards=size)
+                results.append(result)
+                _logger.info('⏱️ [BENCH] %5s dashboards | %-4s | %-30s | %9.1f ms | %5s HTTP | %8.1f KB%s',
+                             size, phase, flow, result['wall_ms'], result['http_calls'],
+                             result['peak_memory_kb'], f" | ERROR {result['error']}" if result['error'] else '')
+        return results
+
+    def _compare_with_baseline(self, results, baseline_path):
+        """Avisar de flujos más lentos o con más llamadas que en la baseline"""
+        with open(baseline_path) as baseline_file:
+            baseline = json.load(baseline_file)
+        previous = {(r['dashboards'], r['phase'], r['flow']): r for r in baseline.get('results', [])}
+        regressions = []
+        for result in results:
+            before = previous.get((result['dashboards'], result['phase'], result['flow']))
+            if not before:
+                continue
+            if (result['http_calls'] > before['http_calls']
+                    or result['wall_ms'] > before['wall_ms'] * REGRESSION_THRESHOLD):
+                regressions.append({
+                    'dashboards': result['dashboards'],
+                    'phase': result['phase'],
+                    'flow': result['flow'],
+                    'wall_ms': [before['wall_ms'], result['wall_ms']],
+                    'http_calls': [before['http_calls'], result['http_calls']],
+                })
+        for regression in regressions:
+            _logger.warning('📉 [BENCH] Regresión %s', regression)
+        return regressions
+
+    def test_benchmark_flows(self):
+        """Benchmark: hub y Settings a 10, 100 y 1000 dashboards"""
+        sizes = [int(s) for s in os.environ.get('SUPERSET_BENCH_SIZES', '10,100,1000').split(',') if s.strip()]
+        latency = float(os.environ.get('SUPERSET_BENCH_LATENCY', '0.002'))
+        report_path = os.environ.get('SUPERSET_BENCH_REPORT', 'superset_benchmark_report.json')
+        baseline_path = os.environ.get('SUPERSET_BENCH_BASELINE')
+
+        self.fake.latency = latency
+        results = []
+        for size in sizes:
+            results.extend(self._run_size(size))
+
+        module = self.env['ir.module.module'].search([('name', '=', 'eticco_superset_integration')], limit=1)
+        report = {
+            'module_version': module.latest_version or module.installed_version,
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'latency_s': latency,
+            'sizes': sizes,
+            'results': results,
+        }
+        if baseline_path and os.path.exists(baseline_path):
+            report['regressions'] = self._compare_with_baseline(results, baseline_path)
+
+        with open(report_path, 'w') as report_file:
+            json.dump(report, report_file, indent=2)
+        _logger.info('📄 [BENCH] Informe guardado en %s', os.path.abspath(report_path))
+
+        self.assertFalse([r for r in results if r['error']], 'Algún flujo falló durante el benchmark')
@@ -1,4 +1,5 @@
 # -*- coding: utf-8 -*-
+from odoo import fields
 from odoo.tests.common import TransactionCase
 from odoo.exceptions import ValidationError, UserError
 from unittest.mock import patch, Mock
@@ -26,6 +27,10 @@ class TestConfigurationFlow(TransactionCase):
             'display_name': 'Test Hub'
         })
 
+        # El catálogo y los tokens viven en una cache global de proceso
+        self.env['superset.utils'].clear_all_cache()
+        self.addCleanup(self.env['superset.utils'].clear_all_cache)
+
     def test_configuration_parameters_stored(self):
         """Test: Verificar que los parámetros se guardan correctamente"""
         # Guardar configuración
@@ -40,34 +45,26 @@ class TestConfigurationFlow(TransactionCase):
 
     def test_configuration_validation_url(self):
         """Test: Validación de URL de configuración"""
-        # URL inválida
-        self.config.superset_url = 'invalid-url'
-        
+        # URL inválida: la restricción salta al escribir
         with self.assertRaises(ValidationError) as context:
-            self.config._check_superset_url()
+            self.config.superset_url = 'invalid-url'
         
         self.assertIn('http://', str(context.exception))
 
     def test_configuration_validation_url_with_spaces(self):
         """Test: Validación de URL con espacios"""
-        self.config.superset_url = 'http://localhost :8088'
-        
         with self.assertRaises(ValidationError):
-            self.config._check_superset_url()
+            self.config.superset_url = 'http://localhost :8088'
 
     def test_configuration_validation_timeout(self):
         """Test: Validación de timeout"""
         # Timeout muy bajo
-        self.config.superset_timeout = 1
-        
         with self.assertRaises(ValidationError):
-            self.config._check_timeout()
+            self.config.superset_timeout = 1
         
         # Timeout muy alto  
-        self.config.superset_timeout = 500
-        
         with self.assertRaises(ValidationError):
-            self.config._check_timeout()
+            self.config.superset_timeout = 500
 
     def test_compute_connection_status_incomplete(self):
         """Test: Estado de conexión incompleta"""
@@ -77,11 +74,14 @@ class TestConfigurationFlow(TransactionCase):
         self.assertIn('incompleta', self.config.superset_connection_status)
 
     def test_compute_connection_status_complete(self):
-        """Test: Estado de conexión completa"""
-        # Ya configurado en setUp
+        """Test: Estado de conexión completa (leído del monitor de salud)"""
+        self.config.execute()
+        self.env['superset.health.status']._store_status('http://localhost:8088', {
+            'state': 'up', 'token_valid': True, 'latency_ms': 12.0, 'last_check': fields.Datetime.now(),
+        })
         self.config._compute_connection_status()
         
-        self.assertIn('Configurado', self.config.superset_connection_status)
+        self.assertIn('Conectado', self.config.superset_connection_status)
 
     @patch('requests.post')
     @patch('requests.get')
@@ -98,7 +98,7 @@ class TestConfigurationFlow(TransactionCase):
         mock_health_response.status_code = 200
         mock_get.return_value = mock_health_response
         
-        with patch.object(self.Utils, 'test_superset_connection') as mock_test:
+        with patch.object(type(self.Utils), 'test_superset_connection') as mock_test:
             mock_test.return_value = {
                 'success': True,
                 'details': {'dashboards_found': 5}
@@ -116,7 +116,7 @@ class TestConfigurationFlow(TransactionCase):
         # Mock error de autenticación
         mock_post.side_effect = Exception('Connection failed')
         
-        with patch.object(self.Utils, 'test_superset_connection') as mock_test:
+        with patch.object(type(self.Utils), 'test_superset_connection') as mock_test:
             mock_test.side_effect = ValidationError('Connection failed')
             
             with self.assertRaises(ValidationError):
@@ -152,7 +152,8 @@ class TestConfigurationFlow(TransactionCase):
         
         mock_get.side_effect = [mock_response, mock_embedding_response, mock_embedding_response]
         
-        with patch.object(self.Utils, 'get_access_token', return_value='test_token'):
+        self.config.execute()
+        with patch.object(type(self.Utils), 'get_access_token', return_value='test_token'):
             result = self.config.open_superset_dashboards()
         
         self.assertEqual(result['type'], 'ir.actions.client')
@@ -161,14 +162,26 @@ class TestConfigurationFlow(TransactionCase):
 
     def test_clear_superset_cache(self):
         """Test: Limpiar cache de Superset"""
-        with patch.object(self.Utils, 'clear_token_cache') as mock_clear:
+        with patch.object(type(self.Utils), 'clear_all_cache') as mock_clear:
             mock_clear.return_value = {'success': True, 'message': 'Cache limpiado'}
             
             result = self.config.clear_superset_cache()
         
+        mock_clear.assert_called_once()
         self.assertEqual(result['type'], 'ir.actions.client')
         self.assertEqual(result['tag'], 'display_notification')
-        self.assertIn('limpiado', result['params']['title'])
+        self.assertIn('limpio', result['params']['title'])
+        self.assertEqual(result['params']['message'], 'Cache limpiado')
+
+    def test_warm_up_superset_cache_triggers_cron(self):
+        """Test: El botón de warm-up adelanta el cron y vuelve sin esperar a Superset"""
+        with patch.object(type(self.env['ir.cron']), '_trigger') as mock_trigger, \
+                patch.object(type(self.Utils), 'warm_up_dashboards') as mock_warm_up:
+            result = self.config.warm_up_superset_cache()
+        
+        mock_trigger.assert_called_once()
+        mock_warm_up.assert_not_called()
+        self.assertEqual(result['tag'], 'display_notification')
 
     def test_create_dashboard_menu_no_parent(self):
         """Test: Crear menú sin padre seleccionado"""
@@ -231,8 +244,8 @@ class TestConfigurationFlow(TransactionCase):
         self.config.execute()
         
         # 2. Simular navegación a Analytics
-        with patch.object(self.Utils, 'get_dashboard_stats_cached') as mock_stats:
-            mock_stats.return_value = {
+        with patch.object(type(self.Utils), 'get_monitored_status') as mock_status:
+            mock_status.return_value = {
                 'has_configuration': True,
                 'total_dashboards': 3,
                 'with_embedding': 2
@@ -247,33 +260,26 @@ class TestConfigurationFlow(TransactionCase):
 
     def test_configuration_change_triggers_hub_refresh(self):
         """Test: Cambio de configuración refresca hub automáticamente"""
-        # Simular hub existente
-        with patch.object(self.AnalyticsHub, 'search') as mock_search:
-            mock_search.return_value = self.hub
+        # Hub existente (self.hub): el guardado lo refresca
+        with patch.object(type(self.hub), 'force_refresh_configuration') as mock_refresh:
+            # Cambiar configuración
+            self.config.write({'superset_url': 'http://new-server:8088'})
             
-            with patch.object(self.hub, 'force_refresh_configuration') as mock_refresh:
-                # Cambiar configuración
-                self.config.write({'superset_url': 'http://new-server:8088'})
-                
-                # Verificar que se llamó al refresh
-                mock_refresh.assert_called_once()
+            # Verificar que se llamó al refresh
+            mock_refresh.assert_called_once()
 
-    @patch.object(None, 'get_dashboard_stats_cached')
-    def test_dashboard_stats_integration(self, mock_stats):
+    def test_dashboard_stats_integration(self):
         """Test: Integración de estadísticas de dashboards"""
-        # Mock de estadísticas
-        mock_stats.return_value = {
+        # Estado leído del monitor de salud
+        status = {
             'has_configuration': True,
             'total_dashboards': 10,
             'with_embedding': 5
         }
         
-        # Configurar Utils para usar el mock
-        with patch.object(self.Utils, 'get_dashboard_stats_cached', return_value=mock_stats.return_value):
+        with patch.object(type(self.Utils), 'get_monitored_status', return_value=status):
             # Computar información de dashboards en settings
             self.config._compute_dashboards_info()
         
-        # En un entorno real, esto debería usar el endpoint interno
-        # Por ahora verificamos que los campos se podrían poblar
-        self.assertIsInstance(self.config.superset_dashboards_count, int)
-        self.assertIsInstance(self.config.superset_embedding_count, int)
\ No newline at end of file
+        self.assertEqual(self.config.superset_dashboards_count, 10)
+        self.assertEqual(self.config.superset_embedding_count, 5)
\ No newline at end of file
@@ -1,4 +1,5 @@
 # -*- coding: utf-8 -*-
+from odoo import fields
 from odoo.tests.common import TransactionCase
 from unittest.mock import patch, Mock
 import json
@@ -23,11 +24,17 @@ class TestSupersetIntegration(TransactionCase):
             'superset_cache_tokens': True,
             'superset_menu_name': 'Analytics Integration Test'
         })
+        # Guardada en los parámetros: el hub y las utilidades la leen de ahí
+        self.config.execute()
         
         self.hub = self.AnalyticsHub.create({
             'display_name': 'Integration Test Hub'
         })
 
+        # El catálogo y los tokens viven en una cache global de proceso
+        self.env['superset.utils'].clear_all_cache()
+        self.addCleanup(self.env['superset.utils'].clear_all_cache)
+
     def test_full_configuration_workflow(self):
         """Test: Flujo completo de configuración"""
         # 1. Guardar configuración
@@ -76,7 +83,7 @@ class TestSupersetIntegration(TransactionCase):
         mock_get.side_effect = [mock_dashboards, mock_embedding]
         
         # Ejecutar flujo
-        with patch.object(self.Utils, 'get_access_token', return_value='integration_test_token'):
+        with patch.object(type(self.Utils), 'get_access_token', return_value='integration_test_token'):
             selection = self.hub._get_dashboard_selection()
         
         # Verificaciones
@@ -90,7 +97,8 @@ class TestSupersetIntegration(TransactionCase):
     def test_complete_dashboard_loading_flow(self, mock_post, mock_get):
         """Test: Flujo completo de carga de dashboard"""
         # Establecer dashboard seleccionado
-        self.hub.selected_dashboard = 'test-dashboard-uuid'
+        with patch.object(type(self.hub), '_get_dashboard_selection', return_value=[('test-dashboard-uuid', 'Test')]):
+            self.hub.selected_dashboard = 'test-dashboard-uuid'
         
         # Mock dashboards API
         mock_dashboards_response = Mock()
@@ -119,14 +127,9 @@ class TestSupersetIntegration(TransactionCase):
         mock_get.side_effect = [mock_dashboards_response, mock_embedding_response]
         mock_post.return_value = mock_guest_token_response
         
-        # Ejecutar flujo completo
-        with patch.object(self.Utils, 'get_access_token', return_value='access_token'):
-            with patch.object(self.Utils, 'get_superset_config', return_value={
-                'url': 'http://localhost:8088',
-                'timeout': 30,
-                'debug_mode': False
-            }):
-                result = self.hub.get_dashboard_data_for_js()
+        # Ejecutar flujo completo (el dashboard no publicado resuelve su embedding bajo demanda)
+        with patch.object(type(self.Utils), 'get_access_token', return_value='access_token'):
+            result = self.hub.get_dashboard_data_for_js()
         
         # Verificaciones
         self.assertNotIn('error', result)
@@ -149,19 +152,17 @@ class TestSupersetIntegration(TransactionCase):
             self.Utils.validate_config(invalid_config)
         
         # Test dashboard no encontrado
-        self.hub.selected_dashboard = 'non-existent-uuid'
-        
-        with patch.object(self.Utils, 'get_superset_config', return_value={
-            'url': 'http://localhost:8088', 'timeout': 30
-        }):
-            with patch('requests.get') as mock_get:
-                mock_response = Mock()
-                mock_response.status_code = 200
-                mock_response.json.return_value = {'result': []}  # Sin dashboards
-                mock_get.return_value = mock_response
-                
-                with patch.object(self.Utils, 'get_access_token', return_value='token'):
-                    result = self.hub.get_dashboard_data_for_js()
+        with patch.object(type(self.hub), '_get_dashboard_selection', return_value=[('non-existent-uuid', 'Test')]):
+            self.hub.selected_dashboard = 'non-existent-uuid'
+        
+        with patch('requests.get') as mock_get:
+            mock_response = Mock()
+            mock_response.status_code = 200
+            mock_response.json.return_value = {'result': []}  # Sin dashboards
+            mock_get.return_value = mock_response
+            
+            with patch.object(type(self.Utils), 'get_access_token', return_value='token'):
+                result = self.hub.get_dashboard_data_for_js()
         
         self.assertIn('error', result)
         self.assertIn('no encontrado', result['error'])
@@ -177,39 +178,24 @@ class TestSupersetIntegration(TransactionCase):
         
         self.assertEqual(cached_token, test_token)
         
-        # Test cache de estadísticas
-        with patch.object(self.Utils, 'is_configured', return_value=True):
-            with patch('requests.get') as mock_get:
-                mock_response = Mock()
-                mock_response.status_code = 200
-                mock_response.json.return_value = {
-                    'result': [
-                        {'id': 1, 'published': True},
-                        {'id': 2, 'published': True}
-                    ]
-                }
-                
-                mock_embedding_response = Mock()
-                mock_embedding_response.status_code = 200
-                mock_embedding_response.json.return_value = {
-                    'result': {'uuid': 'test-uuid'}
-                }
-                
-                mock_get.side_effect = [mock_response, mock_embedding_response, mock_embedding_response]
-                
-                with patch.object(self.Utils, 'get_access_token', return_value='token'):
-                    with patch.object(self.Utils, 'get_superset_config', return_value={
-                        'url': 'http://localhost:8088', 'timeout': 30
-                    }):
-                        # Primera llamada - debería hacer HTTP
-                        stats1 = self.Utils.get_dashboard_stats_cached()
-                        
-                        # Segunda llamada - debería usar cache
-                        stats2 = self.Utils.get_dashboard_stats_cached()
-                
-                # Ambas deberían retornar los mismos datos
-                self.assertEqual(stats1['with_embedding'], stats2['with_embedding'])
-                self.assertTrue(stats1['has_configuration'])
+        # Test estado del monitor: se lee del registro de salud, sin HTTP
+        self.env['superset.health.status']._store_status('http://localhost:8088', {
+            'state': 'up',
+            'token_valid': True,
+            'total_dashboards': 2,
+            'with_embedding': 1,
+            'last_check': fields.Datetime.now(),
+        })
+        with patch('requests.get') as mock_get, patch('requests.post') as mock_post:
+            stats1 = self.Utils.get_monitored_status()
+            stats2 = self.Utils.get_monitored_status()
+
+        mock_get.assert_not_called()
+        mock_post.assert_not_called()
+        self.assertEqual(stats1['with_embedding'], stats2['with_embedding'])
+        self.assertEqual(stats1['with_embedding'], 1)
+        self.assertTrue(stats1['has_configuration'])
+        self.assertEqual(stats1['connection_status'], 'Conectado correctamente')
 
     def test_menu_creation_integration(self):
         """Test: Integración de creación de menús"""
@@ -233,13 +219,13 @@ class TestSupersetIntegration(TransactionCase):
         ])
         
         self.assertTrue(created_menu.exists())
-        self.assertIn('superset.analytics.hub', created_menu.action)
+        self.assertEqual(created_menu.action.res_model, 'superset.analytics.hub')
 
     def test_field_computation_integration(self):
         """Test: Integración de campos computados"""
-        # Mock de estadísticas para campos computados
-        with patch.object(self.Utils, 'get_dashboard_stats_cached') as mock_stats:
-            mock_stats.return_value = {
+        # Estado del monitor de salud para campos computados
+        with patch.object(type(self.Utils), 'get_monitored_status') as mock_status:
+            mock_status.return_value = {
                 'has_configuration': True,
                 'total_dashboards': 8,
                 'with_embedding': 5
@@ -255,7 +241,8 @@ class TestSupersetIntegration(TransactionCase):
     @patch('requests.get')
     def test_dashboard_info_computation_integration(self, mock_get):
         """Test: Integración de cálculo de información de dashboard"""
-        self.hub.selected_dashboard = 'integration-test-uuid'
+        with patch.object(type(self.hub), '_get_dashboard_selection', return_value=[('integration-test-uuid', 'Test')]):
+            self.hub.selected_dashboard = 'integration-test-uuid'
         
         # Mock respuestas
         mock_dashboards_response = Mock()
@@ -279,11 +266,14 @@ class TestSupersetIntegration(TransactionCase):
         mock_get.side_effect = [mock_dashboards_response, mock_embedding_response]
         
         # Ejecutar cálculo de información
-        with patch.object(self.Utils, 'get_access_token', return_value='token'):
-            with patch.object(self.Utils, 'get_superset_config', return_value={
-                'url': 'http://localhost:8088', 'timeout': 30
-            }):
+        State = self.env['superset.hub.user.state']
+        with patch.object(type(self.Utils), 'get_access_token', return_value='token'):
+            # El compute solo lee: no guarda estado del usuario
+            with patch.object(type(State), '_upsert_state') as mock_upsert:
                 self.hub._compute_dashboard_info()
+            mock_upsert.assert_not_called()
+            # La acción corrige el ID y el embedding guardados
+            self.hub._sync_dashboard_state()
         
         # Verificar información calculada
         self.assertEqual(self.hub.current_dashboard_title, 'Integration Dashboard Info Test')
@@ -296,7 +286,8 @@ class TestSupersetIntegration(TransactionCase):
     def test_refresh_integration_flow(self):
         """Test: Flujo integrado de refrescos"""
         # Configurar estado inicial
-        self.hub.selected_dashboard = 'test-uuid'
+        with patch.object(type(self.hub), '_get_dashboard_selection', return_value=[('test-uuid', 'Test')]):
+            self.hub.selected_dashboard = 'test-uuid'
         self.hub.dashboard_loaded = True
         
         # Test refresh de opciones
@@ -313,8 +304,12 @@ class TestSupersetIntegration(TransactionCase):
         self.assertTrue(result['options_refreshed'])
         self.assertEqual(result['available_options'], 2)  # Solo los válidos
         
-        # Test force refresh
-        result2 = self.hub.force_refresh_configuration()
+        # Test force refresh: la comprobación completa (sin Superset real) y la recarga
+        probe = ({'state': 'down', 'token_valid': False, 'last_error': 'Sin Superset',
+                  'last_check': fields.Datetime.now()}, None)
+        with patch.object(type(self.Utils), '_probe_superset', return_value=probe) as mock_probe:
+            result2 = self.hub.force_refresh_configuration()
+        self.assertTrue(mock_probe.call_args.kwargs['force_catalog'])
         self.assertEqual(result2['type'], 'ir.actions.client')
         self.assertEqual(result2['tag'], 'reload')
 
@@ -324,8 +319,8 @@ class TestSupersetIntegration(TransactionCase):
         self.config.execute()
         
         # 2. Usuario va al menú Analytics
-        with patch.object(self.Utils, 'get_dashboard_stats_cached') as mock_stats:
-            mock_stats.return_value = {
+        with patch.object(type(self.Utils), 'get_monitored_status') as mock_status:
+            mock_status.return_value = {
                 'has_configuration': True,
                 'total_dashboards': 3,
                 'with_embedding': 2
@@ -343,7 +338,8 @@ class TestSupersetIntegration(TransactionCase):
             selection = self.hub._get_dashboard_selection()
         
         # 4. Usuario selecciona dashboard
-        self.hub.selected_dashboard = 'uuid1'
+        with patch.object(type(self.hub), '_get_dashboard_selection', return_value=selection):
+            self.hub.selected_dashboard = 'uuid1'
         self.hub._onchange_selected_dashboard()
         
         # 5. Sistema carga dashboard automáticamente
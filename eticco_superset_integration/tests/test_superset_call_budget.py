@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*-
+import math
+import time
+from unittest.mock import patch
+
+from ..models.superset_utils import _SUPERSET_CACHE
+from ..models.superset_dashboard_usage import USAGE_JOURNAL
+from ..models.superset_analytics_hub import SELECTION_PAYLOAD_LIMIT
+from .common import FakeSupersetCase
+
+
+class TestSupersetCallBudget(FakeSupersetCase):
+    """Presupuestos de llamadas HTTP de los flujos principales (evitan volver al N+1)"""
+
+    fake_dashboards = 30
+
+    def _open_hub(self):
+        """Lo que hace el cliente web al abrir el hub: carga de la vista y RPC del widget en su orden"""
+        Hub = self.env['superset.analytics.hub']
+        hub = Hub.get_default_hub()
+        Hub.fields_get(['selected_dashboard'])
+        hub.read(['selected_dashboard', 'has_configuration', 'available_dashboards_count',
+                  'current_dashboard_title', 'current_dashboard_info'])
+        # Primera RPC del widget al montarse (loadMonitoredStatus)
+        hub.get_hub_status()
+        hub.refresh_dashboard_options()
+        hub.read(['selected_dashboard', 'has_configuration', 'available_dashboards_count',
+                  'current_dashboard_title', 'current_dashboard_info'])
+        hub.get_dashboard_thumbnails()
+        return hub
+
+    def _expire_catalog(self):
+        for key, entry in _SUPERSET_CACHE.items():
+            if key.startswith('dashboard_catalog_'):
+                entry['expires'] = entry['stale_until'] = 0
+
+    def test_warm_hub_open_makes_no_calls(self):
+        """Presupuesto: abrir el hub con caches calientes no llama a Superset"""
+        self._open_hub()
+
+        with self.assertSupersetCalls(max_total=0):
+            self._open_hub()
+
+    def test_explicit_refresh_rebuilds_catalog(self):
+        """Presupuesto: la comprobación forzada solo la hace la acción explícita, nunca la apertura"""
+        hub = self._open_hub()
+        pages = math.ceil(self.fake_dashboards / 100)
+
+        with self.assertSupersetCalls(max_total=0):
+            self._open_hub()
+        # Botón 🔄 Actualizar / guardar Ajustes: listado, /embedded por dashboard y /health
+        with self.countSupersetCalls() as forced:
+            hub.force_refresh_configuration()
+        self.assertEqual(forced.calls['dashboard_list'], pages)
+        self.assertEqual(forced.calls['health'], 1)
+
+    def test_dashboard_switch_single_call(self):
+        """Presupuesto: cambiar de dashboard solo pide el guest token"""
+        hub = self._open_hub()
+        first, second = [d for d in self.fake.dashboards if d['embedded_uuid']][:2]
+        hub.selected_dashboard = first['uuid']
+        hub.get_dashboard_data_for_js()
+
+        with self.assertSupersetCalls(max_total=1, guest_token=1):
+            hub.selected_dashboard = second['uuid']
+            result = hub.get_dashboard_data_for_js()
+
+        self.assertTrue(result.get('success'), result)
+        self.assertEqual(result['embedding_uuid'], second['embedded_uuid'])
+
+    def test_selector_build_constant_calls(self):
+        """Presupuesto: el selector no hace una llamada por dashboard"""
+        hub = self.env['superset.analytics.hub'].create({})
+        for size in (10, 250):
+            self.fake.set_dashboards(size)
+            self.utils.clear_all_cache()
+            pages = math.ceil(size / 100)
+
+            # Primera construcción: listado + un /embedded por dashboard publicado (una sola vez)
+            with self.countSupersetCalls() as cold:
+                hub._get_dashboard_selection()
+            self.assertLessEqual(cold.calls['embedded'], size)
+
+            with self.assertSupersetCalls(max_total=0):
+                hub._get_dashboard_selection()
+
+            # Catálogo caducado: solo el listado, sin volver a pedir /embedded
+            self._expire_catalog()
+            with self.assertSupersetCalls(max_total=pages, dashboard_list=pages, embedded=0):
+                selection = hub._get_dashboard_selection()
+            self.assertEqual(len(selection), len([d for d in self.fake.dashboards
+                                                  if d['published'] and d['embedded_uuid']]))
+
+    def test_stale_catalog_served_while_refreshing(self):
+        """Presupuesto: un catálogo caducado se sirve sin esperar y se refresca en segundo plano"""
+        hub = self.env['superset.analytics.hub'].create({})
+        expected = hub._get_dashboard_selection()
+        config = self.utils.get_superset_config()
+        catalog_key, _embedded_key = self.utils._catalog_cache_keys(config)
+        _SUPERSET_CACHE[catalog_key]['expires'] = 0
+        self.fake.set_dashboards(self.fake_dashboards + 1)
+
+        with patch.object(type(self.utils), '_schedule_catalog_refresh') as mock_schedule:
+            with self.assertSupersetCalls(max_total=0):
+                self.assertEqual(hub._get_dashboard_selection(), expected)
+            mock_schedule.assert_called()
+
+        with self.countSupersetCalls() as background:
+            self.utils._schedule_catalog_refresh(config).join(30)
+        self.assertEqual(background.calls['dashboard_list'], 1)
+        self.assertGreater(_SUPERSET_CACHE[catalog_key]['expires'], time.time())
+        self.assertEqual(len(self.utils.get_dashboard_catalog(config)), self.fake_dashboards + 1)
+
+    def test_warm_settings_open_makes_no_calls(self):
+        """Presupuesto: los campos de estado de Settings salen de la cache"""
+        fields = ['superset_connection_status', 'superset_dashboards_count', 'superset_embedding_count']
+        self.env['res.config.settings'].create({}).read(fields)
+
+        with self.assertSupersetCalls(max_total=0):
+            self.env['res.config.settings'].create({}).read(fields)
+
+    def test_cold_status_reads_make_no_calls(self):
+        """Presupuesto: los badges de estado solo leen el monitor de salud, incluso con caches vacías"""
+        fields = ['superset_connection_status', 'superset_dashboards_count', 'superset_embedding_count']
+        with self.assertSupersetCalls(max_total=0):
+            settings = self.env['res.config.settings'].create({}).read(fields)[0]
+            self.env['superset.analytics.hub'].get_default_hub().read(['has_configuration', 'available_dashboards_count'])
+        self.assertEqual(settings['superset_connection_status'], 'Comprobando conexión...')
+
+        self.utils.check_health()
+        self.utils.clear_all_cache()
+        with self.assertSupersetCalls(max_total=0):
+            settings = self.env['res.config.settings'].create({}).read(fields)[0]
+        self.assertEqual(settings['superset_connection_status'], 'Conectado correctamente')
+        self.assertEqual(settings['superset_dashboards_count'], self.fake_dashboards)
+
+    def test_hub_mount_status_makes_no_calls(self):
+        """Presupuesto: el estado al montar el widget sale del monitor, sin comprobación forzada"""
+        hub = self.env['superset.analytics.hub'].get_default_hub()
+        with self.assertSupersetCalls(max_total=0):
+            status = hub.get_hub_status()
+        self.assertEqual(status['connection_status'], 'Comprobando conexión...')
+
+        self.utils.check_health()
+        self.utils.clear_all_cache()
+        with self.assertSupersetCalls(max_total=0):
+            status = hub.get_hub_status()
+        self.assertEqual((status['connection_status'], status['total_dashboards']),
+                         ('Conectado correctamente', self.fake_dashboards))
+
+    def test_usage_ranks_and_prefetches_preferred_dashboard(self):
+        """Presupuesto: el dashboard más usado se ordena primero y se abre con su guest token ya generado"""
+        USAGE_JOURNAL.drain()
+        self.addCleanup(USAGE_JOURNAL.drain)
+        hub = self._open_hub()
+        first, second, third = [d for d in self.fake.dashboards if d['embedded_uuid']][:3]
+        for uuid, opens in ((third['uuid'], 3), (second['uuid'], 1)):
+            for _index in range(opens):
+                hub.record_dashboard_open(uuid, 1200)
+
+        # Las aperturas aún en el buffer ya cuentan; tras volcarlas se agregan en una fila
+        self.assertEqual([key for key, _label in hub._get_dashboard_selection()[:3]],
+                         [third['uuid'], second['uuid'], first['uuid']])
+        self.assertEqual(self.env['superset.dashboard.usage']._flush_usage(), 2)
+        usage = self.env['superset.dashboard.usage'].search([('dashboard_uuid', '=', third['uuid'])])
+        self.assertEqual((usage.user_id, usage.open_count, usage.avg_load_ms), (self.env.user, 3, 1200))
+        self.assertEqual(hub._get_dashboard_selection()[0][0], third['uuid'])
+
+        hub.invalidate_recordset()
+        with self.assertSupersetCalls(max_total=1, guest_token=1):
+            result = hub.refresh_dashboard_options()
+        self.assertEqual(result['preferred_dashboard'], third['uuid'])
+        self.assertEqual(result['dashboard_data']['embedding_uuid'], third['embedded_uuid'])
+        self.assertEqual(hub.selected_dashboard, third['uuid'])
+
+    def test_picker_search_is_paginated(self):
+        """Presupuesto: el selector recibe páginas acotadas y buscar no llama a Superset"""
+        self.fake.set_dashboards(120)
+        hub = self._open_hub()
+        self.assertLessEqual(len(hub.fields_get(['selected_dashboard'])['selected_dashboard']['selection']),
+                             SELECTION_PAYLOAD_LIMIT)
+        self.assertEqual(len(hub._get_dashboard_selection()), 120)
+
+        with self.assertSupersetCalls(max_total=0):
+            first_page = hub.search_dashboards('', 0, 50)
+            second_page = hub.search_dashboards('', 50, 50)
+            by_title = hub.search_dashboards('dashbord 0042')
+            by_tag = hub.search_dashboards('area3', 0, 200)
+            by_owner = hub.search_dashboards('admin', 0, 10)
+
+        self.assertEqual((first_page['total'], len(first_page['records']), len(second_page['records'])), (120, 50, 50))
+        self.assertFalse({r['id'] for r in first_page['records']} & {r['id'] for r in second_page['records']})
+        self.assertEqual(by_title['records'][0]['title'], 'Dashboard 0042')
+        # Las coincidencias exactas de etiqueta van antes que las parecidas (area1, area2...)
+        self.assertTrue(all(r['tags'] == ['area3'] for r in by_tag['records'][:24]))
+        self.assertNotIn(['area3'], [r['tags'] for r in by_tag['records'][24:]])
+        self.assertEqual((by_owner['total'], len(by_owner['records'])), (120, 10))
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+from datetime import datetime, timedelta
+
+from odoo.exceptions import UserError
+
+from ..models.superset_call_log import CALL_JOURNAL
+from .common import FakeSupersetCase
+
+
+class TestSupersetCallLog(FakeSupersetCase):
+    """Tests del diario de llamadas lentas y su agregación horaria"""
+
+    def setUp(self):
+        super().setUp()
+        CALL_JOURNAL.drain()
+        self.addCleanup(CALL_JOURNAL.drain)
+        self.CallLog = self.env['superset.call.log']
+
+    def test_slow_calls_and_failures_buffered(self):
+        """Test: Solo se anotan llamadas sobre el umbral y fallos, sin escribir hasta el volcado"""
+        ICPSudo = self.env['ir.config_parameter'].sudo()
+        ICPSudo.set_param('superset.slow_call_threshold_ms', '50')
+        self.fake.latency = {'login': 0.08}
+        self.fake.error_endpoints = {'dashboard_list'}
+        config = self.utils.get_superset_config()
+        access_token = self.utils.get_access_token(config)
+
+        with self.assertRaises(UserError):
+            self.utils._fetch_dashboards(config, access_token)
+
+        self.assertEqual(len(CALL_JOURNAL), 2)
+        self.assertFalse(self.CallLog.search_count([]))
+
+        self.assertEqual(self.CallLog._flush_journal(), 2)
+        slow = self.CallLog.search([('endpoint', '=', '/api/v1/security/login')])
+        failed = self.CallLog.search([('endpoint', '=', '/api/v1/dashboard/')])
+        self.assertFalse(slow.is_error)
+        self.assertGreaterEqual(slow.duration_ms, 50)
+        self.assertTrue(failed.is_error)
+        self.assertEqual(failed.status, '500')
+
+    def test_hub_action_records_user_and_stage(self):
+        """Test: Las llamadas desde el hub guardan usuario, etapa e ID de traza"""
+        self.env['ir.config_parameter'].sudo().set_param('superset.slow_call_threshold_ms', '0')
+        hub = self.env['superset.analytics.hub'].create({})
+        hub.selected_dashboard = self.fake.dashboards[0]['uuid']
+        self.utils.clear_all_cache()
+
+        hub.with_context(superset_trace_id='b' * 32).get_dashboard_data_for_js()
+        self.CallLog._flush_journal()
+
+        login = self.CallLog.search([('endpoint', '=', '/api/v1/security/login')], limit=1)
+        self.assertEqual(login.stage, 'superset.login')
+        self.assertEqual(login.user_id, self.env.user)
+        self.assertEqual(login.trace_id, 'b' * 32)
+
+    def test_aggregate_and_prune(self):
+        """Test: Las filas antiguas se agregan en percentiles horarios y se eliminan"""
+        old_hour = (datetime.utcnow() - timedelta(days=10)).replace(minute=0, second=0, microsecond=0)
+        self.CallLog.create([{
+            'called_at': old_hour + timedelta(minutes=i),
+            'endpoint': '/api/v1/dashboard/',
+            'stage': 'hub.refresh_dashboard_options',
+            'status': '200' if i else '500',
+            'is_error': not i,
+            'duration_ms': 1000 + i * 100,
+        } for i in range(10)])
+        recent = self.CallLog.create({
+            'called_at': datetime.utcnow(),
+            'endpoint': '/api/v1/dashboard/',
+            'status': '200',
+            'duration_ms': 1500,
+        })
+
+        result = self.CallLog._cron_aggregate_call_log()
+
+        self.assertEqual(result, {'aggregated': 1, 'pruned': 10})
+        self.assertEqual(self.CallLog.search([]), recent)
+        stat = self.env['superset.call.stat'].search([('hour', '=', old_hour)])
+        self.assertEqual(stat.call_count, 10)
+        self.assertEqual(stat.error_count, 1)
+        self.assertEqual(stat.max_ms, 1900)
+        self.assertAlmostEqual(stat.p50_ms, 1450)
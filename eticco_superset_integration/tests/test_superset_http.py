@@ -0,0 +1,660 @@
+# -*- coding: utf-8 -*-
+import marshal
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+from odoo.exceptions import UserError
+
+from ..models.superset_adaptive_timeout import ADAPTIVE_TIMEOUTS, ADAPTIVE_MIN_SAMPLES, ADAPTIVE_TIMEOUT_FLOOR
+from ..models.superset_bus import BUS_CATALOG_DIFF, BUS_STATUS, bus_channel
+from ..models.superset_circuit_breaker import SupersetCircuitOpenError, get_circuit_breaker
+from ..models.superset_deadline import SupersetDeadlineExceeded, deadline, request_timeout
+from ..models.superset_metrics import METRICS
+from ..models.superset_node_pool import NODE_POOL
+from ..models.superset_rate_limit import (
+    OUTBOUND_LIMITER, PRIORITY_BACKGROUND, PRIORITY_INTERACTIVE, SharedTokenBucket, SupersetThrottledError,
+)
+from ..models.superset_tracing import start_trace, trace_span, _export_otel
+from ..models.superset_utils import (
+    _CATALOG_REFRESHES, _IN_FLIGHT, _SUPERSET_CACHE, EP_DASHBOARD_LIST, EP_HEALTH, EP_WARM_UP, _coalesced,
+    superset_request,
+)
+from ..models.superset_retry import RETRY_BUDGET
+from .common import FakeSupersetCase
+
+try:
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+    from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+except ImportError:
+    TracerProvider = None
+
+
+class TestSupersetHttp(FakeSupersetCase):
+    """Tests HTTP reales contra el Superset falso en proceso"""
+
+    fake_dashboards = 250
+
+    def test_fetch_dashboards_paginates(self):
+        """Test: El listado recorre todas las páginas de la API"""
+        config = self.utils.get_superset_config()
+        access_token = self.utils.get_access_token(config)
+
+        dashboards = self.utils._fetch_dashboards(config, access_token, columns=['id', 'uuid'])
+
+        self.assertEqual(len(dashboards), 250)
+        self.assertEqual(set(dashboards[0]), {'id', 'uuid'})
+        self.assertEqual(self.fake.calls['dashboard_list'], 3)
+
+    def test_login_error_injection(self):
+        """Test: Un 500 en login se convierte en UserError"""
+        self.fake.error_endpoints = {'login'}
+
+        with self.assertRaises(UserError):
+            self.utils.get_access_token(force_refresh=True)
+
+    def test_thumbnails_async_generation(self):
+        """Test: Miniatura en generación (202) se descarga en la siguiente pasada"""
+        self.fake.set_dashboards(2)
+        self.fake.thumbnail_async = True
+        self.addCleanup(setattr, self.fake, 'thumbnail_async', False)
+        self.fake.thumbnails_requested.clear()
+
+        first = self.utils.refresh_dashboard_thumbnails()
+        second = self.utils.refresh_dashboard_thumbnails()
+
+        self.assertEqual(first['updated'], 0)
+        self.assertEqual(second['updated'], 2)
+        self.assertEqual(len(self.utils.get_thumbnail_urls()), 2)
+
+    def test_warm_up_respects_concurrency(self):
+        """Test: El warm-up no supera la concurrencia configurada"""
+        self.fake.set_dashboards(4)
+        self.fake.latency = {'warm_up': 0.05}
+        self.env['ir.config_parameter'].sudo().set_param('superset.warmup_concurrency', '2')
+
+        result = self.utils.warm_up_dashboards(trigger='cron')
+
+        self.assertEqual(result['charts'], 4 * self.fake.charts_per_dashboard)
+        self.assertEqual(self.fake.calls['warm_up'], 12)
+        self.assertLessEqual(self.fake.max_concurrency, 2)
+
+    def test_select_warm_up_is_queued(self):
+        """Test: Calentar al seleccionar se encola en un hilo con cursor propio y vuelve sin esperar"""
+        self.fake.set_dashboards(2)
+        hub = self.env['superset.analytics.hub'].create({})
+        dashboard = self.fake.dashboards[0]
+
+        with patch.object(threading.current_thread(), 'testing', False), \
+                patch('odoo.addons.eticco_superset_integration.models.superset_utils._background_thread') as mock_thread, \
+                self.assertSupersetCalls(max_total=0):
+            result = hub.warm_up_dashboard(dashboard['uuid'])
+        self.assertEqual(result, {'queued': 1})
+        args = mock_thread.call_args[0]
+        self.assertEqual(args[:3], (self.env.cr.dbname, self.env.uid, self.env.company.id))
+        mock_thread.return_value.start.assert_called_once()
+
+        # En tests se ejecuta en línea y registra los tiempos por chart
+        hub.warm_up_dashboard(dashboard['uuid'])
+        self.assertEqual(self.fake.calls['warm_up'], self.fake.charts_per_dashboard)
+        self.assertEqual(self.env['superset.chart.warmup'].search_count(
+            [('dashboard_id', '=', dashboard['id'])]), self.fake.charts_per_dashboard)
+
+    def test_hub_io_runs_outside_transaction(self):
+        """Test: Con la cache fría, datos de dashboard y selector no esperan a Superset en la petición"""
+        self.fake.set_dashboards(3)
+        self.utils.check_health()
+        hub = self.env['superset.analytics.hub'].create({})
+        dashboard = self.fake.dashboards[0]
+        _SUPERSET_CACHE.clear()
+
+        with patch.object(threading.current_thread(), 'testing', False), \
+                patch.dict(_CATALOG_REFRESHES, clear=True), \
+                patch('odoo.addons.eticco_superset_integration.models.superset_utils._detached_thread') as mock_thread, \
+                self.assertSupersetCalls(max_total=0):
+            result = hub._get_dashboard_data(dashboard['uuid'])
+            self.assertTrue(result['pending'])
+            self.assertEqual(result['dashboard_uuid'], dashboard['uuid'])
+            self.assertEqual(mock_thread.call_args[0][:3], (self.env.cr.dbname, self.env.uid, self.env.company.id))
+
+            # Selector con el catálogo frío: el último snapshot del monitor y refresco en segundo plano
+            selection = hub._get_dashboard_selection()
+            snapshot = self.env['superset.health.status']._read_snapshot(self.utils.get_superset_config()['url'])
+            self.assertEqual({value for value, _label in selection}, set(snapshot))
+        self.assertEqual(mock_thread.return_value.start.call_count, 2)
+
+    def test_dashboard_data_for_js_end_to_end(self):
+        """Test: Datos de embedding completos contra el servidor falso"""
+        self.fake.set_dashboards(3)
+        hub = self.env['superset.analytics.hub'].create({})
+        dashboard = self.fake.dashboards[1]
+        hub.selected_dashboard = dashboard['uuid']
+
+        result = hub.get_dashboard_data_for_js()
+
+        self.assertTrue(result.get('success'), result)
+        self.assertEqual(result['embedding_uuid'], dashboard['embedded_uuid'])
+        self.assertEqual(result['superset_domain'], self.fake.url)
+        self.assertTrue(result['guest_token'].startswith('guest-'))
+
+    def test_metrics_record_outbound_calls(self):
+        """Test: Cada llamada queda registrada por plantilla de endpoint y estado"""
+        METRICS.reset()
+        config = self.utils.get_superset_config()
+        access_token = self.utils.get_access_token(config)
+        self.utils.get_access_token(config)  # Acierto de cache
+        self.utils._fetch_dashboards(config, access_token)
+
+        summary = METRICS.summary()
+        self.assertEqual(summary['endpoints']['/api/v1/security/login']['calls'], 1)
+        self.assertEqual(summary['endpoints']['/api/v1/dashboard/']['calls'], 3)
+        self.assertEqual(summary['caches']['access_token'], {'hit': 1, 'miss': 1})
+
+        exported = METRICS.render_prometheus()
+        self.assertIn('superset_http_requests_total{endpoint="/api/v1/dashboard/",method="GET",status="200"} 3', exported)
+        self.assertIn('superset_http_request_duration_seconds_count{endpoint="/api/v1/security/login"} 1', exported)
+
+    def test_trace_id_propagated_to_superset(self):
+        """Test: El superset_trace_id del widget llega a Superset en X-Request-ID"""
+        self.fake.set_dashboards(2)
+        hub = self.env['superset.analytics.hub'].create({})
+        hub.selected_dashboard = self.fake.dashboards[0]['uuid']
+        self.utils.clear_all_cache()
+        self.fake.reset_stats()
+        trace_id = 'a' * 32
+
+        hub.with_context(superset_trace_id=trace_id).get_dashboard_data_for_js()
+
+        self.assertTrue(self.fake.request_log)
+        for entry in self.fake.request_log:
+            self.assertEqual(entry['headers'].get('X-Request-ID'), trace_id)
+            self.assertTrue(entry['headers'].get('traceparent', '').startswith(f'00-{trace_id}-'))
+
+    def test_profiling_sampled_in_debug_mode(self):
+        """Test: Con modo debug y muestreo 1 cada punto de entrada deja un perfil descargable"""
+        Attachment = self.env['ir.attachment']
+        domain = [('res_model', '=', 'superset.utils'), ('name', '=like', 'superset_profile_%')]
+        ICPSudo = self.env['ir.config_parameter'].sudo()
+        ICPSudo.set_param('superset.profile_sample_rate', '1')
+
+        ICPSudo.set_param('superset.debug_mode', 'False')
+        self.utils.get_system_status(force_refresh=True)
+        self.assertFalse(Attachment.search_count(domain))
+
+        ICPSudo.set_param('superset.debug_mode', 'True')
+        self.utils.clear_all_cache()
+        self.utils.get_system_status(force_refresh=True)
+
+        profile = Attachment.search(domain)
+        self.assertEqual(len(profile), 1)
+        self.assertIn('utils.get_system_status', profile.name)
+        self.assertIn('cumulative', profile.description)
+        self.assertTrue(marshal.loads(profile.raw))
+
+    def test_circuit_breaker_opens_and_recovers(self):
+        """Test: El circuito se abre tras fallos seguidos, falla sin llamar y se cierra con /health"""
+        ICPSudo = self.env['ir.config_parameter'].sudo()
+        ICPSudo.set_param('superset.circuit_failure_threshold', '2')
+        ICPSudo.set_param('superset.circuit_reset_timeout', '60')
+        # Sin reintentos: cada llamada es un único fallo del circuito
+        ICPSudo.set_param('superset.retry_attempts', '1')
+        config = self.utils.get_superset_config()
+        access_token = self.utils.get_access_token(config)
+        self.fake.error_status = 503
+        self.fake.error_endpoints = {'dashboard_list', 'health'}
+
+        for _attempt in range(2):
+            with self.assertRaises(UserError):
+                self.utils._fetch_dashboards(config, access_token)
+        self.assertEqual(self.utils.get_circuit_state(config), 'open')
+
+        # Abierto: fallo inmediato sin llegar a Superset y payload de conexión en el hub
+        self.fake.reset_stats()
+        with self.assertRaises(SupersetCircuitOpenError):
+            self.utils._fetch_dashboards(config, access_token)
+        hub = self.env['superset.analytics.hub'].create({})
+        hub._write_user_state({'selected_dashboard': self.fake.dashboards[0]['uuid']})
+        self.assertEqual(hub.get_dashboard_data_for_js()['error_type'], 'connection_error')
+        self.assertEqual(self.fake.total_calls, 0)
+
+        # Semiapertura con /health caído: una sola sonda y el circuito sigue abierto
+        breaker = get_circuit_breaker(config['url'])
+        breaker._update(lambda state: state.update(opened_at=0.0))
+        with self.assertRaises(SupersetCircuitOpenError):
+            self.utils._fetch_dashboards(config, access_token)
+        self.assertEqual(dict(self.fake.calls), {'health': 1})
+        self.assertEqual(self.utils.get_circuit_state(config), 'open')
+
+        # Superset recuperado: la sonda cierra el circuito y la petición sigue su curso
+        self.fake.error_endpoints = set()
+        breaker._update(lambda state: state.update(opened_at=0.0))
+        self.assertEqual(len(self.utils._fetch_dashboards(config, access_token)), 250)
+        self.assertEqual(self.utils.get_circuit_state(config), 'closed')
+
+    def test_transient_errors_are_retried(self):
+        """Test: 502/503/504 se reintentan en GET y login; 500 no, ni sin presupuesto de reintentos"""
+        config = self.utils.get_superset_config()
+        access_token = self.utils.get_access_token(config)
+        expected = len(self.utils._fetch_dashboards(config, access_token))
+        pages = self.fake.calls['dashboard_list']
+
+        self.fake.reset_stats()
+        self.fake.error_status = 503
+        self.fake.error_counts.update({'login': 1, 'dashboard_list': 1})
+        self.assertTrue(self.utils.get_access_token(config, force_refresh=True))
+        self.assertEqual(len(self.utils._fetch_dashboards(config, access_token)), expected)
+        self.assertEqual(self.fake.calls['login'], 2)
+        self.assertEqual(self.fake.calls['dashboard_list'], pages + 1)
+        self.assertIn('superset_http_retries_total{endpoint="/api/v1/security/login",kind="retry"} 1',
+                      METRICS.render_prometheus())
+
+        # Error de aplicación: no es transitorio
+        self.fake.reset_stats()
+        self.fake.error_status = 500
+        self.fake.error_counts['dashboard_list'] = 1
+        with self.assertRaises(UserError):
+            self.utils._fetch_dashboards(config, access_token)
+        self.assertEqual(self.fake.calls['dashboard_list'], 1)
+
+        # Presupuesto agotado: la caída no multiplica la carga sobre Superset
+        self.fake.reset_stats()
+        self.fake.error_status = 503
+        self.fake.error_counts['dashboard_list'] = 1
+        RETRY_BUDGET.tokens = 0
+        with self.assertRaises(UserError):
+            self.utils._fetch_dashboards(config, access_token)
+        self.assertEqual(self.fake.calls['dashboard_list'], 1)
+
+    def test_interactive_deadline_bounds_embed_sequence(self):
+        """Test: El presupuesto del hub se reparte entre pasos y corta antes del guest token"""
+        self.env['ir.config_parameter'].sudo().set_param('superset.budget_interactive', '1')
+        self.fake.latency = {'login': 0.4, 'dashboard_list': 0.7}
+        hub = self.env['superset.analytics.hub'].create({})
+        hub._write_user_state({'selected_dashboard': self.fake.dashboards[0]['uuid']})
+
+        started = time.monotonic()
+        result = hub.get_dashboard_data_for_js()
+
+        self.assertLess(time.monotonic() - started, 3)
+        self.assertEqual(result.get('error_type'), 'timeout_error', result)
+        self.assertEqual(self.fake.calls['guest_token'], 0)
+
+    def test_request_timeout_uses_remaining_budget(self):
+        """Test: Cada petición recibe como timeout lo que queda del deadline"""
+        config = dict(self.utils.get_superset_config(), timeout=30, connect_timeout=5)
+        self.assertEqual(request_timeout(config), (5, 30))
+
+        with deadline(2, 'interactive'):
+            self.assertLessEqual(max(request_timeout(config)), 2)
+            with deadline(60, 'cron'):
+                # Un deadline anidado más amplio no amplía el de la operación
+                self.assertLessEqual(max(request_timeout(config)), 2)
+
+        with deadline(0, 'interactive'):
+            with self.assertRaises(SupersetDeadlineExceeded):
+                self.utils._fetch_dashboards(config, 'token')
+            with self.assertRaises(UserError):
+                self.utils.get_access_token(config, force_refresh=True)
+        self.assertEqual(self.fake.calls['login'] + self.fake.calls['dashboard_list'], 0)
+
+    def test_adaptive_timeouts_learn_per_endpoint(self):
+        """Test: Cada endpoint aprende su timeout, acotado por el configurado y con backoff tras un timeout"""
+        config = dict(self.utils.get_superset_config(), timeout=30, adaptive_timeouts=True)
+        url = config['url']
+        for _call in range(ADAPTIVE_MIN_SAMPLES):
+            ADAPTIVE_TIMEOUTS.observe(url, EP_HEALTH, 0.01)
+        ADAPTIVE_TIMEOUTS.observe(url, EP_DASHBOARD_LIST, 2.0)
+
+        learned = ADAPTIVE_TIMEOUTS.timeout_for(url, EP_HEALTH, 30)
+        self.assertGreaterEqual(learned, ADAPTIVE_TIMEOUT_FLOOR)
+        self.assertLess(learned, 1)
+        # Sin muestras suficientes se usa el timeout configurado
+        self.assertEqual(ADAPTIVE_TIMEOUTS.timeout_for(url, EP_DASHBOARD_LIST, 30), 30)
+        self.assertEqual(request_timeout(config, EP_DASHBOARD_LIST)[1], 30)
+        self.assertAlmostEqual(request_timeout(config, EP_HEALTH)[1], learned)
+        self.assertEqual(request_timeout(dict(config, adaptive_timeouts=False), EP_HEALTH)[1], 30)
+        # Otra conexión (otra URL) no hereda lo aprendido
+        self.assertEqual(request_timeout(dict(config, url='https://bi2.example.com'), EP_HEALTH)[1], 30)
+
+        ADAPTIVE_TIMEOUTS.record_timeout(url, EP_HEALTH)
+        self.assertAlmostEqual(ADAPTIVE_TIMEOUTS.timeout_for(url, EP_HEALTH, 30), learned * 2)
+        ADAPTIVE_TIMEOUTS.observe(url, EP_HEALTH, 0.01)
+        self.assertLess(ADAPTIVE_TIMEOUTS.timeout_for(url, EP_HEALTH, 30), learned * 2)
+
+        # Las respuestas reales alimentan la estimación
+        ADAPTIVE_TIMEOUTS.reset()
+        self.utils._fetch_dashboards(config, self.utils.get_access_token(config))
+        self.assertIn((url, EP_DASHBOARD_LIST), ADAPTIVE_TIMEOUTS.summary(30))
+
+    def test_adaptive_timeouts_skip_data_endpoints(self):
+        """Test: El warm-up conserva el timeout configurado aunque haya latencias rápidas aprendidas"""
+        self.fake.set_dashboards(1)
+        self.fake.latency = {'warm_up': 0.4}
+        url = self.fake.url
+        for _call in range(ADAPTIVE_MIN_SAMPLES):
+            ADAPTIVE_TIMEOUTS.observe(url, EP_WARM_UP, 0.01)
+        self.assertLess(ADAPTIVE_TIMEOUTS.timeout_for(url, EP_WARM_UP, 30), 0.4)
+
+        result = self.utils.warm_up_dashboards(trigger='cron')
+
+        self.assertEqual(result['errors'], 0)
+        statuses = self.env['superset.chart.warmup'].search([]).mapped('last_status')
+        self.assertEqual(set(statuses), {'ok'})
+        self.assertEqual(ADAPTIVE_TIMEOUTS.summary(30)[(url, EP_WARM_UP)]['samples'], ADAPTIVE_MIN_SAMPLES)
+
+    def test_outbound_limiter_prioritises_interactive(self):
+        """Test: Con el hueco ocupado, una petición interactiva pasa antes que una de fondo"""
+        config = {'url': self.fake.url, 'timeout': 5, 'rate_limit': 0, 'max_concurrency': 1}
+        OUTBOUND_LIMITER.acquire(config, PRIORITY_INTERACTIVE)
+        order = []
+
+        def worker(priority):
+            OUTBOUND_LIMITER.acquire(config, priority)
+            order.append(priority)
+            OUTBOUND_LIMITER.release()
+
+        background = threading.Thread(target=worker, args=(PRIORITY_BACKGROUND,))
+        background.start()
+        time.sleep(0.05)
+        interactive = threading.Thread(target=worker, args=(PRIORITY_INTERACTIVE,))
+        interactive.start()
+        time.sleep(0.05)
+        OUTBOUND_LIMITER.release()
+        background.join(5)
+        interactive.join(5)
+        self.assertEqual(order, [PRIORITY_INTERACTIVE, PRIORITY_BACKGROUND])
+
+        # Sin hueco dentro del deadline la petición no se envía
+        OUTBOUND_LIMITER.acquire(config, PRIORITY_INTERACTIVE)
+        try:
+            with deadline(0.2, 'interactive'), self.assertRaises(SupersetThrottledError):
+                OUTBOUND_LIMITER.acquire(config, PRIORITY_INTERACTIVE)
+        finally:
+            OUTBOUND_LIMITER.release()
+
+    def test_outbound_limiter_bucket_per_url(self):
+        """Test: Cada URL de Superset tiene su token bucket: agotar uno no frena a otra conexión"""
+        config = {'url': self.fake.url, 'timeout': 5, 'rate_limit': 10, 'max_concurrency': 0}
+        for _call in range(20):
+            OUTBOUND_LIMITER.acquire(config, PRIORITY_INTERACTIVE)
+            OUTBOUND_LIMITER.release()
+        self.assertLess(OUTBOUND_LIMITER.buckets[config['url']][0], 1)
+
+        waited = OUTBOUND_LIMITER.acquire(dict(config, url='https://bi2.example.com'), PRIORITY_INTERACTIVE)
+        OUTBOUND_LIMITER.release()
+        self.assertLess(waited, 0.05)
+        self.assertEqual(OUTBOUND_LIMITER.active, 0)
+
+    def test_shared_bucket_io_outside_process_lock(self):
+        """Test: La E/S del bucket compartido no retiene el lock del limitador en memoria"""
+        config = {'url': self.fake.url, 'timeout': 5, 'rate_limit': 50, 'max_concurrency': 4,
+                  'rate_limit_shared': True}
+        lock_free = []
+        original_take = SharedTokenBucket.take
+
+        def slow_take(bucket, *args):
+            # Otro hilo debe poder tomar el lock mientras este hace la E/S del fichero
+            probe = threading.Thread(target=lambda: lock_free.append(
+                OUTBOUND_LIMITER._cond.acquire(timeout=1) and (OUTBOUND_LIMITER._cond.release() or True)))
+            probe.start()
+            probe.join(2)
+            return original_take(bucket, *args)
+
+        with patch.object(SharedTokenBucket, 'take', slow_take):
+            OUTBOUND_LIMITER.acquire(config, PRIORITY_INTERACTIVE)
+        OUTBOUND_LIMITER.release()
+        self.assertEqual(lock_free, [True])
+        self.assertEqual(OUTBOUND_LIMITER.active, 0)
+
+    def test_outbound_rate_and_concurrency_limits(self):
+        """Test: El token bucket espacia las ráfagas y el límite de concurrencia se respeta en el warm-up"""
+        config = {'url': self.fake.url, 'timeout': 5, 'rate_limit': 10, 'max_concurrency': 0}
+        started = time.monotonic()
+        for _call in range(20):
+            OUTBOUND_LIMITER.acquire(config, PRIORITY_INTERACTIVE)
+            OUTBOUND_LIMITER.release()
+        self.assertLess(time.monotonic() - started, 0.5)
+        # Ráfaga agotada: la siguiente espera a que se repongan fichas
+        self.assertGreater(OUTBOUND_LIMITER.acquire(config, PRIORITY_INTERACTIVE), 0.05)
+        OUTBOUND_LIMITER.release()
+
+        self.fake.set_dashboards(4)
+        self.fake.latency = {'warm_up': 0.05}
+        ICPSudo = self.env['ir.config_parameter'].sudo()
+        ICPSudo.set_param('superset.warmup_concurrency', '4')
+        ICPSudo.set_param('superset.max_concurrency', '2')
+        self.utils.warm_up_dashboards(trigger='cron')
+        self.assertEqual(self.fake.calls['warm_up'], 12)
+        self.assertLessEqual(self.fake.max_concurrency, 2)
+
+    def test_identical_inflight_requests_are_coalesced(self):
+        """Test: GETs idénticos concurrentes comparten una sola llamada; otro token u otros parámetros no"""
+        config = self.utils.get_superset_config()
+        access_token = self.utils.get_access_token(config)
+        self.fake.latency = {'dashboard_list': 0.3}
+        self.fake.reset_stats()
+        results = []
+
+        def fetch(token, page):
+            response = superset_request('get', config, '/api/v1/dashboard/', EP_DASHBOARD_LIST,
+                                        access_token=token, params={'q': f'(page:{page},page_size:10)'})
+            results.append(response.status_code)
+
+        threads = [threading.Thread(target=fetch, args=(access_token, 0)) for _index in range(4)]
+        threads.append(threading.Thread(target=fetch, args=(access_token, 1)))
+        threads.append(threading.Thread(target=fetch, args=('otro-token', 0)))
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(10)
+
+        self.assertEqual(len(results), 6)
+        self.assertEqual(results.count(200), 5)
+        self.assertEqual(self.fake.calls['dashboard_list'], 3)
+
+        # Sin peticiones en vuelo se vuelve a llamar
+        fetch(access_token, 0)
+        self.assertEqual(self.fake.calls['dashboard_list'], 4)
+
+    def test_coalesced_follower_wait_is_bounded(self):
+        """Test: Sin deadline, un seguidor no espera indefinidamente a un líder colgado"""
+        release = threading.Event()
+        key = ('get', f'{self.fake.url}/colgado', None, 'token')
+        leader = threading.Thread(target=_coalesced, args=(key, EP_HEALTH, release.wait, 30))
+        leader.start()
+        self.addCleanup(leader.join, 5)
+        self.addCleanup(release.set)
+        while key not in _IN_FLIGHT and leader.is_alive():
+            time.sleep(0.01)
+
+        started = time.monotonic()
+        with self.assertRaises(SupersetDeadlineExceeded):
+            _coalesced(key, EP_HEALTH, lambda: None, 0.2)
+        self.assertLess(time.monotonic() - started, 2)
+
+    def test_health_monitor_records_status(self):
+        """Test: El monitor guarda disponibilidad, latencia y recuentos; los fallos conservan los recuentos"""
+        self.fake.set_dashboards(20, embedded_ratio=0.5)
+        self.assertTrue(self.utils.check_health())
+
+        config = self.utils.get_superset_config()
+        record = self.env['superset.health.status']._read_status(config['url'])
+        self.assertEqual(record['state'], 'up')
+        self.assertTrue(record['token_valid'])
+        self.assertEqual((record['total_dashboards'], record['with_embedding']), (20, 10))
+        self.assertGreater(record['latency_ms'], 0)
+
+        self.fake.error_endpoints = {'health'}
+        self.assertFalse(self.utils.check_health())
+        status = self.utils.get_monitored_status()
+        self.assertTrue(status['connection_status'].startswith('Error de conexión'))
+        self.assertEqual(status['with_embedding'], 10)
+        record = self.env['superset.health.status']._read_status(config['url'])
+        self.assertIn('500', record['last_error'])
+
+    def test_health_monitor_publishes_diffs(self):
+        """Test: El monitor publica por el bus solo lo que cambia del catálogo y del estado"""
+        self.fake.set_dashboards(10)
+        with patch.object(type(self.env['bus.bus']), '_sendone') as mock_send:
+            self.utils.check_health()
+            # Primera pasada: solo fija la referencia del catálogo
+            self.assertEqual([call.args[1] for call in mock_send.call_args_list], [BUS_STATUS])
+            channel = mock_send.call_args.args[0]
+            self.assertEqual(channel, bus_channel('default'))
+
+            mock_send.reset_mock()
+            self.utils.check_health()
+            mock_send.assert_not_called()
+
+            self.fake.set_dashboards(12)
+            self.fake.dashboards[0]['dashboard_title'] = 'Ventas'
+            self.fake.dashboards[1]['embedded_uuid'] = None
+            self.utils.get_dashboard_catalog(force_refresh=True)
+            self.utils.check_health()
+
+        messages = {call.args[1]: call.args[2] for call in mock_send.call_args_list}
+        diff = messages[BUS_CATALOG_DIFF]
+        self.assertEqual([row['id'] for row in diff['added']], [d['uuid'] for d in self.fake.dashboards[10:]])
+        self.assertEqual([(row['id'], row['title']) for row in diff['updated']],
+                         [(self.fake.dashboards[0]['uuid'], 'Ventas')])
+        self.assertEqual(diff['removed'], [self.fake.dashboards[1]['uuid']])
+        self.assertEqual(messages[BUS_STATUS]['with_embedding'], 11)
+
+    def test_node_pool_fails_over_dead_node(self):
+        """Test: Un nodo que no conecta cede las llamadas a los sanos y el dominio público sigue al nodo"""
+        dead = 'http://127.0.0.1:9'
+        self.addCleanup(get_circuit_breaker(dead).reset)
+        self.env['ir.config_parameter'].sudo().set_param(
+            'superset.node_urls', f'{dead} https://bi2.example.com')
+        config = self.utils.get_superset_config()
+        self.assertEqual([node['url'] for node in config['nodes']], [self.fake.url, dead])
+
+        access_token = self.utils.get_access_token(config)
+        for _call in range(10):
+            self.assertEqual(len(self.utils._fetch_dashboards(config, access_token)), 250)
+        self.assertTrue(NODE_POOL.snapshot(config['nodes'])[1]['down'])
+
+        # Con el nodo caído marcado, el navegador recibe el dominio del nodo sano
+        self.assertEqual(self.utils.get_superset_domain(config), self.fake.url)
+        NODE_POOL.reset()
+        NODE_POOL.observe(dead, 0.001)
+        NODE_POOL.observe(self.fake.url, 10)
+        domains = {self.utils.get_superset_domain(config) for _pick in range(50)}
+        self.assertIn('https://bi2.example.com', domains)
+
+    def test_circuit_state_is_pool_level(self):
+        """Test: Con el circuito del nodo principal abierto y otro nodo sano el hub sigue sirviendo"""
+        fallback = self.fake.url.replace('127.0.0.1', 'localhost')
+        self.addCleanup(get_circuit_breaker(fallback).reset)
+        ICPSudo = self.env['ir.config_parameter'].sudo()
+        ICPSudo.set_param('superset.circuit_failure_threshold', '2')
+        ICPSudo.set_param('superset.circuit_reset_timeout', '60')
+        ICPSudo.set_param('superset.node_urls', fallback)
+        config = self.utils.get_superset_config()
+        self.assertEqual([node['url'] for node in config['nodes']], [self.fake.url, fallback])
+
+        get_circuit_breaker(self.fake.url)._update(lambda state: state.update(state='open', opened_at=time.time()))
+        self.assertEqual(self.utils.get_circuit_state(config), 'closed')
+
+        # El nodo principal falla al momento y el hub se sirve desde el de respaldo
+        hub = self.env['superset.analytics.hub'].create({})
+        hub._write_user_state({'selected_dashboard': self.fake.dashboards[0]['uuid']})
+        result = hub.get_dashboard_data_for_js()
+        self.assertTrue(result.get('success'), result)
+
+        # Todos los nodos abiertos: ahora sí se falla sin llamar a Superset
+        get_circuit_breaker(fallback)._update(lambda state: state.update(state='open', opened_at=time.time()))
+        self.assertEqual(self.utils.get_circuit_state(config), 'open')
+        self.fake.reset_stats()
+        self.assertEqual(hub.get_dashboard_data_for_js()['error_type'], 'connection_error')
+        self.assertEqual(self.fake.total_calls, 0)
+
+    def test_company_connection_partitions_caches(self):
+        """Test: Una empresa con conexión propia usa su URL y no comparte tokens ni catálogo con la global"""
+        self.fake.set_dashboards(10)
+        company = self.env['res.company'].create({'name': 'Filial Superset'})
+        connection_url = self.fake.url.replace('127.0.0.1', 'localhost')
+        connection = self.env['superset.connection'].create({
+            'name': 'Superset Filial',
+            'url': connection_url,
+            'username': self.fake.username,
+            'password': self.fake.password,
+            'catalog_ttl': 60,
+            'company_ids': [(6, 0, company.ids)],
+        })
+        self.addCleanup(get_circuit_breaker(connection_url).reset)
+
+        utils_company = self.utils.with_company(company)
+        config = self.utils.get_superset_config()
+        config_company = utils_company.get_superset_config()
+        self.assertEqual(config['connection_key'], 'default')
+        self.assertEqual(config_company['url'], connection_url)
+        self.assertEqual(config_company['connection_key'], f'connection_{connection.id}')
+
+        self.fake.reset_stats()
+        for _round in range(2):
+            self.utils.get_dashboard_catalog(config)
+            utils_company.get_dashboard_catalog(config_company)
+        self.assertEqual(self.fake.calls['login'], 2)
+        self.assertEqual(self.fake.calls['dashboard_list'], 2)
+        self.assertNotEqual(self.utils._catalog_cache_keys(config), utils_company._catalog_cache_keys(config_company))
+
+        # Sin empresa asignada la conexión deja de aplicarse
+        connection.company_ids = [(5, 0, 0)]
+        self.assertEqual(utils_company.get_superset_config()['connection_key'], 'default')
+
+    def test_company_connection_scopes_warmups_and_bus(self):
+        """Test: El warm-up se guarda por conexión y el bus sigue a la empresa activa, no a la por defecto"""
+        company = self.env['res.company'].create({'name': 'Filial Superset'})
+        connection = self.env['superset.connection'].create({
+            'name': 'Superset Filial',
+            'url': self.fake.url.replace('127.0.0.1', 'localhost'),
+            'username': self.fake.username,
+            'password': self.fake.password,
+            'company_ids': [(6, 0, company.ids)],
+        })
+        Warmup = self.env['superset.chart.warmup']
+        result = {'dashboard_id': 1, 'chart_id': 2, 'status': 'ok', 'duration_ms': 100}
+        Warmup._record_results([result], 'cron')
+        Warmup._record_results([result], 'cron', connection.id)
+        Warmup._record_results([result], 'select')
+        warmups = Warmup.search([('dashboard_id', '=', 1), ('chart_id', '=', 2)])
+        self.assertEqual(sorted((w.connection_id.id, w.warmup_count) for w in warmups),
+                         [(False, 2), (connection.id, 1)])
+
+        self.env.user.company_ids |= company
+        websocket = self.env['ir.websocket']
+        active = websocket.with_context(allowed_company_ids=[company.id, self.env.user.company_id.id])
+        self.assertEqual(active._superset_active_company(), company)
+        self.assertEqual(self.utils.with_company(active._superset_active_company())._connection_key(),
+                         f'connection_{connection.id}')
+        # Una empresa no permitida al usuario se ignora
+        other = self.env['res.company'].create({'name': 'Ajena'})
+        self.env.user.company_ids -= other
+        self.assertEqual(websocket.with_context(allowed_company_ids=[other.id])._superset_active_company(),
+                         self.env.user.company_id)
+
+    @unittest.skipUnless(TracerProvider, 'opentelemetry-sdk no instalado')
+    def test_otel_export_keeps_correlation_and_parents(self):
+        """Test: Los spans exportados a OpenTelemetry forman una traza con el ID de correlación"""
+        exporter = InMemorySpanExporter()
+        provider = TracerProvider()
+        provider.add_span_processor(SimpleSpanProcessor(exporter))
+        trace_id = 'ab' * 16
+
+        with start_trace('hub.get_dashboard_data_for_js', trace_id, 'none') as trace:
+            with trace_span('superset.login'):
+                with trace_span('POST /api/v1/security/login/'):
+                    pass
+        with patch('opentelemetry.trace.get_tracer', provider.get_tracer):
+            _export_otel(trace)
+
+        spans = {span.name: span for span in exporter.get_finished_spans()}
+        self.assertEqual({span.context.trace_id for span in spans.values()}, {int(trace_id, 16)})
+        root, login, call = (spans['hub.get_dashboard_data_for_js'], spans['superset.login'],
+                             spans['POST /api/v1/security/login/'])
+        self.assertEqual(root.parent.span_id, int(trace_id[:16], 16))
+        self.assertEqual(login.parent.span_id, root.context.span_id)
+        self.assertEqual(call.parent.span_id, login.context.span_id)
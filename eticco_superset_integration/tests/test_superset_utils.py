@@ -20,6 +20,10 @@ class TestSupersetUtils(TransactionCase):
             'timeout': 30
         }
 
+        # El catálogo y los tokens viven en una cache global de proceso
+        self.env['superset.utils'].clear_all_cache()
+        self.addCleanup(self.env['superset.utils'].clear_all_cache)
+
     def test_get_superset_config(self):
         """Test: Obtener configuración de Superset"""
         # Configurar parámetros de prueba
@@ -196,4 +200,67 @@ class TestSupersetUtils(TransactionCase):
         
         self.assertFalse(stats['has_configuration'])
         self.assertEqual(stats['total_dashboards'], 0)
-        self.assertEqual(stats['with_embedding'], 0)
\ No newline at end of file
+        self.assertEqual(stats['with_embedding'], 0)
+
+    @patch('requests.get')
+    def test_refresh_dashboard_thumbnails(self, mock_get):
+        """Test: Miniaturas guardadas como adjunto y reutilizadas si no cambian"""
+        self.env['ir.config_parameter'].sudo().set_param('superset.url', 'http://test:8088')
+        self.env['ir.config_parameter'].sudo().set_param('superset.username', 'testuser')
+        self.env['ir.config_parameter'].sudo().set_param('superset.password', 'testpass')
+        self.env['ir.config_parameter'].sudo().set_param('superset.thumbnails', 'True')
+
+        mock_list = Mock()
+        mock_list.status_code = 200
+        mock_list.json.return_value = {
+            'count': 1,
+            'result': [{
+                'id': 1,
+                'uuid': 'thumb-uuid',
+                'published': True,
+                'changed_on_utc': '2024-01-01T00:00:00',
+                'thumbnail_url': '/api/v1/dashboard/1/thumbnail/abc/',
+            }]
+        }
+        mock_image = Mock()
+        mock_image.status_code = 200
+        mock_image.headers = {'Content-Type': 'image/png'}
+        mock_image.content = b'fake-png'
+
+        mock_get.side_effect = [mock_list, mock_image, mock_list]
+
+        with patch.object(type(self.utils), 'get_access_token', return_value='token'):
+            first = self.utils.refresh_dashboard_thumbnails()
+            second = self.utils.refresh_dashboard_thumbnails()
+
+        self.assertEqual(first['updated'], 1)
+        self.assertEqual(second['updated'], 0)  # Mismo changed_on: no se descarga
+        urls = self.utils.get_thumbnail_urls()
+        self.assertIn('thumb-uuid', urls)
+
+    @patch('requests.put')
+    @patch('requests.get')
+    def test_warm_up_dashboards_records_timings(self, mock_get, mock_put):
+        """Test: Warm-up resuelve charts y registra tiempos por chart"""
+        mock_charts = Mock()
+        mock_charts.status_code = 200
+        mock_charts.json.return_value = {'result': [
+            {'id': 11, 'slice_name': 'Ventas'},
+            {'id': 12, 'slice_name': 'Margen'},
+        ]}
+        mock_get.return_value = mock_charts
+
+        mock_warm = Mock()
+        mock_warm.status_code = 200
+        mock_warm.json.return_value = {'result': [{'chart_id': 11, 'viz_error': None, 'viz_status': 'success'}]}
+        mock_put.return_value = mock_warm
+
+        with patch.object(type(self.utils), 'get_superset_config', return_value=dict(self.test_config, warmup_concurrency=2)), \
+                patch.object(type(self.utils), 'get_access_token', return_value='token'):
+            result = self.utils.warm_up_dashboards([7], trigger='cron')
+
+        self.assertEqual(result, {'dashboards': 1, 'charts': 2, 'errors': 0})
+        self.assertEqual(mock_put.call_count, 2)
+        warmups = self.env['superset.chart.warmup'].search([('dashboard_id', '=', 7)])
+        self.assertEqual(len(warmups), 2)
+        self.assertTrue(all(w.last_status == 'ok' and w.warmup_count == 1 for w in warmups))